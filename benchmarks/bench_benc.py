@@ -0,0 +1,202 @@
+##
+## Copyright (c) 2012 Dan Eicher
+##
+## Permission is hereby granted, free of charge, to any person obtaining a
+## copy of this software and associated documentation files (the "Software"),
+## to deal in the Software without restriction, including without limitation
+## the rights to use, copy, modify, merge, publish, distribute, sublicense,
+## and/or sell copies of the Software, and to permit persons to whom the
+## Software is furnished to do so, subject to the following conditions:
+##
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+##
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+## FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+## DEALINGS IN THE SOFTWARE.
+##
+
+
+"""Measure the tr_benc bindings against a pure-Python bencode codec.
+
+Synthetic settings, resume and metainfo documents of increasing size are
+parsed, serialized, converted with to_python() and searched by path with
+both implementations. The Python side of to_python() rebuilds the decoded
+tree, which is what handing out a plain copy costs there.
+
+Every case runs in a fresh interpreter and peak memory is the growth of its
+maximum resident set size over a single operation, so memory allocated by
+libtransmission counts as well. Cases that stay below the peak reached while
+setting up read as 0.
+
+usage: python3 benchmarks/bench_benc.py [scale ...]
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import timeit
+
+import transmission as tr
+
+def ref_dumps(value):
+    out = []
+    def encode(value):
+        if isinstance(value, int):
+            out.append(('i%de' % value).encode('ascii'))
+        elif isinstance(value, (str, bytes)):
+            if isinstance(value, str):
+                value = value.encode('utf-8')
+            out.append(('%d:' % len(value)).encode('ascii'))
+            out.append(value)
+        elif isinstance(value, list):
+            out.append(b'l')
+            for item in value:
+                encode(item)
+            out.append(b'e')
+        elif isinstance(value, dict):
+            out.append(b'd')
+            for key in sorted(value):
+                encode(key)
+                encode(value[key])
+            out.append(b'e')
+        else:
+            raise TypeError('cannot bencode %r' % type(value).__name__)
+    encode(value)
+    return b''.join(out)
+
+def ref_loads(data):
+    def decode(pos):
+        lead = data[pos:pos + 1]
+        if lead == b'i':
+            end = data.index(b'e', pos)
+            return int(data[pos + 1:end]), end + 1
+        if lead == b'l':
+            items, pos = [], pos + 1
+            while data[pos:pos + 1] != b'e':
+                item, pos = decode(pos)
+                items.append(item)
+            return items, pos + 1
+        if lead == b'd':
+            items, pos = {}, pos + 1
+            while data[pos:pos + 1] != b'e':
+                key, pos = decode(pos)
+                items[key], pos = decode(pos)
+            return items, pos + 1
+        sep = data.index(b':', pos)
+        end = sep + 1 + int(data[pos:sep])
+        raw = data[sep + 1:end]
+        try:
+            return raw.decode('utf-8'), end
+        except UnicodeDecodeError:
+            return raw, end
+    value, pos = decode(0)
+    if pos != len(data):
+        raise ValueError('trailing data after bencoded value')
+    return value
+
+def ref_to_python(value):
+    if isinstance(value, dict):
+        return {key: ref_to_python(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [ref_to_python(item) for item in value]
+    return value
+
+def ref_get_path(value, path):
+    for segment in path.split('/'):
+        value = value[int(segment) if isinstance(value, list) else segment]
+    return value
+
+def settings(scale):
+    doc = {'download-dir': '/srv/torrents', 'peer-port': 51413,
+           'rpc-whitelist': '127.0.0.1', 'speed-limit-down': 100}
+    for i in range(scale):
+        doc['option-%05d' % i] = i if i % 2 else 'value-%d' % i
+    return doc, 'peer-port'
+
+def resume(scale):
+    doc = {'added-date': 1350268605, 'destination': '/srv/torrents',
+           'peers2': os.urandom(6 * scale),
+           'priority': [i % 3 - 1 for i in range(scale)],
+           'dnd': [i % 2 for i in range(scale)],
+           'progress': {'blocks': os.urandom(scale // 8 + 1),
+                        'mtimes': [1350268605 + i for i in range(scale)]}}
+    return doc, 'progress/mtimes/%d' % (scale - 1)
+
+def metainfo(scale):
+    doc = {'announce': 'http://tracker.example.com:6969/announce',
+           'creation date': 1350268605,
+           'info': {'name': 'synthetic', 'piece length': 262144,
+                    'pieces': os.urandom(20 * scale),
+                    'files': [{'length': 1048576 + i,
+                               'path': ['dir%d' % (i // 100), 'file%d.bin' % i]}
+                              for i in range(scale)]}}
+    return doc, 'info/files/%d/length' % (scale - 1)
+
+DOCUMENTS = {make.__name__: make for make in (settings, resume, metainfo)}
+OPERATIONS = ['parse', 'serialize', 'to_python', 'lookup']
+
+def max_rss():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+def run_case(document, scale, operation, impl):
+    # only keep what the operation works on, anything else would raise the
+    # baseline and hide the peak of the operation itself
+    doc, path = DOCUMENTS[document](scale)
+    data = ref_dumps(doc)
+    del doc
+    if impl == 'benc':
+        tree = tr.bencode.loads(data)
+        func = {'parse': lambda: tr.bencode.loads(data),
+                'serialize': lambda: tree.dumps(),
+                'to_python': lambda: tree.to_python(),
+                'lookup': lambda: tree.get_path(path)}[operation]
+    else:
+        tree = ref_loads(data)
+        func = {'parse': lambda: ref_loads(data),
+                'serialize': lambda: ref_dumps(tree),
+                'to_python': lambda: ref_to_python(tree),
+                'lookup': lambda: ref_get_path(tree, path)}[operation]
+    if operation != 'parse':
+        del data
+    number = max(1, 20000 // scale) * (100 if operation == 'lookup' else 1)
+
+    before = max_rss()
+    func()
+    peak = max_rss() - before
+    seconds = min(timeit.repeat(func, number=number, repeat=3))
+    print('  %-10s %-6s %12.1f ops/sec %10d KiB peak' %
+          (operation, impl, number / seconds, peak))
+
+def main(argv):
+    if argv[:1] == ['--case']:
+        document, scale, operation, impl = argv[1:]
+        run_case(document, int(scale), operation, impl)
+        return
+
+    for scale in [int(arg) for arg in argv] or [10, 1000, 50000]:
+        for document in DOCUMENTS:
+            doc, path = DOCUMENTS[document](scale)
+            data = ref_dumps(doc)
+            benc = tr.bencode.loads(data)
+            native = ref_loads(data)
+            assert benc.dumps() == data
+            assert benc.get_path(path) == ref_get_path(native, path)
+            del doc, benc, native
+
+            print('%s x %d, %d bytes' % (document, scale, len(data)))
+            sys.stdout.flush()
+            for operation in OPERATIONS:
+                for impl in ('benc', 'python'):
+                    subprocess.check_call([sys.executable, __file__, '--case',
+                                           document, str(scale), operation, impl])
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,67 @@
+##
+## Copyright (c) 2012 Dan Eicher
+##
+## Permission is hereby granted, free of charge, to any person obtaining a
+## copy of this software and associated documentation files (the "Software"),
+## to deal in the Software without restriction, including without limitation
+## the rights to use, copy, modify, merge, publish, distribute, sublicense,
+## and/or sell copies of the Software, and to permit persons to whom the
+## Software is furnished to do so, subject to the following conditions:
+##
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+##
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+## FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+## DEALINGS IN THE SOFTWARE.
+##
+
+"""Compare pickling Benc trees against a to_python()/from_python() round trip.
+
+usage: python3 benchmarks/bench_pickle.py [file_count ...]
+"""
+
+import os
+import pickle
+import sys
+import timeit
+
+import transmission as tr
+
+def metainfo(file_count):
+    return {'announce': 'http://tracker.example.com:6969/announce',
+            'created by': 'bench_pickle',
+            'creation date': 1350268605,
+            'info': {'name': 'synthetic',
+                     'piece length': 262144,
+                     'pieces': os.urandom(20 * file_count),
+                     'files': [{'length': 1048576 + i,
+                                'path': ['dir%d' % (i // 100), 'file%d.bin' % i]}
+                               for i in range(file_count)]}}
+
+def pickle_benc(benc):
+    return pickle.loads(pickle.dumps(benc, pickle.HIGHEST_PROTOCOL))
+
+def pickle_dict(benc):
+    data = pickle.dumps(benc.to_python(), pickle.HIGHEST_PROTOCOL)
+    return tr.bencode.from_python(pickle.loads(data))
+
+def bench(name, func, benc, number):
+    seconds = min(timeit.repeat(lambda: func(benc), number=number, repeat=3))
+    print('  %-12s %10.1f ops/sec' % (name, number / seconds))
+
+def main(argv):
+    for file_count in [int(arg) for arg in argv] or [10, 1000, 50000]:
+        benc = tr.bencode.from_python(metainfo(file_count))
+        number = max(1, 20000 // file_count)
+        print('metainfo with %d files, %d bytes pickled' %
+              (file_count, len(pickle.dumps(benc, pickle.HIGHEST_PROTOCOL))))
+        bench('pickle', pickle_benc, benc, number)
+        bench('dict', pickle_dict, benc, number)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,5 +1,14 @@
 import unittest
+import array
+import collections.abc
+import copy
+import gc
+import gzip
+import io
 import os.path
+import pickle
+import tempfile
+import weakref
 
 import transmission as tr
 
@@ -170,6 +179,454 @@ class TestBenc(unittest.TestCase):
         with self.assertRaises(NotImplementedError):
             benc[1] = 'foo'
 
+    def test_benc_to_python(self):
+        benc = tr.bencode.BencDict(4)
+        benc.add_bool('bool', True)
+        benc.add_real('real', 3.14)
+        benc.add_string('string', 'bar')
+        val = benc.add_list('list', 2)
+        val.add_int(1)
+        val.add_dict(0)
+
+        self.assertEqual(benc.to_python(), {'bool': True,
+                                            'real': 3.14,
+                                            'string': 'bar',
+                                            'list': [1, {}]})
+        self.assertIs(benc.to_python()['bool'], True)
+        self.assertEqual(tr.bencode.BencInt(7).to_python(), 7)
+
+    def test_benc_from_python(self):
+        settings = {'bool': False,
+                    'int': 7,
+                    'real': 3.14,
+                    'string': 'foo',
+                    'list': [1, 2, [3]],
+                    'dict': {'foo': 'bar'}}
+
+        for reserve in (True, False):
+            benc = tr.bencode.from_python(settings, reserve=reserve)
+            self.assertEqual(type(benc), tr.bencode.BencDict)
+            self.assertEqual(benc.to_python(), settings)
+
+        self.assertEqual(type(tr.bencode.from_python([1, 2])), tr.bencode.BencList)
+        self.assertEqual(type(tr.bencode.from_python(7)), tr.bencode.BencInt)
+
+        with self.assertRaises(TypeError):
+            tr.bencode.from_python({1: 'foo'})
+
+        with self.assertRaises(TypeError):
+            tr.bencode.from_python(object())
+
+    def test_benc_loads(self):
+        data = b'd3:fooi7e3:barl1:a1:bee'
+        for buf in (data, bytearray(data), memoryview(data)):
+            benc = tr.bencode.loads(buf)
+            self.assertEqual(type(benc), tr.bencode.BencDict)
+            self.assertEqual(benc.to_python(), {'foo': 7, 'bar': ['a', 'b']})
+
+        benc = tr.bencode.loads(b'{"foo": 7, "bar": [true, 3.5]}',
+                                tr.benc_serialization_mode.JSON)
+        self.assertEqual(benc.to_python(), {'foo': 7, 'bar': [True, 3.5]})
+
+        with self.assertRaises(ValueError):
+            tr.bencode.loads(b'd3:foo')
+
+    def test_benc_dumps(self):
+        data = b'd3:bin3:a\x00b3:fooi7ee'
+        benc = tr.bencode.loads(data)
+        self.assertEqual(benc.dumps(), data)
+        self.assertEqual(tr.bencode.loads(benc.dumps()).to_python(), benc.to_python())
+
+        json = benc.dumps(tr.benc_serialization_mode.JSON_LEAN)
+        self.assertEqual(type(json), bytes)
+        self.assertEqual(tr.bencode.loads(json, tr.benc_serialization_mode.JSON).to_python(),
+                         {'bin': 'a\x00b', 'foo': 7})
+
+    def test_benc_dump_into(self):
+        data = b'd3:fooi7ee'
+        benc = tr.bencode.loads(data)
+        buf = bytearray(16)
+        self.assertEqual(benc.dump_into(buf, 2), len(data))
+        self.assertEqual(bytes(buf[2:2 + len(data)]), data)
+        self.assertEqual(buf[:2], b'\x00\x00')
+
+        with self.assertRaises(ValueError):
+            benc.dump_into(bytearray(4))
+        with self.assertRaises(ValueError):
+            benc.dump_into(buf, 17)
+        with self.assertRaises(TypeError):
+            benc.dump_into(data)
+
+    def test_benc_load_mmap(self):
+        benc = tr.bencode.load_mmap(_torrent)
+        self.assertEqual(type(benc), tr.bencode.BencDict)
+        with open(_torrent, 'rb') as f:
+            self.assertEqual(benc.to_python(), tr.bencode.loads(f.read()).to_python())
+        self.assertEqual(benc['info']['name'], 'OpenBSD_songs_mp3')
+
+        with self.assertRaises(OSError):
+            tr.bencode.load_mmap(_torrent + '.missing')
+
+    def test_benc_iterparse(self):
+        data = b'd4:infod4:name3:foo6:piecesl1:a1:beee' + b'li7ee'
+        self.assertEqual(list(tr.bencode.iterparse(data)),
+                         [('start_dict', (), None),
+                          ('start_dict', ('info',), None),
+                          ('value', ('info', 'name'), 'foo'),
+                          ('start_list', ('info', 'pieces'), None),
+                          ('value', ('info', 'pieces', 0), 'a'),
+                          ('value', ('info', 'pieces', 1), 'b'),
+                          ('end_list', ('info', 'pieces'), None),
+                          ('end_dict', ('info',), None),
+                          ('end_dict', (), None),
+                          ('start_list', (), None),
+                          ('value', (0,), 7),
+                          ('end_list', (), None)])
+
+        events = tr.bencode.iterparse(data)
+        names = []
+        for event, path, value in events:
+            if event == 'start_list' and path == ('info', 'pieces'):
+                events.skip()
+            elif event == 'value':
+                names.append(value)
+        self.assertEqual(names, ['foo', 7])
+
+        with open(_torrent, 'rb') as f:
+            names = [value for event, path, value in tr.bencode.iterparse(f)
+                     if path == ('info', 'name')]
+        self.assertEqual(names, ['OpenBSD_songs_mp3'])
+
+        with self.assertRaises(ValueError):
+            list(tr.bencode.iterparse(b'd3:foo'))
+        with self.assertRaises(ValueError):
+            tr.bencode.iterparse(b'i7e').skip()
+        for data in (b'i-0e', b'i03e', b'i-012e', b'i-e', b'ie'):
+            with self.assertRaises(ValueError):
+                list(tr.bencode.iterparse(data))
+        self.assertEqual(list(tr.bencode.iterparse(b'i0e')), [('value', (), 0)])
+
+    def test_benc_iterparse_streams(self):
+        data = b'd3:bigi%se4:listli-1ei0eee' % (b'1' * 100)
+        expected = list(tr.bencode.iterparse(data))
+        self.assertEqual(expected[1], ('value', ('big',), int('1' * 100)))
+
+        # file objects are parsed from their current position
+        with tempfile.TemporaryFile() as f:
+            f.write(b'garbage' + data)
+            f.seek(len(b'garbage'))
+            self.assertEqual(list(tr.bencode.iterparse(f)), expected)
+
+        self.assertEqual(list(tr.bencode.iterparse(io.BytesIO(data))), expected)
+        self.assertEqual(list(tr.bencode.iterparse(gzip.GzipFile(fileobj=io.BytesIO(gzip.compress(data))))),
+                         expected)
+
+        read_fd, write_fd = os.pipe()
+        with os.fdopen(read_fd, 'rb') as reader, os.fdopen(write_fd, 'wb') as writer:
+            writer.write(data)
+            writer.close()
+            events = tr.bencode.iterparse(reader)
+            self.assertEqual(next(events), expected[0])
+            self.assertEqual(next(events), expected[1])
+            self.assertEqual(next(events), expected[2])
+            events.skip()
+            self.assertEqual(list(events), [expected[-1]])
+
+        with self.assertRaises(ValueError):
+            list(tr.bencode.iterparse(io.BytesIO(b'd3:foo')))
+
+        # a stream referring back to its parser is collected
+        class Stream(io.BytesIO):
+            pass
+        stream = Stream(data)
+        stream.events = tr.bencode.iterparse(stream)
+        ref = weakref.ref(stream)
+        del stream
+        gc.collect()
+        self.assertIsNone(ref())
+        with self.assertRaises(TypeError):
+            list(tr.bencode.iterparse(io.StringIO('i7e')))
+
+    def test_benc_dict_indexed_lookup(self):
+        benc = tr.bencode.from_python({'key%d' % i: i for i in range(1000)})
+        for i in range(1000):
+            self.assertEqual(benc['key%d' % i], i)
+        self.assertIn('key999', benc)
+        self.assertNotIn('key1000', benc)
+        self.assertIsNone(benc.get('key1000'))
+        with self.assertRaises(KeyError):
+            benc['key1000']
+
+        benc.add_int('key1000', 1000)
+        self.assertEqual(benc['key1000'], 1000)
+
+        # changing the type of a value moves entries around
+        benc['key0'] = 'zero'
+        for i in range(1, 1001):
+            self.assertEqual(benc['key%d' % i], i)
+        self.assertEqual(benc['key0'], 'zero')
+
+    def test_benc_dict_indexed_lookup_views(self):
+        root = tr.bencode.from_python({'info': {'key%d' % i: i for i in range(100)}})
+        info, other = root['info'], root['info']
+        for i in range(100):
+            self.assertEqual(info['key%d' % i], i)
+
+        # the index belongs to the wrapper, changes through another one show up
+        other['key0'] = 'zero'
+        other.add_int('key100', 100)
+        self.assertEqual(info['key0'], 'zero')
+        self.assertEqual(info['key100'], 100)
+        self.assertEqual(info.find('key99').value, 99)
+        del info, other, root
+
+        # a new tree may reuse the memory of the freed one
+        root = tr.bencode.from_python({'info': {'name%d' % i: i for i in range(100)}})
+        info = root['info']
+        for i in range(100):
+            self.assertEqual(info['name%d' % i], i)
+            self.assertNotIn('key%d' % i, info)
+
+    def test_benc_dict_mapping(self):
+        benc = tr.bencode.from_python({'foo': 7, 'bar': 'baz', 'list': [1, 2]})
+        self.assertEqual(len(benc), 3)
+        self.assertEqual(sorted(benc), ['bar', 'foo', 'list'])
+        self.assertEqual(sorted(benc.keys()), ['bar', 'foo', 'list'])
+        self.assertEqual(dict((k, v) for k, v in benc.items() if k != 'list'),
+                         {'foo': 7, 'bar': 'baz'})
+        self.assertIn(7, list(benc.values()))
+        self.assertEqual(benc.get('foo'), 7)
+        self.assertEqual(benc.get('missing', 'default'), 'default')
+        self.assertIsNone(benc.get('missing'))
+        self.assertEqual(type(benc.get('list')), tr.bencode.BencList)
+        self.assertEqual(type(benc.find('foo')), tr.bencode.BencInt)
+        self.assertIsNone(benc.find('missing'))
+
+    def test_benc_dict_abc(self):
+        benc = tr.bencode.from_python({'foo': 7, 'bar': 'baz', 'list': [1, 2]})
+        self.assertIsInstance(benc, collections.abc.Mapping)
+        self.assertIsInstance(benc['list'], collections.abc.Sequence)
+        self.assertEqual(benc, {'foo': 7, 'bar': 'baz', 'list': [1, 2]})
+        self.assertEqual(benc, tr.bencode.from_python(benc.to_python()))
+        self.assertNotEqual(benc, {'foo': 7})
+        with self.assertRaises(TypeError):
+            hash(benc)
+
+        keys = benc.keys()
+        self.assertEqual(len(keys), 3)
+        self.assertIn('foo', keys)
+        self.assertNotIn('missing', keys)
+        self.assertEqual(sorted(keys), ['bar', 'foo', 'list'])
+        benc.add_int('new', 1)
+        self.assertEqual(len(keys), 4)
+        self.assertIn(('foo', 7), benc.items())
+        self.assertNotIn(('foo', 8), benc.items())
+        self.assertIn('baz', benc.values())
+
+        self.assertNotIn(7, benc)
+        self.assertNotIn(None, benc)
+        self.assertNotIn('fo\x00o', benc)
+
+    def test_benc_list_sequence(self):
+        benc = tr.bencode.from_python([0, 1, 2, 3, 'four', 2])
+        self.assertEqual(list(benc), [0, 1, 2, 3, 'four', 2])
+        self.assertEqual(benc[-2], 'four')
+        self.assertEqual(benc[1:4], [1, 2, 3])
+        self.assertEqual(benc[::-2], [2, 3, 1])
+        self.assertEqual(benc[10:], [])
+        self.assertEqual(benc.index('four'), 4)
+        self.assertEqual(benc.count(2), 2)
+        self.assertIn(3, benc)
+        self.assertEqual(list(reversed(benc)), [2, 'four', 3, 2, 1, 0])
+        with self.assertRaises(IndexError):
+            benc[6]
+        with self.assertRaises(ValueError):
+            benc.index('five')
+        with self.assertRaises(TypeError):
+            benc['foo']
+
+    def test_benc_list_extend(self):
+        benc = tr.bencode.BencList(0)
+        benc.extend(array.array('q', [1, -2, 3]))
+        benc.extend(b'\x00\xff')
+        benc.extend(array.array('d', [0.5]))
+        benc.extend(memoryview(array.array('H', [65535])))
+        benc.extend(x * 10 for x in range(3))
+        benc.extend(['foo', {'bar': True}])
+        self.assertEqual(benc.to_python(),
+                         [1, -2, 3, 0, 255, 0.5, 65535, 0, 10, 20, 'foo', {'bar': True}])
+        self.assertEqual(type(benc.to_python()[5]), float)
+
+        with self.assertRaises(OverflowError):
+            benc.extend(array.array('Q', [2 ** 64 - 1]))
+        with self.assertRaises(TypeError):
+            benc.extend([1, object()])
+        self.assertEqual(len(benc), 13)
+        self.assertEqual(benc[-1], 1)
+
+    def test_benc_get_path(self):
+        benc = tr.bencode.from_python({'info': {'name': 'foo',
+                                                'files': [{'length': 1, 'path': ['a']},
+                                                          {'length': 2, 'path': ['b', 'c']}]},
+                                       'priority': [0, 1, -1]})
+        self.assertEqual(benc.get_path('info/name'), 'foo')
+        self.assertEqual(benc.get_path('/info/files/1/path'), ['b', 'c'])
+        self.assertEqual(benc.get_path('priority/-1'), -1)
+        self.assertEqual(benc.get_path('info/files/*/length'), [1, 2])
+        self.assertEqual(benc.get_path('info/files/*/path/*'), ['a', 'b', 'c'])
+        self.assertEqual(benc.get_path('info/missing/*'), [])
+        self.assertEqual(benc.get_path('info/files/5/length', None), None)
+        with self.assertRaises(KeyError):
+            benc.get_path('info/files/0/missing')
+
+    def test_benc_string_raw(self):
+        data = b'\x00\xff\x10binary'
+        benc = tr.bencode.BencString(data)
+        self.assertEqual(benc.raw, data)
+        self.assertEqual(type(benc.raw), bytes)
+
+        view = benc.view
+        self.assertEqual(type(view), memoryview)
+        self.assertTrue(view.readonly)
+        self.assertEqual(view.tobytes(), data)
+        self.assertEqual(bytes(view[1:3]), data[1:3])
+        del benc
+        self.assertEqual(view.tobytes(), data)
+
+        benc = tr.bencode.loads(b'd6:peers6:\x7f\x00\x00\x01\x1a\xe1e')
+        self.assertEqual(benc['peers'], b'\x7f\x00\x00\x01\x1a\xe1')
+        self.assertEqual(benc.find('peers').raw, b'\x7f\x00\x00\x01\x1a\xe1')
+
+    def test_benc_string_export(self):
+        benc = tr.bencode.BencList(1)
+        view = benc.add_string('short').view
+        with self.assertRaises(BufferError):
+            benc.add_int(1)
+        with self.assertRaises(BufferError):
+            benc[0] = 'other'
+        with self.assertRaises(BufferError):
+            benc.extend([1])
+        self.assertEqual(view.tobytes(), b'short')
+        view.release()
+        benc.add_int(1)
+        self.assertEqual(benc.to_python(), ['short', 1])
+
+        benc = tr.bencode.from_python({'peers': b'\x7f\x00\x00\x01\x1a\xe1'})
+        with memoryview(benc.find('peers')) as view:
+            with self.assertRaises(BufferError):
+                benc['peers'] = 'none'
+            with self.assertRaises(BufferError):
+                benc.add_int('port', 6881)
+        benc['peers'] = 'none'
+        self.assertEqual(benc['peers'], 'none')
+
+    def test_benc_dict_diff(self):
+        old = tr.bencode.from_python({'port': 51413, 'ratio': 2.0, 'dir': '/tmp',
+                                      'lpd': True, 'list': [1, 2]})
+        new = tr.bencode.from_python({'port': 51414, 'ratio': 2, 'dir': '/tmp',
+                                      'lpd': 1, 'list': [1, 3], 'new': 'key'})
+        delta = old.diff(new)
+        self.assertEqual(type(delta), tr.bencode.BencDict)
+        self.assertEqual(delta.to_python(), {'port': 51414, 'list': [1, 3], 'new': 'key'})
+        self.assertEqual(len(new.diff(new)), 0)
+        with self.assertRaises(TypeError):
+            old.diff({'port': 1})
+
+    def test_benc_pickle(self):
+        with open(_torrent, 'rb') as f:
+            benc = tr.bencode.loads(f.read())
+        copy = pickle.loads(pickle.dumps(benc))
+        self.assertEqual(type(copy), tr.bencode.BencDict)
+        self.assertEqual(copy.dumps(), benc.dumps())
+
+        # bool and real nodes survive the round trip
+        benc = tr.bencode.from_python({'flag': True, 'ratio': 1.5, 'count': 1})
+        copy = pickle.loads(pickle.dumps(benc))
+        self.assertEqual(type(copy.find('flag')), tr.bencode.BencBool)
+        self.assertEqual(type(copy.find('ratio')), tr.bencode.BencReal)
+        self.assertEqual(copy.to_python(), {'flag': True, 'ratio': 1.5, 'count': 1})
+
+        copy = pickle.loads(pickle.dumps(tr.bencode.BencInt(7)))
+        self.assertEqual(type(copy), tr.bencode.BencInt)
+        self.assertEqual(copy.value, 7)
+
+    def test_benc_non_utf8_keys(self):
+        key = b'\xff\xfe'.decode('utf-8', 'surrogateescape')
+        benc = tr.bencode.loads(b'd2:\xff\xfei1ee')
+        self.assertEqual(benc.to_python(), {key: 1})
+        self.assertEqual(list(benc), [key])
+        self.assertIn(key, benc)
+        self.assertIn(b'\xff\xfe', benc)
+        self.assertEqual(benc[key], 1)
+        self.assertEqual(benc.get(key), 1)
+        self.assertEqual(benc.find(b'\xff\xfe').value, 1)
+        self.assertEqual(list(tr.bencode.iterparse(b'd2:\xff\xfei1ee'))[1],
+                         ('value', (key,), 1))
+
+        # a real value sends __reduce__ through to_python/from_python
+        benc = tr.bencode.from_python({key: 1, 'ratio': 1.5})
+        copy = pickle.loads(pickle.dumps(benc))
+        self.assertEqual(copy.to_python(), {key: 1, 'ratio': 1.5})
+        self.assertEqual(copy.dumps(), benc.dumps())
+        self.assertIn(b'2:\xff\xfei1e', copy.dumps())
+
+    def test_benc_copy(self):
+        benc = tr.bencode.from_python({'info': {'name': 'a', 'files': [1, 2]}})
+        dup = benc.copy()
+        self.assertEqual(type(dup), tr.bencode.BencDict)
+        benc['info']['name'] = 'b'
+        self.assertEqual(dup.get_path('info/name'), 'a')
+        self.assertEqual(copy.copy(benc).to_python(), benc.to_python())
+        self.assertEqual(copy.deepcopy([benc])[0].to_python(), benc.to_python())
+
+        view = benc.copy(deep=False)
+        view['extra'] = 1
+        self.assertEqual(benc['extra'], 1)
+        dup = copy.copy(benc)
+        self.assertEqual(type(dup), tr.bencode.BencDict)
+        dup['extra'] = 2
+        self.assertEqual(benc['extra'], 1)
+
+        dups = copy.deepcopy([benc, benc])
+        self.assertIs(dups[0], dups[1])
+        self.assertIsNot(dups[0], benc)
+
+    def test_benc_subtree_view(self):
+        benc = tr.bencode.from_python({'info': {'files': [{'length': 1}]}})
+        files = benc.find('info').find('files')
+        info = benc['info']
+        del benc
+        self.assertEqual(files.to_python(), [{'length': 1}])
+        self.assertEqual(info.get_path('files/0/length'), 1)
+
+        # views follow their items when the containers above them grow
+        benc = tr.bencode.from_python({'info': {'name': 'a'}, 'list': [1]})
+        info = benc['info']
+        items = benc['list']
+        for idx in range(64):
+            benc.add_int('new%d' % idx, idx)
+            items.add_int(idx)
+        info['name'] = 'b'
+        self.assertEqual(benc.get_path('info/name'), 'b')
+        self.assertEqual(items.to_python(), [1] + list(range(64)))
+        self.assertEqual(benc.get_path('list/64'), 63)
+
+        root = tr.bencode.from_python({})
+        sub = root.add_dict('a', 0)
+        root.add_int('b', 1)
+        sub.add_int('x', 1)
+        self.assertEqual(root.to_python(), {'a': {'x': 1}, 'b': 1})
+
+        # a replaced item stays with its views, the pair moved into its place too
+        benc = tr.bencode.from_python({'info': {'name': 'a'}, 'list': [1]})
+        info = benc['info']
+        items = benc['list']
+        benc['info'] = 1
+        self.assertEqual(info.to_python(), {'name': 'a'})
+        info['name'] = 'b'
+        items.add_int(2)
+        self.assertEqual(benc.to_python(), {'info': 1, 'list': [1, 2]})
+
 
 class TestSession(unittest.TestCase):
     def setUp(self):
@@ -233,6 +690,17 @@ class TestSession(unittest.TestCase):
         self.assertEqual(self.session.speed_limit_up, 50)
         self.assertEqual(self.session.speed_limit_down, 50)
 
+    def test_session_update(self):
+        settings = self.session.settings()
+        settings['alt-speed-up'] = 75
+        self.session.update(settings)
+        self.assertEqual(self.session.alt_speed_up, 75)
+
+        settings['alt-speed-up'] = 100
+        self.session.update(settings, delta_only=True)
+        self.assertEqual(self.session.alt_speed_up, 100)
+        self.assertEqual(len(self.session.settings().diff(settings)), 0)
+
 class TestTorrentConstructor(unittest.TestCase):
     def setUp(self):
         self.session = tr.Session('', tr.default_config_dir(), True, tr.default_settings())
@@ -296,9 +764,9 @@ class TestTorrentConstructor(unittest.TestCase):
         self.assertEqual(type(metainfo['info']), tr.bencode.BencDict)
         self.assertEqual(metainfo['info']['name'], 'OpenBSD_songs_mp3')
         self.assertEqual(metainfo['info']['piece length'], 262144)
-        with self.assertRaises(UnicodeDecodeError):
-            pieces = metainfo['info']['pieces']
-            self.assertEqual(pieces, None)
+        pieces = metainfo['info']['pieces']
+        self.assertEqual(type(pieces), bytes)
+        self.assertEqual(len(pieces) % 20, 0)
 
 class TestTorrent(unittest.TestCase):
     def setUp(self):
@@ -314,6 +782,149 @@ class TestTorrent(unittest.TestCase):
     def test_torrent_current_directory(self):
         self.assertEqual(self.torrent.current_directory, '')
 
+    def test_torrent_stats_fields(self):
+        stats = self.torrent.stats()
+        self.assertEqual(type(stats), tr.TorrentStats)
+        self.assertEqual(self.torrent.stats(('id', 'percentDone')), (stats.id, stats.percent_done))
+        self.assertEqual(self.torrent.stats(['size_when_done'], as_dict=True),
+                         {'size_when_done': stats.size_when_done})
+        self.assertEqual(self.torrent.stats((), as_dict=True), {})
+        self.assertIn('eta', self.torrent.stats(as_dict=True))
+        with self.assertRaises(ValueError):
+            self.torrent.stats(['rateDownload'])
+
+    def test_torrent_stats_export(self):
+        stats = self.torrent.stats()
+        self.assertEqual(len(stats._fields), len(stats.as_tuple()))
+        self.assertEqual(dict(zip(stats._fields, stats.as_tuple())), stats.as_dict())
+        self.assertEqual(stats.as_dict()['percent_done'], stats.percent_done)
+        self.assertIs(stats._fields, self.torrent.stats()._fields)
+
+        files = self.torrent.files()
+        self.assertEqual(files[0]._fields, ('bytes_completed', 'progress'))
+        self.assertEqual(files[0].as_tuple(), (files[0].bytes_completed, files[0].progress))
+
+    def test_torrent_file_progress(self):
+        files = self.torrent.files()
+        progress = self.torrent.file_progress()
+        self.assertEqual(sorted(progress), ['bytes_completed', 'progress'])
+        self.assertEqual(progress['bytes_completed'].format, 'Q')
+        self.assertTrue(progress['progress'].readonly)
+        self.assertEqual(progress['bytes_completed'].tolist(), [f.bytes_completed for f in files])
+        self.assertEqual(progress['progress'].tolist(), [f.progress for f in files])
+
+        view = progress.pop('progress')
+        del progress
+        self.assertEqual(len(view), len(files))
+
+    def test_torrent_amount_finished(self):
+        finished = self.torrent.amount_finished(100)
+        self.assertEqual(finished.format, 'f')
+        self.assertEqual(len(finished), 100)
+
+        out = array.array('f', [1.0] * 100)
+        self.assertIs(self.torrent.amount_finished(100, out=out), out)
+        self.assertEqual(out.tolist(), finished.tolist())
+        with self.assertRaises(ValueError):
+            self.torrent.amount_finished(200, out=out)
+        with self.assertRaises(ValueError):
+            self.torrent.amount_finished(-1)
+        with self.assertRaises(TypeError):
+            self.torrent.amount_finished(50, out=array.array('d', [1.0] * 100))
+        with self.assertRaises(TypeError):
+            self.torrent.amount_finished(100, out=bytearray(400))
+
+    def test_torrent_availability(self):
+        availability = self.torrent.availability(1000)
+        self.assertEqual(availability.format, 'b')
+        self.assertEqual(len(availability), 1000)
+        out = array.array('b', bytes(1000))
+        self.assertIs(self.torrent.availability(1000, out), out)
+        self.assertEqual(out.tobytes(), availability.tobytes())
+        with self.assertRaises(TypeError):
+            self.torrent.availability(1000, bytearray(1000))
+
+    def test_torrent_have_pieces(self):
+        piece_count = len(self.torrent.info.pieces)
+        bitfield = self.torrent.have_bitfield()
+        self.assertEqual(type(bitfield), bytes)
+        self.assertEqual(len(bitfield), (piece_count + 7) // 8)
+
+        runs = self.torrent.have_runs()
+        have = sum(bin(byte).count('1') for byte in bitfield)
+        self.assertEqual(sum(length for start, length in runs), have)
+        for start, length in runs:
+            self.assertTrue(bitfield[start // 8] & (0x80 >> (start % 8)))
+
+    def test_torrent_info_sequences(self):
+        info = self.torrent.info
+        pieces = info.pieces
+        self.assertEqual(len(pieces), info.piece_count)
+        self.assertEqual(type(pieces[0]), tr.FilePiece)
+        self.assertIs(pieces[0], pieces[0])
+        self.assertEqual(pieces[-1].hash, pieces[info.piece_count - 1].hash)
+        self.assertEqual([p.hash for p in pieces[:3]], [pieces[i].hash for i in range(3)])
+        with self.assertRaises(IndexError):
+            pieces[info.piece_count]
+
+        files = info.files
+        self.assertEqual(len(files), info.file_count)
+        self.assertEqual([f.name for f in files], [files[i].name for i in range(info.file_count)])
+        self.assertEqual(len(files[::2]), (info.file_count + 1) // 2)
+
+    def test_torrent_stats_all(self):
+        stats = self.torrent.stats()
+        everything = self.session.stats_all()
+        self.assertEqual(list(everything), [stats.id])
+        self.assertEqual(everything[stats.id]['size_when_done'], stats.size_when_done)
+        self.assertEqual(everything[stats.id]['error_string'], stats.error_string)
+
+        subset = self.session.stats_all(fields=['percentDone', 'eta'])
+        self.assertEqual(sorted(subset[stats.id]), ['eta', 'percent_done'])
+        subset = self.session.stats_all(fields=['percentDone', 'eta'], as_dict=False)
+        self.assertEqual(subset[stats.id], (stats.percent_done, stats.eta))
+        with self.assertRaises(ValueError):
+            self.session.stats_all(fields=['missing'])
+        with self.assertRaises(TypeError):
+            self.session.stats_all(fields='eta')
+
+    def test_torrent_peers_all(self):
+        peers = self.session.peers_all()
+        self.assertEqual(peers['torrent_id'].format, 'i')
+        self.assertEqual(len(peers['torrent_id']), sum(len(t.peers()) for t in self.session.torrents()))
+        self.assertEqual(peers['address'], [peer.address for peer in self.torrent.peers()])
+        self.assertEqual(sorted(self.session.peers_all(['progress', 'isSeed'])),
+                         ['is_seed', 'progress', 'torrent_id'])
+
+    def test_torrent_changed_since(self):
+        torrent_id = self.torrent.stats().id
+        changed, token = self.session.changed_since()
+        self.assertEqual(list(changed), [torrent_id])
+        self.assertNotIn('seconds_seeding', changed[torrent_id])
+
+        changed, token = self.session.changed_since(token, fields=['id', 'error'])
+        self.assertEqual(list(changed), [torrent_id])
+        changed, token = self.session.changed_since(token, fields=['id', 'error'])
+        self.assertEqual(changed, {})
+
+        changed, token = self.session.changed_since(token[:0], fields=['id', 'error'])
+        self.assertEqual(list(changed), [torrent_id])
+        with self.assertRaises(ValueError):
+            self.session.changed_since(b'bogus')
+
+    def test_torrent_stats_columns(self):
+        stats = self.torrent.stats()
+        columns = self.session.stats_columns(['id', 'ratio', 'size_when_done', 'start_date',
+                                              'error_string'])
+        self.assertEqual(columns['id'].format, 'i')
+        self.assertEqual(columns['id'].tolist(), [stats.id])
+        self.assertEqual(array.array('Q', columns['size_when_done'].tobytes()).tolist(),
+                         [stats.size_when_done])
+        self.assertEqual(columns['ratio'].format, 'f')
+        self.assertEqual(columns['start_date'].format, 'q')
+        self.assertEqual(columns['error_string'], [stats.error_string])
+        self.assertEqual(len(self.session.stats_columns()), len(self.session.stats_all()[stats.id]))
+
 
 if __name__ == '__main__':
     unittest.main()
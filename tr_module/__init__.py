@@ -27,6 +27,7 @@ from pybindgen.module import SubModule, MultiSectionFactory
 from pybindgen import Module, FileCodeSink, ReturnValue, param, cppclass, typehandlers
 
 from . import typedefs
+from . import fields
 from . import tr_benc
 from . import tr_info
 from . import tr_session
@@ -101,7 +102,13 @@ def module_init():
     root_module = Module('transmission')
     root_module.add_include('"transmission.h"')
     root_module.add_include('"bencode.h"')
+    root_module.add_include('"json.h"')
     root_module.add_include('"utils.h"')
+    root_module.add_include('<event2/buffer.h>')
+    root_module.add_include('<fcntl.h>')
+    root_module.add_include('<sys/mman.h>')
+    root_module.add_include('<sys/stat.h>')
+    root_module.add_include('<unistd.h>')
     #root_module.add_include('<datetime.h>')
 
     root_module.before_init.write_code('''/* init some stuff... */
@@ -412,6 +419,7 @@ def register_types(module):
     typehandlers.add_type_alias('uint16_t', 'tr_port')
 
 def register_methods(root_module):
+    fields.register_methods(root_module)
     tr_benc.register_methods(root_module)
     tr_info.register_methods(root_module)
     tr_session.register_methods(root_module)
@@ -570,5 +578,7 @@ def register_functions(root_module):
                                   "    mb (str): Megabytes string representation\\n"
                                   "    gb (str): Gigabytes string representation\\n"
                                   "    tb (str): Terabytes string representation\\n")
+
+    tr_benc.register_functions(root_module)
     return
 
@@ -0,0 +1,499 @@
+##
+## Copyright (c) 2012 Dan Eicher
+##
+## Permission is hereby granted, free of charge, to any person obtaining a
+## copy of this software and associated documentation files (the "Software"),
+## to deal in the Software without restriction, including without limitation
+## the rights to use, copy, modify, merge, publish, distribute, sublicense,
+## and/or sell copies of the Software, and to permit persons to whom the
+## Software is furnished to do so, subject to the following conditions:
+##
+## The above copyright notice and this permission notice shall be included in
+## all copies or substantial portions of the Software.
+##
+## THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+## IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+## FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+## AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+## LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+## FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+## DEALINGS IN THE SOFTWARE.
+##
+
+from .typedefs import PyObjectReturn
+
+# ctype of a struct member -> how the field tables read it
+FIELD_KINDS = {
+    'int': '_WRAP_FIELD_INT',
+    'tr_torrent_activity': '_WRAP_FIELD_INT',
+    'tr_stat_errtype': '_WRAP_FIELD_INT',
+    'time_t': '_WRAP_FIELD_TIME',
+    'uint8_t': '_WRAP_FIELD_UINT8',
+    'tr_port': '_WRAP_FIELD_UINT16',
+    'uint32_t': '_WRAP_FIELD_UINT32',
+    'uint64_t': '_WRAP_FIELD_UINT64',
+    'float': '_WRAP_FIELD_FLOAT',
+    'double': '_WRAP_FIELD_DOUBLE',
+    'bool': '_WRAP_FIELD_BOOL',
+    'char *': '_WRAP_FIELD_CHARS',  # char arrays embedded in the struct
+}
+
+def register_methods(root_module):
+    root_module.header.writeln("""
+typedef enum {
+    _WRAP_FIELD_INT,
+    _WRAP_FIELD_TIME,
+    _WRAP_FIELD_UINT8,
+    _WRAP_FIELD_UINT16,
+    _WRAP_FIELD_UINT32,
+    _WRAP_FIELD_UINT64,
+    _WRAP_FIELD_FLOAT,
+    _WRAP_FIELD_DOUBLE,
+    _WRAP_FIELD_BOOL,
+    _WRAP_FIELD_CHARS
+} _wrap_field_kind;
+
+typedef struct {
+    const char *name;    /* attribute name on the wrapper */
+    const char *c_name;  /* struct member name */
+    size_t offset;
+    _wrap_field_kind kind;
+} _wrap_field;
+
+typedef struct {
+    const char *type_name;
+    const _wrap_field *fields;
+    Py_ssize_t count;
+    PyObject *keys;         /* interned field names, built on first use */
+    PyObject *projections;  /* fields argument -> compiled index table */
+} _wrap_field_table;
+
+PyObject *_wrap_field_ToPython(const _wrap_field *field, const void *base);
+PyObject *_wrap_field_Keys(_wrap_field_table *table);
+PyObject *_wrap_field_Column(const _wrap_field *field, const void *base, size_t stride, size_t count);
+int _wrap_PyFieldView_Ready(void);
+PyObject *_wrap_field_View(const _wrap_field *field, void *base, size_t stride, size_t count, PyObject *owner);
+PyObject *_wrap_field_Compile(_wrap_field_table *table, PyObject *py_fields);
+uint64_t _wrap_field_Hash(const _wrap_field_table *table, PyObject *projection, const void *base);
+PyObject *_wrap_field_AsTuple(_wrap_field_table *table, PyObject *projection, const void *base);
+PyObject *_wrap_field_AsDict(_wrap_field_table *table, PyObject *projection, const void *base);
+""")
+    root_module.after_init.write_error_check('_wrap_PyFieldView_Ready() < 0')
+    root_module.header.writeln("#define _WRAP_FIELD_PROJECTION_MAX 64")
+    root_module.header.writeln("#define _wrap_field_Indices(p) ((const Py_ssize_t *) PyBytes_AS_STRING(p))")
+    root_module.header.writeln("#define _wrap_field_Count(p) (PyBytes_GET_SIZE(p) / (Py_ssize_t) sizeof(Py_ssize_t))")
+
+    root_module.body.writeln("""
+PyObject *_wrap_field_ToPython(const _wrap_field *field, const void *base)
+{
+    const char *ptr = (const char *) base + field->offset;
+
+    switch (field->kind) {
+    case _WRAP_FIELD_INT:
+        return PyLong_FromLong(*(const int *) ptr);
+    case _WRAP_FIELD_TIME:
+        return PyLong_FromLongLong((long long) *(const time_t *) ptr);
+    case _WRAP_FIELD_UINT8:
+        return PyLong_FromUnsignedLong(*(const uint8_t *) ptr);
+    case _WRAP_FIELD_UINT16:
+        return PyLong_FromUnsignedLong(*(const uint16_t *) ptr);
+    case _WRAP_FIELD_UINT32:
+        return PyLong_FromUnsignedLong(*(const uint32_t *) ptr);
+    case _WRAP_FIELD_UINT64:
+        return PyLong_FromUnsignedLongLong(*(const uint64_t *) ptr);
+    case _WRAP_FIELD_FLOAT:
+        return PyFloat_FromDouble(*(const float *) ptr);
+    case _WRAP_FIELD_DOUBLE:
+        return PyFloat_FromDouble(*(const double *) ptr);
+    case _WRAP_FIELD_BOOL:
+        return PyBool_FromLong(*(const bool *) ptr);
+    case _WRAP_FIELD_CHARS:
+        return PyUnicode_DecodeUTF8(ptr, strlen(ptr), "replace");
+    }
+    PyErr_SetString(PyExc_SystemError, "unknown field kind");
+    return NULL;
+}
+
+/* Gather one field from `count` structs laid out `stride` bytes apart into a
+ * memoryview of the matching struct format; char fields become a list. */
+PyObject *_wrap_field_Column(const _wrap_field *field, const void *base, size_t stride, size_t count)
+{
+    /* base may be NULL when there are no structs at all */
+    const char *src = count ? (const char *) base + field->offset : NULL;
+    const char *format;
+    size_t idx, itemsize;
+    PyObject *py_bytes, *py_view, *py_column;
+    char *dst;
+
+    switch (field->kind) {
+    case _WRAP_FIELD_INT:    format = "i"; itemsize = sizeof(int); break;
+    case _WRAP_FIELD_TIME:   format = "q"; itemsize = sizeof(int64_t); break;
+    case _WRAP_FIELD_UINT8:  format = "B"; itemsize = sizeof(uint8_t); break;
+    case _WRAP_FIELD_UINT16: format = "H"; itemsize = sizeof(uint16_t); break;
+    case _WRAP_FIELD_UINT32: format = "I"; itemsize = sizeof(uint32_t); break;
+    case _WRAP_FIELD_UINT64: format = "Q"; itemsize = sizeof(uint64_t); break;
+    case _WRAP_FIELD_FLOAT:  format = "f"; itemsize = sizeof(float); break;
+    case _WRAP_FIELD_DOUBLE: format = "d"; itemsize = sizeof(double); break;
+    case _WRAP_FIELD_BOOL:   format = "?"; itemsize = sizeof(bool); break;
+    default: {
+        PyObject *py_list = PyList_New(count);
+        for (idx = 0; py_list && idx < count; ++idx, src += stride) {
+            PyObject *py_value = PyUnicode_DecodeUTF8(src, strlen(src), "replace");
+            if (py_value == NULL)
+                Py_CLEAR(py_list);
+            else
+                PyList_SET_ITEM(py_list, idx, py_value);
+        }
+        return py_list;
+    }
+    }
+
+    if ((py_bytes = PyByteArray_FromStringAndSize(NULL, count * itemsize)) == NULL)
+        return NULL;
+    dst = PyByteArray_AS_STRING(py_bytes);
+    if (count == 0)
+        goto cast;
+
+    Py_BEGIN_ALLOW_THREADS
+    if (field->kind == _WRAP_FIELD_TIME) {
+        for (idx = 0; idx < count; ++idx, src += stride, dst += itemsize) {
+            int64_t value = *(const time_t *) src;
+            memcpy(dst, &value, itemsize);
+        }
+    }
+    else {
+        for (idx = 0; idx < count; ++idx, src += stride, dst += itemsize)
+            memcpy(dst, src, itemsize);
+    }
+    Py_END_ALLOW_THREADS
+
+cast:
+    py_view = PyMemoryView_FromObject(py_bytes);
+    Py_DECREF(py_bytes);
+    if (py_view == NULL)
+        return NULL;
+    py_column = PyObject_CallMethod(py_view, (char *) "cast", (char *) "s", format);
+    Py_DECREF(py_view);
+    return py_column;
+}
+
+typedef struct {
+    PyObject_HEAD
+    PyObject *owner;  /* keeps the struct array alive */
+    char *buf;
+    Py_ssize_t shape;
+    Py_ssize_t strides;
+    Py_ssize_t itemsize;
+    const char *format;
+} PyFieldView;
+
+static PyTypeObject *PyFieldView_Type;
+
+static int
+_wrap_PyFieldView_GetBuffer(PyFieldView *self, Py_buffer *view, int flags)
+{
+    view->obj = NULL;
+    if (flags & PyBUF_WRITABLE) {
+        PyErr_SetString(PyExc_BufferError, "field views are read-only");
+        return -1;
+    }
+    if ((flags & PyBUF_STRIDES) != PyBUF_STRIDES && self->strides != self->itemsize) {
+        PyErr_SetString(PyExc_BufferError, "field view is not contiguous");
+        return -1;
+    }
+
+    Py_INCREF(self);
+    view->obj = (PyObject *) self;
+    view->buf = self->buf;
+    view->len = self->shape * self->itemsize;
+    view->readonly = 1;
+    view->itemsize = self->itemsize;
+    view->format = (flags & PyBUF_FORMAT) ? (char *) self->format : NULL;
+    view->ndim = 1;
+    view->shape = (flags & PyBUF_ND) ? &self->shape : NULL;
+    view->strides = (flags & PyBUF_STRIDES) == PyBUF_STRIDES ? &self->strides : NULL;
+    view->suboffsets = NULL;
+    view->internal = NULL;
+    return 0;
+}
+
+static void
+_wrap_PyFieldView_Dealloc(PyFieldView *self)
+{
+    Py_XDECREF(self->owner);
+    PyObject_Del(self);
+}
+
+/* a static type like BencString, Py_bf_getbuffer in a PyType_Spec needs 3.9 */
+static PyBufferProcs _wrap_PyFieldView_BufferProcs = {
+    (getbufferproc) _wrap_PyFieldView_GetBuffer,
+    NULL
+};
+
+static PyTypeObject _wrap_PyFieldView_TypeObject = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "transmission.FieldView",
+    sizeof(PyFieldView),
+};
+
+int _wrap_PyFieldView_Ready(void)
+{
+    _wrap_PyFieldView_TypeObject.tp_dealloc = (destructor) _wrap_PyFieldView_Dealloc;
+    _wrap_PyFieldView_TypeObject.tp_as_buffer = &_wrap_PyFieldView_BufferProcs;
+    _wrap_PyFieldView_TypeObject.tp_flags = Py_TPFLAGS_DEFAULT;
+    if (PyType_Ready(&_wrap_PyFieldView_TypeObject) < 0)
+        return -1;
+    PyFieldView_Type = &_wrap_PyFieldView_TypeObject;
+    return 0;
+}
+
+/* Strided read-only memoryview of one field across `count` structs in place,
+ * `owner` is whatever frees them. */
+PyObject *_wrap_field_View(const _wrap_field *field, void *base, size_t stride, size_t count, PyObject *owner)
+{
+    PyFieldView *self;
+    PyObject *py_view;
+    const char *format;
+    size_t itemsize;
+
+    switch (field->kind) {
+    case _WRAP_FIELD_INT:    format = "i"; itemsize = sizeof(int); break;
+    case _WRAP_FIELD_UINT8:  format = "B"; itemsize = sizeof(uint8_t); break;
+    case _WRAP_FIELD_UINT16: format = "H"; itemsize = sizeof(uint16_t); break;
+    case _WRAP_FIELD_UINT32: format = "I"; itemsize = sizeof(uint32_t); break;
+    case _WRAP_FIELD_UINT64: format = "Q"; itemsize = sizeof(uint64_t); break;
+    case _WRAP_FIELD_FLOAT:  format = "f"; itemsize = sizeof(float); break;
+    case _WRAP_FIELD_DOUBLE: format = "d"; itemsize = sizeof(double); break;
+    case _WRAP_FIELD_BOOL:   format = "?"; itemsize = sizeof(bool); break;
+    default:
+        PyErr_Format(PyExc_TypeError, "field '%s' has no buffer format", field->name);
+        return NULL;
+    }
+
+    if ((self = (PyFieldView *)PyType_GenericAlloc(PyFieldView_Type, 0)) == NULL)
+        return NULL;
+    Py_INCREF(owner);
+    self->owner = owner;
+    self->buf = count ? (char *) base + field->offset : NULL;
+    self->shape = count;
+    self->strides = stride;
+    self->itemsize = itemsize;
+    self->format = format;
+
+    py_view = PyMemoryView_FromObject((PyObject *) self);
+    Py_DECREF(self);
+    return py_view;
+}
+
+/* FNV-1a over the raw bytes of the projected fields, safe without the GIL */
+uint64_t _wrap_field_Hash(const _wrap_field_table *table, PyObject *projection, const void *base)
+{
+    const Py_ssize_t *indices = _wrap_field_Indices(projection);
+    Py_ssize_t idx, count = _wrap_field_Count(projection);
+    uint64_t hash = 14695981039346656037ULL;
+
+    for (idx = 0; idx < count; ++idx) {
+        const _wrap_field *field = &table->fields[indices[idx]];
+        const unsigned char *ptr = (const unsigned char *) base + field->offset;
+        size_t pos, size;
+
+        switch (field->kind) {
+        case _WRAP_FIELD_INT:    size = sizeof(int); break;
+        case _WRAP_FIELD_TIME:   size = sizeof(time_t); break;
+        case _WRAP_FIELD_UINT8:  size = sizeof(uint8_t); break;
+        case _WRAP_FIELD_UINT16: size = sizeof(uint16_t); break;
+        case _WRAP_FIELD_UINT32: size = sizeof(uint32_t); break;
+        case _WRAP_FIELD_UINT64: size = sizeof(uint64_t); break;
+        case _WRAP_FIELD_FLOAT:  size = sizeof(float); break;
+        case _WRAP_FIELD_DOUBLE: size = sizeof(double); break;
+        case _WRAP_FIELD_BOOL:   size = sizeof(bool); break;
+        default:                 size = strlen((const char *) ptr) + 1; break;
+        }
+        for (pos = 0; pos < size; ++pos)
+            hash = (hash ^ ptr[pos]) * 1099511628211ULL;
+    }
+    return hash;
+}
+
+/* Resolve a sequence of field names (attribute or struct member names) into
+ * a bytes object of table indices; None selects every field. */
+PyObject *_wrap_field_Compile(_wrap_field_table *table, PyObject *py_fields)
+{
+    PyObject *py_key, *projection;
+    Py_ssize_t *indices;
+    Py_ssize_t idx, count;
+
+    if (table->projections == NULL && (table->projections = PyDict_New()) == NULL)
+        return NULL;
+
+    if (py_fields == Py_None) {
+        Py_INCREF(Py_None);
+        py_key = Py_None;
+    }
+    else if (PyUnicode_Check(py_fields) || PyBytes_Check(py_fields)) {
+        PyErr_SetString(PyExc_TypeError, "fields must be a sequence of field names");
+        return NULL;
+    }
+    else if ((py_key = PySequence_Tuple(py_fields)) == NULL)
+        return NULL;
+
+    if ((projection = PyDict_GetItem(table->projections, py_key)) != NULL) {
+        Py_DECREF(py_key);
+        Py_INCREF(projection);
+        return projection;
+    }
+
+    count = py_key == Py_None ? table->count : PyTuple_GET_SIZE(py_key);
+    if ((projection = PyBytes_FromStringAndSize(NULL, count * sizeof(Py_ssize_t))) == NULL) {
+        Py_DECREF(py_key);
+        return NULL;
+    }
+    indices = (Py_ssize_t *) PyBytes_AS_STRING(projection);
+
+    for (idx = 0; idx < count; ++idx) {
+        PyObject *py_name;
+        const char *name;
+        Py_ssize_t pos;
+
+        if (py_key == Py_None) {
+            indices[idx] = idx;
+            continue;
+        }
+        py_name = PyTuple_GET_ITEM(py_key, idx);
+        if ((name = PyUnicode_AsUTF8(py_name)) == NULL)
+            goto error;
+        for (pos = 0; pos < table->count; ++pos)
+            if (!strcmp(name, table->fields[pos].name) || !strcmp(name, table->fields[pos].c_name))
+                break;
+        if (pos == table->count) {
+            PyErr_Format(PyExc_ValueError, "unknown %s field '%s'", table->type_name, name);
+            goto error;
+        }
+        indices[idx] = pos;
+    }
+
+    /* callers poll with a handful of fixed field sets */
+    if (PyDict_Size(table->projections) >= _WRAP_FIELD_PROJECTION_MAX)
+        PyDict_Clear(table->projections);
+    if (PyDict_SetItem(table->projections, py_key, projection) < 0)
+        goto error;
+    Py_DECREF(py_key);
+    return projection;
+
+error:
+    Py_DECREF(py_key);
+    Py_DECREF(projection);
+    return NULL;
+}
+
+/* borrowed reference */
+PyObject *_wrap_field_Keys(_wrap_field_table *table)
+{
+    Py_ssize_t idx;
+
+    if (table->keys != NULL)
+        return table->keys;
+    if ((table->keys = PyTuple_New(table->count)) == NULL)
+        return NULL;
+    for (idx = 0; idx < table->count; ++idx) {
+        PyObject *py_name = PyUnicode_InternFromString(table->fields[idx].name);
+        if (py_name == NULL) {
+            Py_CLEAR(table->keys);
+            return NULL;
+        }
+        PyTuple_SET_ITEM(table->keys, idx, py_name);
+    }
+    return table->keys;
+}
+
+PyObject *_wrap_field_AsTuple(_wrap_field_table *table, PyObject *projection, const void *base)
+{
+    const Py_ssize_t *indices = _wrap_field_Indices(projection);
+    Py_ssize_t idx, count = _wrap_field_Count(projection);
+    PyObject *py_tuple;
+
+    if ((py_tuple = PyTuple_New(count)) == NULL)
+        return NULL;
+    for (idx = 0; idx < count; ++idx) {
+        PyObject *py_value = _wrap_field_ToPython(&table->fields[indices[idx]], base);
+        if (py_value == NULL) {
+            Py_DECREF(py_tuple);
+            return NULL;
+        }
+        PyTuple_SET_ITEM(py_tuple, idx, py_value);
+    }
+    return py_tuple;
+}
+
+PyObject *_wrap_field_AsDict(_wrap_field_table *table, PyObject *projection, const void *base)
+{
+    const Py_ssize_t *indices = _wrap_field_Indices(projection);
+    Py_ssize_t idx, count = _wrap_field_Count(projection);
+    PyObject *py_keys, *py_dict;
+
+    if ((py_keys = _wrap_field_Keys(table)) == NULL || (py_dict = PyDict_New()) == NULL)
+        return NULL;
+    for (idx = 0; idx < count; ++idx) {
+        PyObject *py_value = _wrap_field_ToPython(&table->fields[indices[idx]], base);
+        if (py_value == NULL || PyDict_SetItem(py_dict, PyTuple_GET_ITEM(py_keys, indices[idx]), py_value) < 0) {
+            Py_XDECREF(py_value);
+            Py_DECREF(py_dict);
+            return NULL;
+        }
+        Py_DECREF(py_value);
+    }
+    return py_dict;
+}
+""")
+    return
+
+def register_field_table(root_module, cls, struct, type_name, fields):
+    """Bind scalar struct members as read-only attributes, emit a matching
+    _wrap_<struct>_fields table and add the bulk as_tuple()/as_dict()
+    methods and `_fields` attribute over it.
+
+    `fields` is a list of (member, ctype, attribute name) tuples.
+    """
+    entries = []
+    for c_name, ctype, name in fields:
+        cls.add_instance_attribute(c_name, ctype, is_const=True, custom_name=name)
+        entries.append('    {"%s", "%s", offsetof(%s, %s), %s},'
+                       % (name, c_name, struct, c_name, FIELD_KINDS[ctype]))
+
+    root_module.header.writeln("extern _wrap_field_table _wrap_%s_fields;" % struct)
+    root_module.body.writeln("static const _wrap_field _wrap_%s_field_list[] = {\n%s\n};\n"
+                             "_wrap_field_table _wrap_%s_fields = {\"%s\", _wrap_%s_field_list,\n"
+                             "    sizeof(_wrap_%s_field_list) / sizeof(_wrap_field), NULL, NULL};"
+                             % (struct, '\n'.join(entries), struct, type_name, struct, struct))
+
+    getter = '_wrap_%s_GetFields' % struct
+    root_module.header.writeln("PyObject *%s(const %s *obj);" % (getter, struct))
+    root_module.body.writeln("""
+PyObject *%(getter)s(const %(struct)s *obj)
+{
+    PyObject *py_keys = _wrap_field_Keys(&_wrap_%(struct)s_fields);
+    Py_XINCREF(py_keys);
+    return py_keys;
+}
+""" % dict(getter=getter, struct=struct))
+    cls.add_instance_attribute('_fields', PyObjectReturn('PyObject *'),
+                               is_const=True,
+                               is_pure_c=True,
+                               getter=getter)
+
+    for method, convert in (('as_tuple', '_wrap_field_AsTuple'), ('as_dict', '_wrap_field_AsDict')):
+        wrapper = '_wrap_%s_%s' % (struct, method)
+        cls.add_custom_method_wrapper(method, wrapper,
+                                      flags=["METH_NOARGS"],
+                                      wrapper_body="""
+static PyObject* %(wrapper)s(Py%(cls)s *self, PyObject **return_exception)
+{
+    PyObject *projection, *py_retval;
+
+    if ((projection = _wrap_field_Compile(&_wrap_%(struct)s_fields, Py_None)) == NULL)
+        return NULL;
+    py_retval = %(convert)s(&_wrap_%(struct)s_fields, projection, self->obj);
+    Py_DECREF(projection);
+    return py_retval;
+}
+""" % dict(wrapper=wrapper, cls=struct[0].upper() + struct[1:], struct=struct, convert=convert))
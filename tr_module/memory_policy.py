@@ -55,10 +55,13 @@ class BencMemoryPolicy(MemoryPolicy):
         return ("if (self->obj) {\n"
                 "    tr_benc *tmp = self->obj;\n"
                 "    self->obj = NULL;\n"
+                "    _wrap_PyBenc_DropIndex((PyObject *) self);\n"
                 "    if (!(self->flags & PYBINDGEN_WRAPPER_FLAG_OBJECT_NOT_OWNED)) {\n"
                 "        tr_bencFree(tmp);\n"
                 "        tr_free(tmp);\n"
                 "    }\n"
+                "    else\n"
+                "        _wrap_PyBenc_ClearOwner((PyObject *) self);\n"
                 "}")
 
     def get_pointer_type(self, class_full_name):
@@ -22,7 +22,15 @@
 
 from pybindgen import ReturnValue, param, retval
 
-from .typedefs import (BencValueReturn, BencOutParam, CharPtrLenParam)
+from .typedefs import (BencValueReturn, BencRawReturn, BencOutParam, CharPtrLenParam)
+
+## suffix, value type and node type of the tr_bencListAdd*() and tr_bencDictAdd*() functions
+BENC_ADD_TYPES = (('Bool', 'bool', 'TR_TYPE_BOOL'),
+                  ('Int', 'int64_t', 'TR_TYPE_INT'),
+                  ('Real', 'double', 'TR_TYPE_REAL'),
+                  ('Str', 'const char *', 'TR_TYPE_STR'),
+                  ('Dict', 'size_t', 'TR_TYPE_DICT'),
+                  ('List', 'size_t', 'TR_TYPE_LIST'))
 
 def register_methods(root_module):
     register_Tr_benc_methods(root_module, root_module['Benc'])
@@ -33,28 +41,2277 @@ def register_methods(root_module):
     register_Tr_benc_list_methods(root_module, root_module['BencList'])
     register_Tr_benc_dict_methods(root_module, root_module['BencDict'])
 
-def register_Tr_benc_methods(root_module, cls):
-    root_module.header.writeln("tr_benc *_wrap_tr_bencGetValue(tr_benc * benc);")
-    root_module.body.writeln("tr_benc *_wrap_tr_bencGetValue(tr_benc * benc)\n"
-                             "{\n"
-                             "    if (!benc || tr_bencIsList(benc) || tr_bencIsDict(benc))\n"
-                             "        return NULL;\n"
-                             "    return benc;\n"
-                             "}")
+def register_functions(root_module):
+    submodule = root_module.get_submodule('bencode')
+
+    # pickle looks up loads() and the Benc types by their module name
+    submodule.after_init.write_error_check(
+        'PyDict_SetItemString(PyImport_GetModuleDict(), "transmission.bencode", m) < 0')
+
+    root_module.header.writeln("int _wrap_PyBenc_RegisterABCs(void);")
+    root_module.body.writeln("""
+static int
+_wrap_PyBenc_RegisterABC(PyObject *abc, const char *name, PyTypeObject *type)
+{
+    PyObject *base, *ret;
+
+    if ((base = PyObject_GetAttrString(abc, name)) == NULL)
+        return -1;
+    ret = PyObject_CallMethod(base, (char *) "register", (char *) "O", (PyObject *) type);
+    Py_DECREF(base);
+    if (ret == NULL)
+        return -1;
+    Py_DECREF(ret);
+    return 0;
+}
+
+int _wrap_PyBenc_RegisterABCs(void)
+{
+    PyObject *abc;
+    int ret = -1;
+
+    if ((abc = PyImport_ImportModule("collections.abc")) == NULL)
+        return -1;
+    if (_wrap_PyBenc_RegisterABC(abc, "Mapping", &PyBencDict_Type) == 0 &&
+        _wrap_PyBenc_RegisterABC(abc, "Sequence", &PyBencList_Type) == 0)
+        ret = 0;
+    Py_DECREF(abc);
+    return ret;
+}
+""")
+    # cleanup code is flushed after the class registrations, the first point
+    # of the init function where the Benc types are ready
+    submodule.after_init.add_cleanup_code(
+        'if (!PyErr_Occurred() && _wrap_PyBenc_RegisterABCs() < 0)\n'
+        '    return NULL;')
+
+    root_module.header.writeln("int _wrap_tr_bencFromPython(tr_benc *benc, PyObject *py_obj, bool reserve);")
+    root_module.body.writeln("""
+int _wrap_tr_bencFromPython(tr_benc *benc, PyObject *py_obj, bool reserve)
+{
+    int ret = 0;
+
+    if (PyBool_Check(py_obj)) {
+        tr_bencInitBool(benc, py_obj == Py_True);
+    }
+    else if (PyLong_Check(py_obj)) {
+        int64_t value = PyLong_AsLongLong(py_obj);
+        if (value == -1 && PyErr_Occurred())
+            return -1;
+        tr_bencInitInt(benc, value);
+    }
+    else if (PyFloat_Check(py_obj)) {
+        tr_bencInitReal(benc, PyFloat_AS_DOUBLE(py_obj));
+    }
+    else if (PyUnicode_Check(py_obj)) {
+        Py_ssize_t len;
+        const char *value = PyUnicode_AsUTF8AndSize(py_obj, &len);
+        if (value == NULL)
+            return -1;
+        tr_bencInitRaw(benc, value, len);
+    }
+    else if (PyBytes_Check(py_obj)) {
+        tr_bencInitRaw(benc, PyBytes_AS_STRING(py_obj), PyBytes_GET_SIZE(py_obj));
+    }
+    else if (PyDict_Check(py_obj)) {
+        PyObject *py_key, *py_val;
+        Py_ssize_t pos = 0;
+
+        if (Py_EnterRecursiveCall((char *) " while converting a dict"))
+            return -1;
+        tr_bencInitDict(benc, reserve ? PyDict_Size(py_obj) : 0);
+        while (ret == 0 && PyDict_Next(py_obj, &pos, &py_key, &py_val)) {
+            PyObject *keep;
+            const char *key;
+            if (!PyUnicode_Check(py_key)) {
+                PyErr_Format(PyExc_TypeError, "BencDict keys must be str, not '%.200s'",
+                             Py_TYPE(py_key)->tp_name);
+                ret = -1;
+            }
+            else if ((key = _wrap_tr_bencKeyFromPython(py_key, &keep)) == NULL) {
+                ret = -1;
+            }
+            else {
+                ret = _wrap_tr_bencFromPython(tr_bencDictAdd(benc, key), py_val, reserve);
+                Py_XDECREF(keep);
+            }
+        }
+        Py_LeaveRecursiveCall();
+    }
+    else if (PyList_Check(py_obj) || PyTuple_Check(py_obj)) {
+        Py_ssize_t idx, count = PySequence_Fast_GET_SIZE(py_obj);
+
+        if (Py_EnterRecursiveCall((char *) " while converting a list"))
+            return -1;
+        tr_bencInitList(benc, reserve ? count : 0);
+        for (idx = 0; ret == 0 && idx < count; ++idx) {
+            ret = _wrap_tr_bencFromPython(tr_bencListAdd(benc),
+                                          PySequence_Fast_GET_ITEM(py_obj, idx), reserve);
+        }
+        Py_LeaveRecursiveCall();
+    }
+    else {
+        PyErr_Format(PyExc_TypeError, "unable to convert '%.200s' to Benc",
+                     Py_TYPE(py_obj)->tp_name);
+        ret = -1;
+    }
+    return ret;
+}
+""")
+
+    submodule.add_custom_function_wrapper('from_python',
+                                          '_wrap_transmission_bencode_from_python',
+                                          wrapper_body="""
+PyObject *
+_wrap_transmission_bencode_from_python(PyObject *self, PyObject *args,
+                                       PyObject *kwargs, PyObject **return_exception)
+{
+    PyObject *py_obj;
+    PyObject *exc_type, *traceback;
+    tr_benc *benc;
+    int reserve = 1;
+    const char *keywords[] = {"obj", "reserve", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "O|p", (char **) keywords, &py_obj, &reserve)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+
+    benc = tr_new0(tr_benc, 1);
+    if (_wrap_tr_bencFromPython(benc, py_obj, reserve) < 0) {
+        tr_bencFree(benc);
+        tr_free(benc);
+        return NULL;
+    }
+    return _wrap_PyBenc_New(benc, PYBINDGEN_WRAPPER_FLAG_NONE);
+}""")
+
+    root_module.header.writeln("PyObject *_wrap_tr_bencParse(const void *buf, size_t len, tr_fmt_mode mode);")
+    root_module.body.writeln("""
+PyObject *_wrap_tr_bencParse(const void *buf, size_t len, tr_fmt_mode mode)
+{
+    int err;
+    tr_benc *benc = tr_new0(tr_benc, 1);
+
+    Py_BEGIN_ALLOW_THREADS
+    if (mode == TR_FMT_BENC)
+        err = tr_bencLoad(buf, len, benc, NULL);
+    else
+        err = tr_jsonParse(NULL, buf, len, benc, NULL);
+    Py_END_ALLOW_THREADS
+
+    if (err) {
+        /* the parsers leave whatever they built so far in benc */
+        tr_bencFree(benc);
+        tr_free(benc);
+        PyErr_Format(PyExc_ValueError, "unable to parse %s data",
+                     mode == TR_FMT_BENC ? "bencoded" : "JSON");
+        return NULL;
+    }
+    return _wrap_PyBenc_New(benc, PYBINDGEN_WRAPPER_FLAG_NONE);
+}
+""")
+
+    submodule.add_custom_function_wrapper('loads',
+                                          '_wrap_transmission_bencode_loads',
+                                          wrapper_body="""
+PyObject *
+_wrap_transmission_bencode_loads(PyObject *self, PyObject *args,
+                                 PyObject *kwargs, PyObject **return_exception)
+{
+    PyObject *py_retval;
+    PyObject *exc_type, *traceback;
+    Py_buffer buffer;
+    int mode = TR_FMT_BENC;
+    const char *keywords[] = {"buffer", "mode", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "y*|i", (char **) keywords, &buffer, &mode)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+
+    if (mode != TR_FMT_BENC && mode != TR_FMT_JSON && mode != TR_FMT_JSON_LEAN) {
+        PyBuffer_Release(&buffer);
+        PyErr_SetString(PyExc_ValueError, "must be a 'transmission.benc_serialization_mode' value");
+        return NULL;
+    }
+
+    py_retval = _wrap_tr_bencParse(buffer.buf, buffer.len, (tr_fmt_mode)mode);
+    PyBuffer_Release(&buffer);
+    return py_retval;
+}""")
+
+    submodule.add_custom_function_wrapper('load_mmap',
+                                          '_wrap_transmission_bencode_load_mmap',
+                                          wrapper_body="""
+PyObject *
+_wrap_transmission_bencode_load_mmap(PyObject *self, PyObject *args,
+                                     PyObject *kwargs, PyObject **return_exception)
+{
+    PyObject *py_retval;
+    PyObject *exc_type, *traceback;
+    PyObject *py_path;
+    struct stat st;
+    void *map;
+    int fd;
+    int mode = TR_FMT_BENC;
+    const char *keywords[] = {"path", "mode", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "O&|i", (char **) keywords,
+                                     PyUnicode_FSConverter, &py_path, &mode)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+
+    if (mode != TR_FMT_BENC && mode != TR_FMT_JSON && mode != TR_FMT_JSON_LEAN) {
+        Py_DECREF(py_path);
+        PyErr_SetString(PyExc_ValueError, "must be a 'transmission.benc_serialization_mode' value");
+        return NULL;
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    fd = open(PyBytes_AS_STRING(py_path), O_RDONLY);
+    if (fd >= 0 && fstat(fd, &st) < 0) {
+        close(fd);
+        fd = -1;
+    }
+    Py_END_ALLOW_THREADS
+
+    if (fd < 0) {
+        PyErr_SetFromErrnoWithFilename(PyExc_OSError, PyBytes_AS_STRING(py_path));
+        Py_DECREF(py_path);
+        return NULL;
+    }
+
+    /* mmap() refuses zero length mappings, let the parser reject empty files */
+    if (st.st_size == 0) {
+        close(fd);
+        Py_DECREF(py_path);
+        return _wrap_tr_bencParse("", 0, (tr_fmt_mode)mode);
+    }
+
+    map = mmap(NULL, st.st_size, PROT_READ, MAP_PRIVATE, fd, 0);
+    close(fd);
+    if (map == MAP_FAILED) {
+        PyErr_SetFromErrnoWithFilename(PyExc_OSError, PyBytes_AS_STRING(py_path));
+        Py_DECREF(py_path);
+        return NULL;
+    }
+    Py_DECREF(py_path);
+
+    /* the parser makes a single forward pass over the data */
+    madvise(map, st.st_size, MADV_SEQUENTIAL);
+    py_retval = _wrap_tr_bencParse(map, st.st_size, (tr_fmt_mode)mode);
+    munmap(map, st.st_size);
+    return py_retval;
+}""")
+
+    root_module.header.writeln("int _wrap_PyBencIterParser_Ready(void);")
+    root_module.header.writeln("PyObject *_wrap_PyBencIterParser_New(PyObject *source);")
+    root_module.body.writeln("""
+/* events reported by bencode.iterparse() */
+enum {
+    BENC_EVENT_START_DICT,
+    BENC_EVENT_END_DICT,
+    BENC_EVENT_START_LIST,
+    BENC_EVENT_END_LIST,
+    BENC_EVENT_VALUE,
+    BENC_EVENT_COUNT
+};
+
+static const char *_wrap_bencIterEventNames[BENC_EVENT_COUNT] = {
+    "start_dict", "end_dict", "start_list", "end_list", "value"
+};
+static PyObject *_wrap_bencIterEvents[BENC_EVENT_COUNT];
+static PyTypeObject *PyBencIterParser_Type;
+
+typedef struct {
+    PyObject_HEAD
+    Py_buffer view;
+    bool has_view;
+    void *map;
+    size_t map_len;
+    PyObject *stream;     /* file object still being read, NULL once drained */
+    char *buf;            /* chunks read from stream */
+    size_t buf_alloc;
+    Py_ssize_t consumed;  /* bytes dropped from the front of buf */
+    const char *begin;
+    const char *pos;
+    const char *end;
+    PyObject *path;       /* keys and indices leading to the current node */
+    char *frames;         /* 'd' or 'l' for every open container */
+    Py_ssize_t *indices;  /* next index of every open list */
+    size_t depth;
+    size_t alloc;
+    bool started;         /* the last event was start_dict or start_list */
+} PyBencIterParser;
+
+/* file objects without a usable descriptor are read this much at a time */
+#define _WRAP_BENC_ITER_CHUNK (64 * 1024)
+
+static PyObject *
+_wrap_PyBencIterParser_Error(PyBencIterParser *self)
+{
+    PyErr_Format(PyExc_ValueError, "malformed bencode at offset %zd",
+                 self->consumed + (Py_ssize_t)(self->pos - self->begin));
+    return NULL;
+}
+
+/*
+ * Makes sure need bytes are available at pos, reading from the stream when
+ * there is one. Returns 1 when the data ends before that, -1 with an exception
+ * set on errors. Pointers into the data other than pos are invalidated.
+ */
+static int
+_wrap_PyBencIterParser_Fill(PyBencIterParser *self, size_t need)
+{
+    while ((size_t)(self->end - self->pos) < need) {
+        PyObject *py_chunk;
+        Py_buffer chunk;
+        size_t avail = self->end - self->pos;
+
+        if (self->stream == NULL)
+            return 1;
+        if ((py_chunk = PyObject_CallMethod(self->stream, "read", "n",
+                                            (Py_ssize_t)_WRAP_BENC_ITER_CHUNK)) == NULL)
+            return -1;
+        if (PyObject_GetBuffer(py_chunk, &chunk, PyBUF_SIMPLE) < 0) {
+            Py_DECREF(py_chunk);
+            return -1;
+        }
+        if (chunk.len == 0) {
+            PyBuffer_Release(&chunk);
+            Py_DECREF(py_chunk);
+            Py_CLEAR(self->stream);
+            return 1;
+        }
+
+        /* drop what was parsed already, then grow by what arrived */
+        if (avail)
+            memmove(self->buf, self->pos, avail);
+        self->consumed += self->pos - self->begin;
+        if (avail + chunk.len > self->buf_alloc) {
+            size_t alloc = self->buf_alloc ? self->buf_alloc : _WRAP_BENC_ITER_CHUNK;
+            char *buf;
+            while (alloc < avail + chunk.len)
+                alloc *= 2;
+            if ((buf = (char *)PyMem_Realloc(self->buf, alloc)) == NULL) {
+                PyBuffer_Release(&chunk);
+                Py_DECREF(py_chunk);
+                PyErr_NoMemory();
+                return -1;
+            }
+            self->buf = buf;
+            self->buf_alloc = alloc;
+        }
+        memcpy(self->buf + avail, chunk.buf, chunk.len);
+        self->begin = self->pos = self->buf;
+        self->end = self->buf + avail + chunk.len;
+        PyBuffer_Release(&chunk);
+        Py_DECREF(py_chunk);
+    }
+    return 0;
+}
+
+/* offset of the next c at or after pos + from, same return values as Fill() */
+static int
+_wrap_PyBencIterParser_Find(PyBencIterParser *self, size_t from, char c, size_t *at)
+{
+    const char *found;
+    int ret;
+
+    for (;;) {
+        if ((ret = _wrap_PyBencIterParser_Fill(self, from + 1)) != 0)
+            return ret;
+        found = (const char *)memchr(self->pos + from, c, self->end - self->pos - from);
+        if (found) {
+            *at = found - self->pos;
+            return 0;
+        }
+        from = self->end - self->pos;
+    }
+}
+
+/*
+ * parses the '<len>:' prefix of a string and loads its data, leaves pos on
+ * the first data byte; same return values as Fill(), 1 also for bad prefixes
+ */
+static int
+_wrap_PyBencIterParser_StrLen(PyBencIterParser *self, size_t *len)
+{
+    size_t i, value = 0;
+    int ret;
+
+    for (i = 0; ; ++i) {
+        char c;
+        if ((ret = _wrap_PyBencIterParser_Fill(self, i + 1)) != 0)
+            return ret;
+        c = self->pos[i];
+        if (c == ':' && i)
+            break;
+        if (c < '0' || c > '9' || value > (PY_SSIZE_T_MAX - 9) / 10)
+            return 1;
+        value = value * 10 + (c - '0');
+    }
+    if ((ret = _wrap_PyBencIterParser_Fill(self, i + 1 + value)) != 0)
+        return ret;
+    self->pos += i + 1;
+    *len = value;
+    return 0;
+}
+
+/* pos is on the 'i', integers have no size limit */
+static PyObject *
+_wrap_PyBencIterParser_Int(PyBencIterParser *self)
+{
+    const char *digits;
+    size_t i, sign, len;
+    PyObject *py_int;
+    int ret;
+
+    if ((ret = _wrap_PyBencIterParser_Find(self, 1, 'e', &len)) != 0)
+        return ret < 0 ? NULL : _wrap_PyBencIterParser_Error(self);
+    digits = self->pos + 1;
+    len -= 1;
+
+    sign = (len && digits[0] == '-') ? 1 : 0;
+    if (sign == len)
+        return _wrap_PyBencIterParser_Error(self);
+    for (i = sign; i < len; ++i)
+        if (digits[i] < '0' || digits[i] > '9')
+            return _wrap_PyBencIterParser_Error(self);
+    /* like tr_bencLoad(), no leading zeros and no -0 */
+    if (digits[sign] == '0' && (sign || len > 1))
+        return _wrap_PyBencIterParser_Error(self);
+
+    if (len < 19) {
+        long long value = 0;
+        for (i = digits[0] == '-'; i < len; ++i)
+            value = value * 10 + (digits[i] - '0');
+        py_int = PyLong_FromLongLong(digits[0] == '-' ? -value : value);
+    }
+    else {
+        char *copy = (char *)PyMem_Malloc(len + 1);
+        if (copy == NULL)
+            return PyErr_NoMemory();
+        memcpy(copy, digits, len);
+        copy[len] = '\\0';
+        py_int = PyLong_FromString(copy, NULL, 10);
+        PyMem_Free(copy);
+    }
+    if (py_int)
+        self->pos += len + 2;
+    return py_int;
+}
+
+/* steals the reference to value */
+static PyObject *
+_wrap_PyBencIterParser_Event(PyBencIterParser *self, int event, PyObject *value)
+{
+    PyObject *py_path, *py_retval;
+
+    if (value == NULL)
+        return NULL;
+    if ((py_path = PyList_AsTuple(self->path)) == NULL) {
+        Py_DECREF(value);
+        return NULL;
+    }
+    py_retval = PyTuple_Pack(3, _wrap_bencIterEvents[event], py_path, value);
+    Py_DECREF(py_path);
+    Py_DECREF(value);
+    return py_retval;
+}
+
+/* drops the path component a finished child put on the stack */
+static int
+_wrap_PyBencIterParser_PopPath(PyBencIterParser *self)
+{
+    if (self->depth == 0)
+        return 0;
+    return PyList_SetSlice(self->path, PyList_GET_SIZE(self->path) - 1,
+                           PyList_GET_SIZE(self->path), NULL);
+}
+
+static PyObject *
+_wrap_PyBencIterParser_Next(PyBencIterParser *self)
+{
+    PyObject *py_value;
+    size_t len;
+    char token;
+    int ret;
+
+    self->started = false;
+
+    if ((ret = _wrap_PyBencIterParser_Fill(self, 1)) != 0) {
+        if (ret > 0 && self->depth)
+            return _wrap_PyBencIterParser_Error(self);
+        return NULL;
+    }
+
+    if (self->depth) {
+        char frame = self->frames[self->depth - 1];
+
+        if (*self->pos == 'e') {
+            ++self->pos;
+            --self->depth;
+            Py_INCREF(Py_None);
+            py_value = _wrap_PyBencIterParser_Event(self,
+                                                    frame == 'd' ? BENC_EVENT_END_DICT : BENC_EVENT_END_LIST,
+                                                    Py_None);
+            if (py_value && _wrap_PyBencIterParser_PopPath(self) < 0)
+                Py_CLEAR(py_value);
+            return py_value;
+        }
+
+        if (frame == 'd') {
+            if ((ret = _wrap_PyBencIterParser_StrLen(self, &len)) != 0)
+                return ret < 0 ? NULL : _wrap_PyBencIterParser_Error(self);
+            py_value = _wrap_tr_bencKeyToPython(self->pos, len);
+            self->pos += len;
+            if (py_value && (ret = _wrap_PyBencIterParser_Fill(self, 1)) != 0) {
+                Py_DECREF(py_value);
+                return ret < 0 ? NULL : _wrap_PyBencIterParser_Error(self);
+            }
+        }
+        else {
+            py_value = PyLong_FromSsize_t(self->indices[self->depth - 1]++);
+        }
+        if (py_value == NULL)
+            return NULL;
+        if (PyList_Append(self->path, py_value) < 0) {
+            Py_DECREF(py_value);
+            return NULL;
+        }
+        Py_DECREF(py_value);
+    }
+
+    token = *self->pos;
+    if (token == 'd' || token == 'l') {
+        if (self->depth == self->alloc) {
+            size_t alloc = self->alloc ? self->alloc * 2 : 16;
+            char *frames = (char *)PyMem_Realloc(self->frames, alloc);
+            Py_ssize_t *indices;
+            if (frames == NULL)
+                return PyErr_NoMemory();
+            self->frames = frames;
+            indices = (Py_ssize_t *)PyMem_Realloc(self->indices, alloc * sizeof(Py_ssize_t));
+            if (indices == NULL)
+                return PyErr_NoMemory();
+            self->indices = indices;
+            self->alloc = alloc;
+        }
+        ++self->pos;
+        Py_INCREF(Py_None);
+        py_value = _wrap_PyBencIterParser_Event(self,
+                                                token == 'd' ? BENC_EVENT_START_DICT : BENC_EVENT_START_LIST,
+                                                Py_None);
+        if (py_value == NULL)
+            return NULL;
+        self->frames[self->depth] = token;
+        self->indices[self->depth] = 0;
+        ++self->depth;
+        self->started = true;
+        return py_value;
+    }
+
+    if (token == 'i')
+        py_value = _wrap_PyBencIterParser_Int(self);
+    else if ((ret = _wrap_PyBencIterParser_StrLen(self, &len)) == 0) {
+        py_value = _wrap_tr_bencRawToPython((const uint8_t *)self->pos, len);
+        self->pos += len;
+    }
+    else
+        return ret < 0 ? NULL : _wrap_PyBencIterParser_Error(self);
+
+    py_value = _wrap_PyBencIterParser_Event(self, BENC_EVENT_VALUE, py_value);
+    if (py_value && _wrap_PyBencIterParser_PopPath(self) < 0)
+        Py_CLEAR(py_value);
+    return py_value;
+}
+
+static PyObject *
+_wrap_PyBencIterParser_Skip(PyBencIterParser *self, PyObject *unused)
+{
+    size_t level = 1;
+    size_t len;
+    int ret;
+
+    if (!self->started) {
+        PyErr_SetString(PyExc_ValueError, "skip() must directly follow a start_dict or start_list event");
+        return NULL;
+    }
+
+    /* walk the raw data without creating any objects */
+    while (level) {
+        if ((ret = _wrap_PyBencIterParser_Fill(self, 1)) != 0)
+            return ret < 0 ? NULL : _wrap_PyBencIterParser_Error(self);
+        switch (*self->pos) {
+        case 'd':
+        case 'l':
+            ++level;
+            ++self->pos;
+            break;
+        case 'e':
+            --level;
+            ++self->pos;
+            break;
+        case 'i':
+            if ((ret = _wrap_PyBencIterParser_Find(self, 1, 'e', &len)) != 0)
+                return ret < 0 ? NULL : _wrap_PyBencIterParser_Error(self);
+            self->pos += len + 1;
+            break;
+        default:
+            if ((ret = _wrap_PyBencIterParser_StrLen(self, &len)) != 0)
+                return ret < 0 ? NULL : _wrap_PyBencIterParser_Error(self);
+            self->pos += len;
+        }
+    }
+
+    self->started = false;
+    --self->depth;
+    if (_wrap_PyBencIterParser_PopPath(self) < 0)
+        return NULL;
+    Py_RETURN_NONE;
+}
+
+static void
+_wrap_PyBencIterParser_Release(PyBencIterParser *self)
+{
+    if (self->has_view) {
+        PyBuffer_Release(&self->view);
+        self->has_view = false;
+    }
+    if (self->map) {
+        munmap(self->map, self->map_len);
+        self->map = NULL;
+    }
+    Py_CLEAR(self->stream);
+    PyMem_Free(self->buf);
+    self->buf = NULL;
+    self->buf_alloc = 0;
+    self->begin = self->pos = self->end = NULL;
+}
+
+static int
+_wrap_PyBencIterParser_Traverse(PyBencIterParser *self, visitproc visit, void *arg)
+{
+#if PY_VERSION_HEX >= 0x03090000
+    Py_VISIT(Py_TYPE(self));
+#endif
+    Py_VISIT(self->stream);
+    Py_VISIT(self->path);
+    if (self->has_view)
+        Py_VISIT(self->view.obj);
+    return 0;
+}
+
+/* leaves a parser that is done, the next event ends the iteration */
+static int
+_wrap_PyBencIterParser_Clear(PyBencIterParser *self)
+{
+    _wrap_PyBencIterParser_Release(self);
+    Py_CLEAR(self->path);
+    self->depth = 0;
+    self->started = false;
+    return 0;
+}
+
+static void
+_wrap_PyBencIterParser_Dealloc(PyBencIterParser *self)
+{
+    PyTypeObject *type = Py_TYPE(self);
+
+    PyObject_GC_UnTrack(self);
+    _wrap_PyBencIterParser_Release(self);
+    Py_XDECREF(self->path);
+    PyMem_Free(self->frames);
+    PyMem_Free(self->indices);
+    PyObject_GC_Del(self);
+    Py_DECREF(type);
+}
+
+static PyMethodDef _wrap_PyBencIterParser_methods[] = {
+    {(char *) "skip", (PyCFunction) _wrap_PyBencIterParser_Skip, METH_NOARGS,
+     (char *) "Skip the rest of the container that was just started, its end event is not reported."},
+    {NULL, NULL, 0, NULL}
+};
+
+static PyType_Slot _wrap_PyBencIterParser_slots[] = {
+    {Py_tp_dealloc, (void *) _wrap_PyBencIterParser_Dealloc},
+    {Py_tp_traverse, (void *) _wrap_PyBencIterParser_Traverse},
+    {Py_tp_clear, (void *) _wrap_PyBencIterParser_Clear},
+    {Py_tp_iter, (void *) PyObject_SelfIter},
+    {Py_tp_iternext, (void *) _wrap_PyBencIterParser_Next},
+    {Py_tp_methods, (void *) _wrap_PyBencIterParser_methods},
+    {0, NULL}
+};
+
+static PyType_Spec _wrap_PyBencIterParser_spec = {
+    "transmission.bencode.IterParser",
+    sizeof(PyBencIterParser),
+    0,
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC,
+    _wrap_PyBencIterParser_slots
+};
+
+int _wrap_PyBencIterParser_Ready(void)
+{
+    int idx;
+
+    for (idx = 0; idx < BENC_EVENT_COUNT; ++idx) {
+        _wrap_bencIterEvents[idx] = PyUnicode_InternFromString(_wrap_bencIterEventNames[idx]);
+        if (_wrap_bencIterEvents[idx] == NULL)
+            return -1;
+    }
+    PyBencIterParser_Type = (PyTypeObject *)PyType_FromSpec(&_wrap_PyBencIterParser_spec);
+    return PyBencIterParser_Type ? 0 : -1;
+}
+
+/* maps fd from offset on, returns 1 when it isn't a regular file that can be mapped */
+static int
+_wrap_PyBencIterParser_Map(PyBencIterParser *self, int fd, off_t offset)
+{
+    struct stat st;
+    off_t start;
+
+    if (fstat(fd, &st) < 0)
+        return -1;
+    if (!S_ISREG(st.st_mode))
+        return 1;
+    if (offset >= st.st_size)
+        return 0;
+    /* mmap() wants a page aligned offset */
+    start = offset - offset % sysconf(_SC_PAGESIZE);
+    self->map_len = st.st_size - start;
+    self->map = mmap(NULL, self->map_len, PROT_READ, MAP_PRIVATE, fd, start);
+    if (self->map == MAP_FAILED) {
+        self->map = NULL;
+        return 1;
+    }
+    madvise(self->map, self->map_len, MADV_SEQUENTIAL);
+    self->begin = (const char *)self->map + (offset - start);
+    self->end = (const char *)self->map + self->map_len;
+    return 0;
+}
+
+/*
+ * maps a binary file object from its current position, returns 1 when it has
+ * to be read() instead: pipes, sockets, in-memory and decoding streams
+ */
+static int
+_wrap_PyBencIterParser_MapFile(PyBencIterParser *self, PyObject *source)
+{
+    static const char *plain_types[] = {"FileIO", "BufferedReader", "BufferedRandom", NULL};
+    PyObject *py_io, *py_fd, *py_offset;
+    bool plain = false;
+    long fd;
+    long long offset;
+    int idx, ret;
+
+    /* wrappers like GzipFile hand out the descriptor of the data they decode */
+    if ((py_io = PyImport_ImportModule("io")) == NULL)
+        return -1;
+    for (idx = 0; plain_types[idx]; ++idx) {
+        PyObject *py_type = PyObject_GetAttrString(py_io, plain_types[idx]);
+        if (py_type == NULL) {
+            Py_DECREF(py_io);
+            return -1;
+        }
+        plain = plain || (PyObject *)Py_TYPE(source) == py_type;
+        Py_DECREF(py_type);
+    }
+    Py_DECREF(py_io);
+    if (!plain)
+        return 1;
+
+    if ((py_fd = PyObject_CallMethod(source, "fileno", NULL)) == NULL)
+        return -1;
+    fd = PyLong_AsLong(py_fd);
+    Py_DECREF(py_fd);
+    if (fd == -1 && PyErr_Occurred())
+        return -1;
+
+    if ((py_offset = PyObject_CallMethod(source, "tell", NULL)) == NULL) {
+        if (!PyErr_ExceptionMatches(PyExc_OSError))
+            return -1;
+        PyErr_Clear();
+        return 1;
+    }
+    offset = PyLong_AsLongLong(py_offset);
+    Py_DECREF(py_offset);
+    if (offset == -1 && PyErr_Occurred())
+        return -1;
+
+    if ((ret = _wrap_PyBencIterParser_Map(self, (int)fd, (off_t)offset)) < 0)
+        PyErr_SetFromErrno(PyExc_OSError);
+    return ret;
+}
+
+PyObject *_wrap_PyBencIterParser_New(PyObject *source)
+{
+    PyBencIterParser *self;
+    int err;
+
+    /* GenericAlloc takes the reference on the heap type that dealloc drops */
+    self = (PyBencIterParser *)PyType_GenericAlloc(PyBencIterParser_Type, 0);
+    if (self == NULL)
+        return NULL;
+    self->has_view = false;
+    self->map = NULL;
+    self->map_len = 0;
+    self->stream = NULL;
+    self->buf = NULL;
+    self->buf_alloc = 0;
+    self->consumed = 0;
+    self->begin = self->pos = self->end = NULL;
+    self->frames = NULL;
+    self->indices = NULL;
+    self->depth = self->alloc = 0;
+    self->started = false;
+    if ((self->path = PyList_New(0)) == NULL)
+        goto error;
+
+    if (PyObject_CheckBuffer(source)) {
+        if (PyObject_GetBuffer(source, &self->view, PyBUF_SIMPLE) < 0)
+            goto error;
+        self->has_view = true;
+        self->begin = (const char *)self->view.buf;
+        self->end = self->begin + self->view.len;
+    }
+    else if (PyObject_HasAttrString(source, "read")) {
+        if ((err = _wrap_PyBencIterParser_MapFile(self, source)) < 0)
+            goto error;
+        if (err > 0) {
+            Py_INCREF(source);
+            self->stream = source;
+        }
+    }
+    else {
+        PyObject *py_path, *py_io;
+        struct stat st;
+        int fd;
+
+        if (!PyUnicode_FSConverter(source, &py_path))
+            goto error;
+        if (stat(PyBytes_AS_STRING(py_path), &st) == 0 && !S_ISREG(st.st_mode)) {
+            /* fifos and the like can only be read */
+            if ((py_io = PyImport_ImportModule("io")) != NULL) {
+                self->stream = PyObject_CallMethod(py_io, "open", "Os", py_path, "rb");
+                Py_DECREF(py_io);
+            }
+            Py_DECREF(py_path);
+            if (self->stream == NULL)
+                goto error;
+        }
+        else {
+            fd = open(PyBytes_AS_STRING(py_path), O_RDONLY);
+            err = fd < 0 ? -1 : _wrap_PyBencIterParser_Map(self, fd, 0);
+            if (fd >= 0)
+                close(fd);
+            if (err != 0) {
+                PyErr_SetFromErrnoWithFilename(PyExc_OSError, PyBytes_AS_STRING(py_path));
+                Py_DECREF(py_path);
+                goto error;
+            }
+            Py_DECREF(py_path);
+        }
+    }
+
+    self->pos = self->begin;
+    return (PyObject *)self;
+
+error:
+    Py_DECREF(self);
+    return NULL;
+}
+""")
+    root_module.after_init.write_error_check('_wrap_PyBencIterParser_Ready() < 0')
+
+    submodule.add_custom_function_wrapper('iterparse',
+                                          '_wrap_transmission_bencode_iterparse',
+                                          wrapper_body="""
+PyObject *
+_wrap_transmission_bencode_iterparse(PyObject *self, PyObject *args,
+                                     PyObject *kwargs, PyObject **return_exception)
+{
+    PyObject *exc_type, *traceback;
+    PyObject *source;
+    const char *keywords[] = {"source", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "O", (char **) keywords, &source)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+
+    return _wrap_PyBencIterParser_New(source);
+}""")
+    return
+
+def register_Tr_benc_methods(root_module, cls):
+    root_module.header.writeln("PyTypeObject *_wrap_PyBenc_TypeOf(const tr_benc *benc);")
+    root_module.header.writeln("PyObject *_wrap_PyBenc_New(tr_benc *benc, PyBindGenWrapperFlags flags);")
+    root_module.body.writeln("""
+/* the wrapper type for a node, NULL when there is none */
+PyTypeObject *_wrap_PyBenc_TypeOf(const tr_benc *benc)
+{
+    if (tr_bencIsBool(benc))
+        return &PyBencBool_Type;
+    else if (tr_bencIsInt(benc))
+        return &PyBencInt_Type;
+    else if (tr_bencIsReal(benc))
+        return &PyBencReal_Type;
+    else if (tr_bencIsString(benc))
+        return &PyBencString_Type;
+    else if (tr_bencIsList(benc))
+        return &PyBencList_Type;
+    else if (tr_bencIsDict(benc))
+        return &PyBencDict_Type;
+    return NULL;
+}
+
+PyObject *_wrap_PyBenc_New(tr_benc *benc, PyBindGenWrapperFlags flags)
+{
+    PyTypeObject *type;
+    PyBenc *py_benc;
+
+    if ((type = _wrap_PyBenc_TypeOf(benc)) == NULL) {
+        PyErr_SetString(PyExc_ValueError, "Unknown Benc type");
+        return NULL;
+    }
+
+    py_benc = PyObject_New(PyBenc, type);
+    if (py_benc == NULL)
+        return NULL;
+    py_benc->obj = benc;
+    py_benc->flags = flags;
+    return (PyObject *)py_benc;
+}
+""")
+
+    root_module.header.writeln("int _wrap_PyBenc_SetOwner(PyObject *view, PyObject *parent);")
+    root_module.header.writeln("void _wrap_PyBenc_ClearOwner(PyObject *view);")
+    root_module.header.writeln("int _wrap_PyBenc_Pin(PyObject *view, int delta);")
+    root_module.header.writeln("int _wrap_PyBenc_CheckMutable(const tr_benc *benc);")
+    root_module.header.writeln("typedef struct {\n"
+                               "    tr_benc *container;\n"
+                               "    const tr_benc *vals;\n"
+                               "    bool replaced;\n"
+                               "} _wrap_tr_bencChange;")
+    root_module.header.writeln("int _wrap_PyBenc_BeginChange(_wrap_tr_bencChange *change, tr_benc *container,\n"
+                               "                             const char *key, int type);")
+    root_module.header.writeln("int _wrap_PyBenc_EndChange(const _wrap_tr_bencChange *change);")
+    root_module.body.writeln("""
+/*
+ * NOT_OWNED wrapper address -> (wrapper owning the root of its tree, path from
+ * that root to the view's node, bytes of the tr_benc pointers along the path).
+ * A step of the path is a (position in the container, key or None) tuple, so
+ * a change that moves the items of a container can move the views below it
+ * along. pybindgen's wrapper struct has no room for any of this, so like the
+ * dict key indexes it lives in side tables only touched with the GIL held.
+ */
+static PyObject *_wrap_PyBenc_Owners = NULL;
+
+/* tr_benc address -> number of views below it, changes to containers without
+ * any skip the walk over _wrap_PyBenc_Owners */
+static PyObject *_wrap_PyBenc_Below = NULL;
+
+/* tr_benc address -> number of buffer exports at or below it.  Adding to or
+ * assigning into a container moves or frees its items, so like a bytearray a
+ * pinned container refuses to change until the exports are released */
+static PyObject *_wrap_PyBenc_Pins = NULL;
+
+static int
+_wrap_PyBenc_Count(PyObject **table, const tr_benc *node, int delta)
+{
+    PyObject *key, *count;
+    Py_ssize_t total = delta;
+    int ret;
+
+    if (*table == NULL && (*table = PyDict_New()) == NULL)
+        return -1;
+    if ((key = PyLong_FromVoidPtr((void *)node)) == NULL)
+        return -1;
+    if ((count = PyDict_GetItem(*table, key)) != NULL)
+        total += PyLong_AsSsize_t(count);
+
+    if (total <= 0)
+        ret = count ? PyDict_DelItem(*table, key) : 0;
+    else if ((count = PyLong_FromSsize_t(total)) == NULL)
+        ret = -1;
+    else {
+        ret = PyDict_SetItem(*table, key, count);
+        Py_DECREF(count);
+    }
+    Py_DECREF(key);
+    return ret;
+}
+
+/* counts (delta 1) or uncounts (delta -1) all nodes in a bytes of tr_benc
+ * pointers; uncounting never fails */
+static int
+_wrap_PyBenc_CountAll(PyObject **table, PyObject *nodes, int delta)
+{
+    PyObject *exc_type, *exc_value, *traceback;
+    const tr_benc **node = (const tr_benc **)PyBytes_AS_STRING(nodes);
+    Py_ssize_t idx, count = PyBytes_GET_SIZE(nodes) / sizeof(tr_benc *);
+
+    if (delta < 0)
+        PyErr_Fetch(&exc_type, &exc_value, &traceback);
+    for (idx = 0; idx < count; ++idx) {
+        if (_wrap_PyBenc_Count(table, node[idx], delta) < 0 && delta > 0) {
+            while (idx--)
+                _wrap_PyBenc_Count(table, node[idx], -delta);
+            return -1;
+        }
+    }
+    if (delta < 0) {
+        PyErr_Clear();
+        PyErr_Restore(exc_type, exc_value, traceback);
+    }
+    return 0;
+}
+
+static bool
+_wrap_PyBenc_KeyIs(const tr_benc *node, PyObject *key)
+{
+    const uint8_t *raw;
+    size_t len;
+    return tr_bencGetRaw(node, &raw, &len) && len == (size_t)PyBytes_GET_SIZE(key) &&
+           !memcmp(raw, PyBytes_AS_STRING(key), len);
+}
+
+/* the path step from a container to one of its items */
+static PyObject *
+_wrap_PyBenc_NewStep(const tr_benc *container, const tr_benc *item)
+{
+    const uint8_t *raw;
+    size_t pos, len;
+
+    if ((tr_bencIsList(container) || tr_bencIsDict(container)) &&
+        item >= container->val.l.vals && item < container->val.l.vals + container->val.l.count) {
+        pos = item - container->val.l.vals;
+        if (tr_bencIsList(container))
+            return Py_BuildValue((char *) "(nO)", (Py_ssize_t)pos, Py_None);
+        if (pos % 2 == 1 && tr_bencGetRaw(&container->val.l.vals[pos - 1], &raw, &len))
+            return Py_BuildValue((char *) "(nN)", (Py_ssize_t)pos,
+                                 PyBytes_FromStringAndSize((const char *)raw, len));
+    }
+    PyErr_SetString(PyExc_SystemError, "Benc view is not an item of its parent");
+    return NULL;
+}
+
+static int
+_wrap_PyBenc_PutOwner(PyObject *view, PyObject *owner, PyObject *path, PyObject *above)
+{
+    PyObject *key, *entry;
+    int ret = -1;
+
+    if ((entry = PyTuple_Pack(3, owner, path, above)) == NULL)
+        return -1;
+    if ((key = PyLong_FromVoidPtr(view)) != NULL) {
+        ret = PyDict_SetItem(_wrap_PyBenc_Owners, key, entry);
+        Py_DECREF(key);
+    }
+    Py_DECREF(entry);
+    return ret;
+}
+
+int _wrap_PyBenc_SetOwner(PyObject *view, PyObject *parent)
+{
+    PyObject *key, *entry, *owner, *path, *above;
+    PyObject *step = NULL, *steps = NULL, *nodes = NULL;
+    tr_benc *node = ((PyBenc *)parent)->obj;
+    tr_benc *item = ((PyBenc *)view)->obj;
+    Py_ssize_t idx, depth;
+    int ret = -1;
+
+    if (_wrap_PyBenc_Owners == NULL && (_wrap_PyBenc_Owners = PyDict_New()) == NULL)
+        return -1;
+
+    /* a view of a view is tied to the root, not to the intermediate wrapper */
+    if ((key = PyLong_FromVoidPtr(parent)) == NULL)
+        return -1;
+    entry = PyDict_GetItem(_wrap_PyBenc_Owners, key);
+    Py_DECREF(key);
+    owner = entry ? PyTuple_GET_ITEM(entry, 0) : parent;
+    path = entry ? PyTuple_GET_ITEM(entry, 1) : NULL;
+    above = entry ? PyTuple_GET_ITEM(entry, 2) : NULL;
+    depth = path ? PyTuple_GET_SIZE(path) : 0;
+
+    /* one step further, unless both wrap the same node */
+    if (item != node && (step = _wrap_PyBenc_NewStep(node, item)) == NULL)
+        return -1;
+    steps = PyTuple_New(depth + (step != NULL));
+    nodes = PyBytes_FromStringAndSize(NULL, (depth + (step != NULL)) * sizeof(tr_benc *));
+    if (steps == NULL || nodes == NULL)
+        goto out;
+
+    for (idx = 0; idx < depth; ++idx) {
+        Py_INCREF(PyTuple_GET_ITEM(path, idx));
+        PyTuple_SET_ITEM(steps, idx, PyTuple_GET_ITEM(path, idx));
+    }
+    if (depth)
+        memcpy(PyBytes_AS_STRING(nodes), PyBytes_AS_STRING(above), depth * sizeof(tr_benc *));
+    if (step != NULL) {
+        PyTuple_SET_ITEM(steps, depth, step);
+        step = NULL;
+        memcpy(PyBytes_AS_STRING(nodes) + depth * sizeof(tr_benc *), &node, sizeof(node));
+    }
+
+    if (_wrap_PyBenc_CountAll(&_wrap_PyBenc_Below, nodes, 1) == 0 &&
+        (ret = _wrap_PyBenc_PutOwner(view, owner, steps, nodes)) < 0)
+        _wrap_PyBenc_CountAll(&_wrap_PyBenc_Below, nodes, -1);
+
+out:
+    Py_XDECREF(step);
+    Py_XDECREF(steps);
+    Py_XDECREF(nodes);
+    return ret;
+}
+
+void _wrap_PyBenc_ClearOwner(PyObject *view)
+{
+    PyObject *key, *entry, *exc_type, *exc_value, *traceback;
+
+    if (_wrap_PyBenc_Owners == NULL || PyDict_GET_SIZE(_wrap_PyBenc_Owners) == 0)
+        return;
+
+    PyErr_Fetch(&exc_type, &exc_value, &traceback);
+    if ((key = PyLong_FromVoidPtr(view)) != NULL &&
+        (entry = PyDict_GetItem(_wrap_PyBenc_Owners, key)) != NULL) {
+        _wrap_PyBenc_CountAll(&_wrap_PyBenc_Below, PyTuple_GET_ITEM(entry, 2), -1);
+        PyDict_DelItem(_wrap_PyBenc_Owners, key);
+    }
+    Py_XDECREF(key);
+    PyErr_Clear();
+    PyErr_Restore(exc_type, exc_value, traceback);
+}
+
+/* pins (delta 1) or unpins (delta -1) the node of a view and the containers
+ * above it for a buffer export; unpinning never fails.  Nothing on the way
+ * can change while pinned, so unpinning finds the same nodes */
+int _wrap_PyBenc_Pin(PyObject *view, int delta)
+{
+    PyObject *key, *entry = NULL;
+    PyObject *exc_type, *exc_value, *traceback;
+
+    if (delta < 0)
+        PyErr_Fetch(&exc_type, &exc_value, &traceback);
+
+    if (_wrap_PyBenc_Owners != NULL && (key = PyLong_FromVoidPtr(view)) != NULL) {
+        entry = PyDict_GetItem(_wrap_PyBenc_Owners, key);
+        Py_DECREF(key);
+    }
+    if (PyErr_Occurred() && delta > 0)
+        return -1;
+
+    if (entry != NULL && _wrap_PyBenc_CountAll(&_wrap_PyBenc_Pins, PyTuple_GET_ITEM(entry, 2), delta) < 0)
+        return -1;
+    if (_wrap_PyBenc_Count(&_wrap_PyBenc_Pins, ((PyBenc *)view)->obj, delta) < 0 && delta > 0) {
+        if (entry != NULL)
+            _wrap_PyBenc_CountAll(&_wrap_PyBenc_Pins, PyTuple_GET_ITEM(entry, 2), -delta);
+        return -1;
+    }
+
+    if (delta < 0) {
+        PyErr_Clear();
+        PyErr_Restore(exc_type, exc_value, traceback);
+    }
+    return 0;
+}
+
+int _wrap_PyBenc_CheckMutable(const tr_benc *benc)
+{
+    PyObject *key;
+    bool pinned;
+
+    if (_wrap_PyBenc_Pins == NULL || PyDict_GET_SIZE(_wrap_PyBenc_Pins) == 0)
+        return 0;
+    if ((key = PyLong_FromVoidPtr((void *)benc)) == NULL)
+        return -1;
+    pinned = PyDict_GetItem(_wrap_PyBenc_Pins, key) != NULL;
+    Py_DECREF(key);
+
+    if (pinned) {
+        PyErr_SetString(PyExc_BufferError, "Benc cannot be modified while its strings are exported");
+        return -1;
+    }
+    return 0;
+}
+
+/* new references to the keys of the views below `node', and at it with `at' */
+static PyObject *
+_wrap_PyBenc_ViewsOf(const tr_benc *node, bool at)
+{
+    PyObject *views, *key, *entry;
+    Py_ssize_t pos = 0;
+
+    if ((views = PyList_New(0)) == NULL)
+        return NULL;
+    while (PyDict_Next(_wrap_PyBenc_Owners, &pos, &key, &entry)) {
+        PyObject *above = PyTuple_GET_ITEM(entry, 2);
+        const tr_benc **nodes = (const tr_benc **)PyBytes_AS_STRING(above);
+        Py_ssize_t idx = PyBytes_GET_SIZE(above) / sizeof(tr_benc *);
+        bool found = at && ((PyBenc *)PyLong_AsVoidPtr(key))->obj == node;
+
+        while (!found && idx--)
+            found = nodes[idx] == node;
+        if (found && PyList_Append(views, key) < 0) {
+            Py_DECREF(views);
+            return NULL;
+        }
+    }
+    return views;
+}
+
+/* makes a view own `benc', which ends its ties to the tree it came from */
+static void
+_wrap_PyBenc_Release(PyObject *key, PyBenc *view, tr_benc *benc)
+{
+    PyObject *entry = PyDict_GetItem(_wrap_PyBenc_Owners, key);
+
+    view->obj = benc;
+    view->flags = PYBINDGEN_WRAPPER_FLAG_NONE;
+    if (entry != NULL) {
+        _wrap_PyBenc_CountAll(&_wrap_PyBenc_Below, PyTuple_GET_ITEM(entry, 2), -1);
+        if (PyDict_DelItem(_wrap_PyBenc_Owners, key) < 0)
+            PyErr_Clear();
+    }
+}
+
+/* gives the views at and below `node' a copy of their item, before the change
+ * that is going to free it */
+static int
+_wrap_PyBenc_Detach(const tr_benc *node)
+{
+    PyObject *views;
+    Py_ssize_t idx;
+    int ret = 0;
+
+    if ((views = _wrap_PyBenc_ViewsOf(node, true)) == NULL)
+        return -1;
+    for (idx = 0; idx < PyList_GET_SIZE(views); ++idx) {
+        PyObject *key = PyList_GET_ITEM(views, idx);
+        PyBenc *view = (PyBenc *)PyLong_AsVoidPtr(key);
+        tr_benc *copy = tr_new0(tr_benc, 1);
+
+        if (copy == NULL) {
+            PyErr_NoMemory();
+            ret = -1;
+            break;
+        }
+        _wrap_tr_bencCopy(copy, view->obj);
+        _wrap_PyBenc_Release(key, view, copy);
+    }
+    Py_DECREF(views);
+    return ret;
+}
+
+/* gives a view whose item is gone an empty one of its own */
+static int
+_wrap_PyBenc_Orphan(PyObject *key, PyBenc *view)
+{
+    tr_benc *benc = tr_new0(tr_benc, 1);
+
+    if (benc == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    if (Py_TYPE(view) == &PyBencDict_Type)
+        tr_bencInitDict(benc, 0);
+    else if (Py_TYPE(view) == &PyBencList_Type)
+        tr_bencInitList(benc, 0);
+    else if (Py_TYPE(view) == &PyBencString_Type)
+        tr_bencInitStr(benc, "", 0);
+    else if (Py_TYPE(view) == &PyBencReal_Type)
+        tr_bencInitReal(benc, 0);
+    else if (Py_TYPE(view) == &PyBencBool_Type)
+        tr_bencInitBool(benc, false);
+    else
+        tr_bencInitInt(benc, 0);
+    _wrap_PyBenc_Release(key, view, benc);
+    return 0;
+}
+
+/*
+ * Follows the path of an owners entry down from the root. Returns 1 with the
+ * item it leads to and a new entry with updated positions and containers, 0
+ * when it leads nowhere anymore, -1 on errors.
+ */
+static int
+_wrap_PyBenc_Follow(PyObject *entry, tr_benc **item, PyObject **moved)
+{
+    PyObject *owner = PyTuple_GET_ITEM(entry, 0);
+    PyObject *path = PyTuple_GET_ITEM(entry, 1);
+    PyObject *steps, *above;
+    Py_ssize_t idx, depth = PyTuple_GET_SIZE(path);
+    tr_benc *node = ((PyBenc *)owner)->obj;
+    int ret = -1;
+
+    steps = PyTuple_New(depth);
+    above = PyBytes_FromStringAndSize(NULL, depth * sizeof(tr_benc *));
+    if (steps == NULL || above == NULL)
+        goto out;
+
+    for (idx = 0; idx < depth && node != NULL; ++idx) {
+        PyObject *step = PyTuple_GET_ITEM(path, idx);
+        PyObject *key = PyTuple_GET_ITEM(step, 1);
+        size_t pos = PyLong_AsSize_t(PyTuple_GET_ITEM(step, 0));
+        tr_benc *child = NULL;
+
+        ((tr_benc **)PyBytes_AS_STRING(above))[idx] = node;
+        if (key == Py_None) {
+            /* lists only grow, items keep their position */
+            if (tr_bencIsList(node))
+                child = tr_bencListChild(node, pos);
+        }
+        else if (tr_bencIsDict(node)) {
+            /* removing a key moves the last pair into its place */
+            if (pos < node->val.l.count && _wrap_PyBenc_KeyIs(&node->val.l.vals[pos - 1], key))
+                child = &node->val.l.vals[pos];
+            else
+                child = tr_bencDictFind(node, PyBytes_AS_STRING(key));
+        }
+
+        if (child != NULL && (size_t)(child - node->val.l.vals) != pos)
+            step = _wrap_PyBenc_NewStep(node, child);
+        else
+            Py_INCREF(step);
+        if (step == NULL)
+            goto out;
+        PyTuple_SET_ITEM(steps, idx, step);
+        node = child;
+    }
+
+    if (node == NULL)
+        ret = 0;
+    else if ((*moved = PyTuple_Pack(3, owner, steps, above)) != NULL) {
+        *item = node;
+        ret = 1;
+    }
+
+out:
+    Py_XDECREF(steps);
+    Py_XDECREF(above);
+    return ret;
+}
+
+/* moves the views below `container' to wherever their items are after it
+ * changed, a view whose item is gone gets an empty one */
+static int
+_wrap_PyBenc_Moved(const tr_benc *container)
+{
+    PyObject *key, *views;
+    Py_ssize_t idx;
+    bool below;
+    int ret = 0;
+
+    if (_wrap_PyBenc_Below == NULL || PyDict_GET_SIZE(_wrap_PyBenc_Below) == 0)
+        return 0;
+    if ((key = PyLong_FromVoidPtr((void *)container)) == NULL)
+        return -1;
+    below = PyDict_GetItem(_wrap_PyBenc_Below, key) != NULL;
+    Py_DECREF(key);
+    if (!below)
+        return 0;
+
+    if ((views = _wrap_PyBenc_ViewsOf(container, false)) == NULL)
+        return -1;
+    for (idx = 0; idx < PyList_GET_SIZE(views); ++idx) {
+        PyObject *entry, *moved = NULL, *above;
+        PyBenc *view;
+        tr_benc *item = NULL;
+        int found;
+
+        key = PyList_GET_ITEM(views, idx);
+        view = (PyBenc *)PyLong_AsVoidPtr(key);
+        entry = PyDict_GetItem(_wrap_PyBenc_Owners, key);
+        above = PyTuple_GET_ITEM(entry, 2);
+        Py_INCREF(above);
+
+        if ((found = _wrap_PyBenc_Follow(entry, &item, &moved)) > 0 &&
+            Py_TYPE(view) == _wrap_PyBenc_TypeOf(item) &&
+            _wrap_PyBenc_CountAll(&_wrap_PyBenc_Below, PyTuple_GET_ITEM(moved, 2), 1) == 0) {
+            if (PyDict_SetItem(_wrap_PyBenc_Owners, key, moved) == 0) {
+                _wrap_PyBenc_CountAll(&_wrap_PyBenc_Below, above, -1);
+                view->obj = item;
+            }
+            else {
+                _wrap_PyBenc_CountAll(&_wrap_PyBenc_Below, PyTuple_GET_ITEM(moved, 2), -1);
+                found = -1;
+            }
+        }
+        else if (found > 0) {
+            found = PyErr_Occurred() ? -1 : 0;
+        }
+
+        if (found <= 0) {
+            PyErr_Clear();
+            if (_wrap_PyBenc_Orphan(key, view) < 0)
+                ret = -1;
+        }
+        Py_XDECREF(moved);
+        Py_DECREF(above);
+    }
+    Py_DECREF(views);
+    return ret;
+}
+
+/*
+ * Every change to a container goes between these two, with the GIL held.
+ * Begin refuses to change a container with buffer exports below it, and when
+ * the value for `key' of a dict is going to replace an item with another one
+ * of `type' gives the views of the old item their own copy of it. End drops
+ * stale key indexes and moves the views below the container along with their
+ * items.
+ */
+int _wrap_PyBenc_BeginChange(_wrap_tr_bencChange *change, tr_benc *container,
+                             const char *key, int type)
+{
+    tr_benc *old;
+
+    change->container = container;
+    change->vals = container->val.l.vals;
+    change->replaced = false;
+    if (_wrap_PyBenc_CheckMutable(container) < 0)
+        return -1;
+
+    if (key != NULL && _wrap_PyBenc_Owners != NULL && PyDict_GET_SIZE(_wrap_PyBenc_Owners) > 0 &&
+        (old = tr_bencDictFind(container, key)) != NULL &&
+        (!tr_bencIsType(old, type) || tr_bencIsDict(old) || tr_bencIsList(old))) {
+        change->replaced = true;
+        return _wrap_PyBenc_Detach(old);
+    }
+    return 0;
+}
+
+int _wrap_PyBenc_EndChange(const _wrap_tr_bencChange *change)
+{
+    if (tr_bencIsDict(change->container))
+        _wrap_PyBencDict_DropIndexes(change->container);
+    if (change->replaced || change->container->val.l.vals != change->vals)
+        return _wrap_PyBenc_Moved(change->container);
+    return 0;
+}
+""")
+
+    root_module.header.writeln("PyObject *_wrap_tr_bencToPyValue(tr_benc *benc, PyObject *owner);")
+    root_module.body.writeln("""
+PyObject *_wrap_tr_bencToPyValue(tr_benc *benc, PyObject *owner)
+{
+    PyObject *py_obj = NULL;
+
+    if (tr_bencIsBool(benc)) {
+        bool value;
+        if (tr_bencGetBool(benc, &value))
+            py_obj = PyBool_FromLong(value);
+    }
+    else if (tr_bencIsInt(benc)) {
+        int64_t value;
+        if (tr_bencGetInt(benc, &value))
+            py_obj = PyLong_FromLongLong(value);
+    }
+    else if (tr_bencIsReal(benc)) {
+        double value;
+        if (tr_bencGetReal(benc, &value))
+            py_obj = PyFloat_FromDouble(value);
+    }
+    else if (tr_bencIsString(benc)) {
+        const uint8_t *raw;
+        size_t len;
+        if (tr_bencGetRaw(benc, &raw, &len))
+            py_obj = _wrap_tr_bencRawToPython(raw, len);
+    }
+    else {
+        /* containers are handed out as views that keep the tree alive and
+         * follow their node when the containers above them change */
+        py_obj = _wrap_PyBenc_New(benc, PYBINDGEN_WRAPPER_FLAG_OBJECT_NOT_OWNED);
+        if (py_obj != NULL && owner != NULL && _wrap_PyBenc_SetOwner(py_obj, owner) < 0)
+            Py_CLEAR(py_obj);
+        return py_obj;
+    }
+
+    if (py_obj == NULL && !PyErr_Occurred())
+        PyErr_SetString(PyExc_ValueError, "Unable to get Benc value");
+    return py_obj;
+}
+""")
+
+    root_module.header.writeln("bool _wrap_tr_bencEquals(const tr_benc *a, const tr_benc *b);")
+    root_module.body.writeln("""
+static bool
+_wrap_tr_bencKeyAt(const tr_benc *dict, size_t idx, const char *key)
+{
+    const uint8_t *raw;
+    size_t len;
+    return tr_bencGetRaw(&dict->val.l.vals[idx * 2], &raw, &len) &&
+           len == strlen(key) && !memcmp(raw, key, len);
+}
+
+bool _wrap_tr_bencEquals(const tr_benc *a, const tr_benc *b)
+{
+    size_t idx, count;
+
+    if (a == b)
+        return true;
+
+    /* libtransmission's getters convert between bool, int and real */
+    if ((tr_bencIsReal(a) || tr_bencIsReal(b)) && !tr_bencIsString(a) && !tr_bencIsString(b)) {
+        double x, y;
+        return tr_bencGetReal(a, &x) && tr_bencGetReal(b, &y) && x == y;
+    }
+    if ((tr_bencIsInt(a) || tr_bencIsBool(a)) && (tr_bencIsInt(b) || tr_bencIsBool(b))) {
+        int64_t x, y;
+        return tr_bencGetInt(a, &x) && tr_bencGetInt(b, &y) && x == y;
+    }
+    if (tr_bencIsString(a) && tr_bencIsString(b)) {
+        const uint8_t *x, *y;
+        size_t x_len, y_len;
+        return tr_bencGetRaw(a, &x, &x_len) && tr_bencGetRaw(b, &y, &y_len) &&
+               x_len == y_len && !memcmp(x, y, x_len);
+    }
+    if (tr_bencIsList(a) && tr_bencIsList(b)) {
+        if ((count = tr_bencListSize(a)) != tr_bencListSize(b))
+            return false;
+        for (idx = 0; idx < count; ++idx)
+            if (!_wrap_tr_bencEquals(tr_bencListChild((tr_benc *)a, idx),
+                                     tr_bencListChild((tr_benc *)b, idx)))
+                return false;
+        return true;
+    }
+    if (tr_bencIsDict(a) && tr_bencIsDict(b)) {
+        if ((count = tr_bencDictSize(a)) != tr_bencDictSize(b))
+            return false;
+        for (idx = 0; idx < count; ++idx) {
+            const char *key;
+            tr_benc *val, *other;
+            if (!tr_bencDictChild((tr_benc *)a, idx, &key, &val))
+                return false;
+            /* copies and re-parsed trees keep the order, only search on a mismatch */
+            if (_wrap_tr_bencKeyAt(b, idx, key))
+                other = &b->val.l.vals[idx * 2 + 1];
+            else
+                other = tr_bencDictFind((tr_benc *)b, key);
+            if (other == NULL || !_wrap_tr_bencEquals(val, other))
+                return false;
+        }
+        return true;
+    }
+    return false;
+}
+""")
+
+    root_module.header.writeln("void _wrap_tr_bencCopy(tr_benc *dst, const tr_benc *src);")
+    root_module.body.writeln("""
+void _wrap_tr_bencCopy(tr_benc *dst, const tr_benc *src)
+{
+    size_t idx, count;
+
+    if (tr_bencIsBool(src)) {
+        bool value;
+        tr_bencGetBool(src, &value);
+        tr_bencInitBool(dst, value);
+    }
+    else if (tr_bencIsInt(src)) {
+        int64_t value;
+        tr_bencGetInt(src, &value);
+        tr_bencInitInt(dst, value);
+    }
+    else if (tr_bencIsReal(src)) {
+        double value;
+        tr_bencGetReal(src, &value);
+        tr_bencInitReal(dst, value);
+    }
+    else if (tr_bencIsString(src)) {
+        const uint8_t *raw;
+        size_t len;
+        tr_bencGetRaw(src, &raw, &len);
+        tr_bencInitRaw(dst, raw, len);
+    }
+    else if (tr_bencIsList(src)) {
+        count = tr_bencListSize(src);
+        tr_bencInitList(dst, count);
+        for (idx = 0; idx < count; ++idx)
+            _wrap_tr_bencCopy(tr_bencListAdd(dst), tr_bencListChild((tr_benc *)src, idx));
+    }
+    else if (tr_bencIsDict(src)) {
+        count = tr_bencDictSize(src);
+        tr_bencInitDict(dst, count);
+        for (idx = 0; idx < count; ++idx) {
+            const char *key;
+            tr_benc *val;
+            if (tr_bencDictChild((tr_benc *)src, idx, &key, &val))
+                _wrap_tr_bencCopy(tr_bencDictAdd(dst, key), val);
+        }
+    }
+}
+""")
+
+    root_module.header.writeln("int _wrap_PyBencIterator_Ready(void);")
+    root_module.header.writeln("PyObject *_wrap_PyBencIterator_New(PyObject *owner, int kind);")
+    root_module.header.writeln("enum { BENC_ITER_KEYS, BENC_ITER_VALUES, BENC_ITER_ITEMS };")
+    root_module.body.writeln("""
+typedef struct {
+    PyObject_HEAD
+    PyObject *owner;  /* the container view, which follows its node */
+    size_t pos;
+    int kind;
+} PyBencIterator;
+
+static PyTypeObject *PyBencIterator_Type;
+
+static PyObject *
+_wrap_PyBencIterator_Next(PyBencIterator *self)
+{
+    const char *key;
+    tr_benc *val;
+    PyObject *py_key, *py_val, *py_item;
+    tr_benc *benc;
+
+    if (self->owner == NULL)
+        return NULL;
+
+    benc = ((PyBenc *)self->owner)->obj;
+    if (tr_bencIsList(benc)) {
+        if (self->pos < tr_bencListSize(benc))
+            return _wrap_tr_bencToPyValue(tr_bencListChild(benc, self->pos++), self->owner);
+    }
+    else if (tr_bencDictChild(benc, self->pos++, &key, &val)) {
+        if (self->kind == BENC_ITER_VALUES)
+            return _wrap_tr_bencToPyValue(val, self->owner);
+        py_key = _wrap_tr_bencKeyToPython(key, strlen(key));
+        if (self->kind == BENC_ITER_KEYS || py_key == NULL)
+            return py_key;
+        if ((py_val = _wrap_tr_bencToPyValue(val, self->owner)) == NULL) {
+            Py_DECREF(py_key);
+            return NULL;
+        }
+        py_item = PyTuple_Pack(2, py_key, py_val);
+        Py_DECREF(py_key);
+        Py_DECREF(py_val);
+        return py_item;
+    }
+
+    Py_CLEAR(self->owner);
+    return NULL;
+}
+
+static void
+_wrap_PyBencIterator_Dealloc(PyBencIterator *self)
+{
+    PyTypeObject *type = Py_TYPE(self);
+
+    Py_XDECREF(self->owner);
+    PyObject_Del(self);
+    Py_DECREF(type);
+}
+
+static PyType_Slot _wrap_PyBencIterator_slots[] = {
+    {Py_tp_dealloc, (void *) _wrap_PyBencIterator_Dealloc},
+    {Py_tp_iter, (void *) PyObject_SelfIter},
+    {Py_tp_iternext, (void *) _wrap_PyBencIterator_Next},
+    {0, NULL}
+};
+
+static PyType_Spec _wrap_PyBencIterator_spec = {
+    "transmission.bencode.BencIterator",
+    sizeof(PyBencIterator),
+    0,
+    Py_TPFLAGS_DEFAULT,
+    _wrap_PyBencIterator_slots
+};
+
+int _wrap_PyBencIterator_Ready(void)
+{
+    PyBencIterator_Type = (PyTypeObject *)PyType_FromSpec(&_wrap_PyBencIterator_spec);
+    return PyBencIterator_Type ? 0 : -1;
+}
+
+PyObject *_wrap_PyBencIterator_New(PyObject *owner, int kind)
+{
+    PyBencIterator *self = (PyBencIterator *)PyType_GenericAlloc(PyBencIterator_Type, 0);
+
+    if (self == NULL)
+        return NULL;
+    Py_INCREF(owner);
+    self->owner = owner;
+    self->pos = 0;
+    self->kind = kind;
+    return (PyObject *)self;
+}
+""")
+    root_module.after_init.write_error_check('_wrap_PyBencIterator_Ready() < 0')
+
+    root_module.header.writeln("tr_benc *_wrap_tr_bencGetValue(tr_benc * benc);")
+    root_module.body.writeln("tr_benc *_wrap_tr_bencGetValue(tr_benc * benc)\n"
+                             "{\n"
+                             "    if (!benc || tr_bencIsList(benc) || tr_bencIsDict(benc))\n"
+                             "        return NULL;\n"
+                             "    return benc;\n"
+                             "}")
+
+    cls.add_instance_attribute('value',
+                               BencValueReturn('tr_benc *'), 
+                               is_const=True,
+                               is_pure_c=True,
+                               getter='_wrap_tr_bencGetValue')
+
+    cls.add_function_as_method('tr_bencToStr',
+                               'char *', 
+                               [param('Benc *', 'benc', transfer_ownership=False),
+                                param('tr_fmt_mode', 'mode'),
+                                param('NULL', 'len')],
+                               custom_name='string')
+
+    root_module.header.writeln("PyObject *_wrap_tr_bencKeyToPython(const char *key, size_t len);")
+    root_module.header.writeln("const char *_wrap_tr_bencKeyFromPython(PyObject *py_key, PyObject **keep);")
+    root_module.body.writeln("""
+/* keys are raw bytes too, undecodable ones round trip through surrogateescape;
+ * as in a dict, a key ends at its first NUL */
+PyObject *_wrap_tr_bencKeyToPython(const char *key, size_t len)
+{
+    const char *nul = (const char *)memchr(key, '\0', len);
+    return PyUnicode_DecodeUTF8(key, nul ? (Py_ssize_t)(nul - key) : (Py_ssize_t)len, "surrogateescape");
+}
+
+/*
+ * Returns the C string for a str or bytes key, *keep gets a reference to drop
+ * once it isn't needed anymore. Keys with a NUL can't be in a dict and raise
+ * ValueError, other types raise TypeError.
+ */
+const char *_wrap_tr_bencKeyFromPython(PyObject *py_key, PyObject **keep)
+{
+    const char *key;
+    Py_ssize_t len;
+
+    *keep = NULL;
+    if (PyUnicode_Check(py_key)) {
+        if ((key = PyUnicode_AsUTF8AndSize(py_key, &len)) == NULL) {
+            if (!PyErr_ExceptionMatches(PyExc_UnicodeEncodeError))
+                return NULL;
+            PyErr_Clear();
+            if ((*keep = PyUnicode_AsEncodedString(py_key, "utf-8", "surrogateescape")) == NULL)
+                return NULL;
+            key = PyBytes_AS_STRING(*keep);
+            len = PyBytes_GET_SIZE(*keep);
+        }
+    }
+    else if (PyBytes_Check(py_key)) {
+        key = PyBytes_AS_STRING(py_key);
+        len = PyBytes_GET_SIZE(py_key);
+    }
+    else {
+        PyErr_Format(PyExc_TypeError, "BencDict keys must be str, not '%.200s'",
+                     Py_TYPE(py_key)->tp_name);
+        return NULL;
+    }
+
+    if (strlen(key) != (size_t)len) {
+        Py_CLEAR(*keep);
+        PyErr_SetString(PyExc_ValueError, "BencDict keys must not contain NUL characters");
+        return NULL;
+    }
+    return key;
+}
+""")
+
+    root_module.header.writeln("PyObject *_wrap_tr_bencRawToPython(const uint8_t *raw, size_t len);")
+    root_module.body.writeln("""
+PyObject *_wrap_tr_bencRawToPython(const uint8_t *raw, size_t len)
+{
+    /* binary strings (piece hashes, compact peers) come back as bytes */
+    PyObject *py_obj = PyUnicode_DecodeUTF8((const char *)raw, len, NULL);
+    if (py_obj == NULL && PyErr_ExceptionMatches(PyExc_UnicodeDecodeError)) {
+        PyErr_Clear();
+        py_obj = PyBytes_FromStringAndSize((const char *)raw, len);
+    }
+    return py_obj;
+}
+""")
+
+    root_module.header.writeln("PyObject *_wrap_tr_bencToPython(tr_benc *benc);")
+    root_module.body.writeln("""
+PyObject *_wrap_tr_bencToPython(tr_benc *benc)
+{
+    PyObject *py_obj = NULL;
+    size_t idx, count;
+
+    if (tr_bencIsBool(benc)) {
+        bool value;
+        if (tr_bencGetBool(benc, &value))
+            py_obj = PyBool_FromLong(value);
+    }
+    else if (tr_bencIsInt(benc)) {
+        int64_t value;
+        if (tr_bencGetInt(benc, &value))
+            py_obj = PyLong_FromLongLong(value);
+    }
+    else if (tr_bencIsReal(benc)) {
+        double value;
+        if (tr_bencGetReal(benc, &value))
+            py_obj = PyFloat_FromDouble(value);
+    }
+    else if (tr_bencIsString(benc)) {
+        const uint8_t *raw;
+        size_t len;
+        if (tr_bencGetRaw(benc, &raw, &len))
+            py_obj = _wrap_tr_bencRawToPython(raw, len);
+    }
+    else if (tr_bencIsList(benc)) {
+        if (Py_EnterRecursiveCall((char *) " while converting a BencList"))
+            return NULL;
+        count = tr_bencListSize(benc);
+        py_obj = PyList_New(count);
+        for (idx = 0; py_obj && idx < count; ++idx) {
+            PyObject *py_item = _wrap_tr_bencToPython(tr_bencListChild(benc, idx));
+            if (py_item == NULL) {
+                Py_CLEAR(py_obj);
+                break;
+            }
+            PyList_SET_ITEM(py_obj, idx, py_item);
+        }
+        Py_LeaveRecursiveCall();
+        return py_obj;
+    }
+    else if (tr_bencIsDict(benc)) {
+        if (Py_EnterRecursiveCall((char *) " while converting a BencDict"))
+            return NULL;
+        count = tr_bencDictSize(benc);
+        py_obj = PyDict_New();
+        for (idx = 0; py_obj && idx < count; ++idx) {
+            const char *key;
+            tr_benc *val;
+            PyObject *py_key, *py_val;
+            if (!tr_bencDictChild(benc, idx, &key, &val))
+                continue;
+            py_key = _wrap_tr_bencKeyToPython(key, strlen(key));
+            py_val = py_key ? _wrap_tr_bencToPython(val) : NULL;
+            if (py_val == NULL || PyDict_SetItem(py_obj, py_key, py_val) < 0)
+                Py_CLEAR(py_obj);
+            Py_XDECREF(py_key);
+            Py_XDECREF(py_val);
+        }
+        Py_LeaveRecursiveCall();
+        return py_obj;
+    }
+
+    if (py_obj == NULL && !PyErr_Occurred())
+        PyErr_SetString(PyExc_ValueError, "Unable to get Benc value");
+    return py_obj;
+}
+""")
+
+    cls.add_custom_method_wrapper('to_python',
+                                  '_wrap_transmission_tr_bencToPython',
+                                  flags=["METH_NOARGS"],
+                                  wrapper_body="""
+PyObject *
+_wrap_transmission_tr_bencToPython(PyBenc *self, PyObject **return_exception)
+{
+    return _wrap_tr_bencToPython(self->obj);
+}""")
+
+    root_module.header.writeln("int _wrap_tr_bencPathWalk(tr_benc *node, char **segments, size_t count, PyObject *matches);")
+    root_module.body.writeln("""
+int _wrap_tr_bencPathWalk(tr_benc *node, char **segments, size_t count, PyObject *matches)
+{
+    const char *segment;
+    size_t idx, size;
+
+    if (count == 0) {
+        PyObject *py_value = _wrap_tr_bencToPython(node);
+        int ret;
+        if (py_value == NULL)
+            return -1;
+        ret = PyList_Append(matches, py_value);
+        Py_DECREF(py_value);
+        return ret;
+    }
+
+    segment = segments[0];
+    if (!strcmp(segment, "*")) {
+        if (tr_bencIsDict(node)) {
+            size = tr_bencDictSize(node);
+            for (idx = 0; idx < size; ++idx) {
+                const char *key;
+                tr_benc *val;
+                if (tr_bencDictChild(node, idx, &key, &val) &&
+                    _wrap_tr_bencPathWalk(val, segments + 1, count - 1, matches) < 0)
+                    return -1;
+            }
+        }
+        else if (tr_bencIsList(node)) {
+            size = tr_bencListSize(node);
+            for (idx = 0; idx < size; ++idx)
+                if (_wrap_tr_bencPathWalk(tr_bencListChild(node, idx), segments + 1, count - 1, matches) < 0)
+                    return -1;
+        }
+        return 0;
+    }
+
+    if (tr_bencIsDict(node)) {
+        tr_benc *child = tr_bencDictFind(node, segment);
+        return child ? _wrap_tr_bencPathWalk(child, segments + 1, count - 1, matches) : 0;
+    }
+    else if (tr_bencIsList(node)) {
+        char *end;
+        long index = strtol(segment, &end, 10);
+
+        size = tr_bencListSize(node);
+        if (*end != '\\0')
+            return 0;
+        if (index < 0)
+            index += size;
+        if (index < 0 || (size_t)index >= size)
+            return 0;
+        return _wrap_tr_bencPathWalk(tr_bencListChild(node, index), segments + 1, count - 1, matches);
+    }
+    return 0;
+}
+""")
+
+    cls.add_custom_method_wrapper('get_path',
+                                  '_wrap_transmission_tr_bencGetPath',
+                                  flags=["METH_VARARGS", "METH_KEYWORDS"],
+                                  wrapper_body="""
+PyObject *
+_wrap_transmission_tr_bencGetPath(PyBenc *self, PyObject *args,
+                                  PyObject *kwargs, PyObject **return_exception)
+{
+    PyObject *py_default = NULL;
+    PyObject *py_retval = NULL;
+    PyObject *matches;
+    PyObject *exc_type, *traceback;
+    const char *path;
+    char *copy, *pos;
+    char **segments;
+    size_t count = 0;
+    bool wildcard = false;
+    const char *keywords[] = {"path", "default", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "s|O", (char **) keywords, &path, &py_default)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+
+    /* split on '/', empty segments are ignored */
+    copy = tr_strdup(path);
+    segments = tr_new(char *, strlen(path) / 2 + 1);
+    for (pos = copy; *pos; ) {
+        char *sep = strchr(pos, '/');
+        if (sep)
+            *sep = '\\0';
+        if (*pos) {
+            segments[count++] = pos;
+            wildcard |= !strcmp(pos, "*");
+        }
+        if (!sep)
+            break;
+        pos = sep + 1;
+    }
+
+    if ((matches = PyList_New(0)) != NULL &&
+        _wrap_tr_bencPathWalk(self->obj, segments, count, matches) == 0) {
+        if (wildcard) {
+            Py_INCREF(matches);
+            py_retval = matches;
+        }
+        else if (PyList_GET_SIZE(matches)) {
+            py_retval = PyList_GET_ITEM(matches, 0);
+            Py_INCREF(py_retval);
+        }
+        else if (py_default) {
+            Py_INCREF(py_default);
+            py_retval = py_default;
+        }
+        else {
+            PyErr_SetString(PyExc_KeyError, path);
+        }
+    }
+
+    Py_XDECREF(matches);
+    tr_free(segments);
+    tr_free(copy);
+    return py_retval;
+}""")
+
+    root_module.header.writeln("struct evbuffer *_wrap_tr_bencToBuf(tr_benc *benc, int mode);")
+    root_module.body.writeln("""
+struct evbuffer *_wrap_tr_bencToBuf(tr_benc *benc, int mode)
+{
+    struct evbuffer *buf;
+
+    if (mode != TR_FMT_BENC && mode != TR_FMT_JSON && mode != TR_FMT_JSON_LEAN) {
+        PyErr_SetString(PyExc_ValueError, "must be a 'transmission.benc_serialization_mode' value");
+        return NULL;
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    buf = tr_bencToBuf(benc, (tr_fmt_mode)mode);
+    Py_END_ALLOW_THREADS
+
+    if (buf == NULL)
+        PyErr_NoMemory();
+    return buf;
+}
+""")
+
+    root_module.header.writeln("PyObject *_wrap_tr_bencToBytes(tr_benc *benc, int mode);")
+    root_module.body.writeln("""
+PyObject *_wrap_tr_bencToBytes(tr_benc *benc, int mode)
+{
+    PyObject *py_bytes;
+    struct evbuffer *buf;
+    size_t len;
+
+    if ((buf = _wrap_tr_bencToBuf(benc, mode)) == NULL)
+        return NULL;
+
+    /* copy straight out of the evbuffer chain, embedded NULs and all */
+    len = evbuffer_get_length(buf);
+    py_bytes = PyBytes_FromStringAndSize(NULL, len);
+    if (py_bytes)
+        evbuffer_remove(buf, PyBytes_AS_STRING(py_bytes), len);
+    evbuffer_free(buf);
+    return py_bytes;
+}
+""")
+
+    cls.add_custom_method_wrapper('dumps',
+                                  '_wrap_transmission_tr_bencDumps',
+                                  flags=["METH_VARARGS", "METH_KEYWORDS"],
+                                  wrapper_body="""
+PyObject *
+_wrap_transmission_tr_bencDumps(PyBenc *self, PyObject *args,
+                                PyObject *kwargs, PyObject **return_exception)
+{
+    PyObject *exc_type, *traceback;
+    int mode = TR_FMT_BENC;
+    const char *keywords[] = {"mode", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "|i", (char **) keywords, &mode)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+
+    return _wrap_tr_bencToBytes(self->obj, mode);
+}""")
+
+    cls.add_custom_method_wrapper('dump_into',
+                                  '_wrap_transmission_tr_bencDumpInto',
+                                  flags=["METH_VARARGS", "METH_KEYWORDS"],
+                                  wrapper_body="""
+PyObject *
+_wrap_transmission_tr_bencDumpInto(PyBenc *self, PyObject *args,
+                                   PyObject *kwargs, PyObject **return_exception)
+{
+    PyObject *exc_type, *traceback;
+    struct evbuffer *buf;
+    Py_buffer buffer;
+    Py_ssize_t offset = 0;
+    size_t len;
+    int mode = TR_FMT_BENC;
+    const char *keywords[] = {"buffer", "offset", "mode", NULL};
 
-    cls.add_instance_attribute('value',
-                               BencValueReturn('tr_benc *'), 
-                               is_const=True,
-                               is_pure_c=True,
-                               getter='_wrap_tr_bencGetValue')
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "w*|ni", (char **) keywords,
+                                     &buffer, &offset, &mode)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
 
-    cls.add_function_as_method('tr_bencToStr',
-                               'char *', 
-                               [param('Benc *', 'benc', transfer_ownership=False),
-                                param('tr_fmt_mode', 'mode'),
-                                param('NULL', 'len')],
-                               custom_name='string')
+    if (offset < 0 || offset > buffer.len) {
+        PyBuffer_Release(&buffer);
+        PyErr_Format(PyExc_ValueError, "offset %zd out of range for %zd byte buffer",
+                     offset, buffer.len);
+        return NULL;
+    }
+
+    if ((buf = _wrap_tr_bencToBuf(self->obj, mode)) == NULL) {
+        PyBuffer_Release(&buffer);
+        return NULL;
+    }
+
+    len = evbuffer_get_length(buf);
+    if (len > (size_t)(buffer.len - offset)) {
+        evbuffer_free(buf);
+        PyBuffer_Release(&buffer);
+        PyErr_Format(PyExc_ValueError, "dump_into requires a buffer of at least %zd bytes",
+                     (Py_ssize_t)len + offset);
+        return NULL;
+    }
+
+    evbuffer_remove(buf, (char *)buffer.buf + offset, len);
+    evbuffer_free(buf);
+    PyBuffer_Release(&buffer);
+    return PyLong_FromSize_t(len);
+}""")
+
+    root_module.header.writeln("bool _wrap_tr_bencIsBencSafe(const tr_benc *benc);")
+    root_module.body.writeln("""
+bool _wrap_tr_bencIsBencSafe(const tr_benc *benc)
+{
+    size_t idx;
+
+    /* bencode has no bool or real type, tr_bencToBuf() flattens them */
+    if (tr_bencIsBool(benc) || tr_bencIsReal(benc))
+        return false;
+    if (tr_bencIsList(benc) || tr_bencIsDict(benc))
+        for (idx = 0; idx < benc->val.l.count; ++idx)
+            if (!_wrap_tr_bencIsBencSafe(&benc->val.l.vals[idx]))
+                return false;
+    return true;
+}
+""")
+
+    cls.add_custom_method_wrapper('__reduce__',
+                                  '_wrap_transmission_tr_bencReduce',
+                                  flags=["METH_NOARGS"],
+                                  wrapper_body="""
+PyObject *
+_wrap_transmission_tr_bencReduce(PyBenc *self, PyObject **return_exception)
+{
+    PyObject *py_module, *py_func, *py_arg;
+    bool benc_safe;
+
+    if ((py_module = PyImport_ImportModule("transmission.bencode")) == NULL)
+        return NULL;
+
+    Py_BEGIN_ALLOW_THREADS
+    benc_safe = _wrap_tr_bencIsBencSafe(self->obj);
+    Py_END_ALLOW_THREADS
+
+    if (benc_safe) {
+        py_func = PyObject_GetAttrString(py_module, "loads");
+        py_arg = py_func ? _wrap_tr_bencToBytes(self->obj, TR_FMT_BENC) : NULL;
+    }
+    else {
+        py_func = PyObject_GetAttrString(py_module, "from_python");
+        py_arg = py_func ? _wrap_tr_bencToPython(self->obj) : NULL;
+    }
+    Py_DECREF(py_module);
+
+    if (py_arg == NULL) {
+        Py_XDECREF(py_func);
+        return NULL;
+    }
+    return Py_BuildValue((char *) "(N(N))", py_func, py_arg);
+}""")
+
+    root_module.header.writeln("PyObject *_wrap_PyBenc_Copy(PyBenc *self, bool deep);")
+    root_module.body.writeln("""
+PyObject *_wrap_PyBenc_Copy(PyBenc *self, bool deep)
+{
+    PyObject *py_copy;
+    tr_benc *benc;
 
+    if (!deep) {
+        /* another view of the same node, pinning the owning tree */
+        py_copy = _wrap_PyBenc_New(self->obj, PYBINDGEN_WRAPPER_FLAG_OBJECT_NOT_OWNED);
+        if (py_copy != NULL && _wrap_PyBenc_SetOwner(py_copy, (PyObject *) self) < 0)
+            Py_CLEAR(py_copy);
+        return py_copy;
+    }
+
+    if ((benc = tr_new0(tr_benc, 1)) == NULL)
+        return PyErr_NoMemory();
+
+    Py_BEGIN_ALLOW_THREADS
+    _wrap_tr_bencCopy(benc, self->obj);
+    Py_END_ALLOW_THREADS
+
+    if ((py_copy = _wrap_PyBenc_New(benc, PYBINDGEN_WRAPPER_FLAG_NONE)) == NULL) {
+        tr_bencFree(benc);
+        tr_free(benc);
+    }
+    return py_copy;
+}
+""")
+
+    cls.add_custom_method_wrapper('copy',
+                                  '_wrap_transmission_tr_bencCopy',
+                                  flags=["METH_VARARGS", "METH_KEYWORDS"],
+                                  wrapper_body="""
+PyObject *
+_wrap_transmission_tr_bencCopy(PyBenc *self, PyObject *args,
+                               PyObject *kwargs, PyObject **return_exception)
+{
+    PyObject *py_deep = Py_True;
+    PyObject *exc_type, *traceback;
+    int deep;
+    const char *keywords[] = {"deep", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "|O", (char **) keywords, &py_deep)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+    if ((deep = PyObject_IsTrue(py_deep)) < 0)
+        return NULL;
+
+    return _wrap_PyBenc_Copy(self, deep);
+}""")
+
+    # items live inside their container, so even copy.copy() has to duplicate
+    # them to get a new container; only copy(deep=False) shares the tree
+    cls.add_custom_method_wrapper('__copy__',
+                                  '_wrap_transmission_tr_bencCopyShallow',
+                                  flags=["METH_NOARGS"],
+                                  wrapper_body="""
+PyObject *
+_wrap_transmission_tr_bencCopyShallow(PyBenc *self, PyObject **return_exception)
+{
+    return _wrap_PyBenc_Copy(self, true);
+}""")
+
+    cls.add_custom_method_wrapper('__deepcopy__',
+                                  '_wrap_transmission_tr_bencDeepCopy',
+                                  flags=["METH_VARARGS", "METH_KEYWORDS"],
+                                  wrapper_body="""
+PyObject *
+_wrap_transmission_tr_bencDeepCopy(PyBenc *self, PyObject *args,
+                                   PyObject *kwargs, PyObject **return_exception)
+{
+    PyObject *py_memo, *py_id, *py_copy;
+    PyObject *exc_type, *traceback;
+    const char *keywords[] = {"memo", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "O", (char **) keywords, &py_memo)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+
+    /* record the copy like copy.deepcopy() does, so other references to
+     * this wrapper in the same deepcopy() get the same copy */
+    if ((py_copy = _wrap_PyBenc_Copy(self, true)) == NULL)
+        return NULL;
+    if (py_memo != Py_None) {
+        if ((py_id = PyLong_FromVoidPtr(self)) == NULL ||
+            PyObject_SetItem(py_memo, py_id, py_copy) < 0) {
+            Py_XDECREF(py_id);
+            Py_DECREF(py_copy);
+            return NULL;
+        }
+        Py_DECREF(py_id);
+    }
+    return py_copy;
+}""")
     return
 
 def register_Tr_benc_bool_methods(root_module, cls):
@@ -119,6 +2376,66 @@ tr_benc *_wrap_tr_bencNewStr(const void *str, int str_len)
     cls.add_function_as_constructor("_wrap_tr_bencNewStr",
                                     ReturnValue.new("tr_benc*", caller_owns_return=True),
                                     [CharPtrLenParam('const char *', 'value')])
+
+    root_module.header.writeln("tr_benc *_wrap_tr_bencGetString(tr_benc *benc);")
+    root_module.body.writeln("tr_benc *_wrap_tr_bencGetString(tr_benc *benc)\n"
+                             "{\n"
+                             "    if (!benc || !tr_bencIsString(benc))\n"
+                             "        return NULL;\n"
+                             "    return benc;\n"
+                             "}")
+
+    cls.add_instance_attribute('raw',
+                               BencRawReturn('tr_benc *'),
+                               is_const=True,
+                               is_pure_c=True,
+                               getter='_wrap_tr_bencGetString')
+
+    cls.add_instance_attribute('view',
+                               BencRawReturn('tr_benc *', view=True),
+                               is_const=True,
+                               is_pure_c=True,
+                               getter='_wrap_tr_bencGetString')
+
+    ## read-only buffer protocol, the memoryview keeps the wrapper alive and
+    ## each export pins the string and its containers, as a bytearray can't
+    ## be resized while exported; views alone never pin anything
+    root_module.header.writeln("extern PyBufferProcs _wrap_PyBencString_BufferProcs;")
+    root_module.body.writeln("""
+static int
+_wrap_PyBencString_GetBuffer(PyBencString *self, Py_buffer *view, int flags)
+{
+    const uint8_t *raw;
+    size_t len;
+
+    if (self->obj == NULL || !tr_bencGetRaw(self->obj, &raw, &len)) {
+        view->obj = NULL;
+        PyErr_SetString(PyExc_BufferError, "BencString has no data");
+        return -1;
+    }
+    if (_wrap_PyBenc_Pin((PyObject *)self, 1) < 0) {
+        view->obj = NULL;
+        return -1;
+    }
+    if (PyBuffer_FillInfo(view, (PyObject *)self, (void *)raw, len, 1, flags) < 0) {
+        _wrap_PyBenc_Pin((PyObject *)self, -1);
+        return -1;
+    }
+    return 0;
+}
+
+static void
+_wrap_PyBencString_ReleaseBuffer(PyBencString *self, Py_buffer *view)
+{
+    _wrap_PyBenc_Pin((PyObject *)self, -1);
+}
+
+PyBufferProcs _wrap_PyBencString_BufferProcs = {
+    (getbufferproc) _wrap_PyBencString_GetBuffer,
+    (releasebufferproc) _wrap_PyBencString_ReleaseBuffer
+};
+""")
+    cls.slots['tp_as_buffer'] = '&_wrap_PyBencString_BufferProcs'
     return
 
 def register_Tr_benc_list_methods(root_module, cls):
@@ -136,40 +2453,62 @@ tr_benc *_wrap_tr_bencNewList(size_t reserveCount)
                                     ReturnValue.new("tr_benc*", caller_owns_return=True),
                                     [param('size_t', 'reserve_count')])
 
-    cls.add_function_as_method('tr_bencListAddBool', 
+    # appending may move the existing items, and keeping track of the views
+    # uses the Python API, so these are bound with unblock_threads=False
+    for suffix, ctype, _ in BENC_ADD_TYPES:
+        root_module.header.writeln("tr_benc *_wrap_tr_bencListAdd%s(tr_benc *list, %s value);" % (suffix, ctype))
+        root_module.body.writeln("""
+tr_benc *_wrap_tr_bencListAdd%s(tr_benc *list, %s value)
+{
+    _wrap_tr_bencChange change;
+    tr_benc *item;
+
+    if (_wrap_PyBenc_BeginChange(&change, list, NULL, 0) < 0)
+        return NULL;
+    item = tr_bencListAdd%s(list, value);
+    return _wrap_PyBenc_EndChange(&change) < 0 ? NULL : item;
+}""" % (suffix, ctype, suffix))
+
+    cls.add_function_as_method('_wrap_tr_bencListAddBool', 
                                ReturnValue.new('tr_benc *', caller_owns_return=False), 
                                [param('BencList *', 'benc', transfer_ownership=False),
                                 param('bool', 'value')],
+                               unblock_threads=False,
                                custom_name='add_bool')
 
-    cls.add_function_as_method('tr_bencListAddInt', 
+    cls.add_function_as_method('_wrap_tr_bencListAddInt', 
                                ReturnValue.new('tr_benc *', caller_owns_return=False), 
                                [param('BencList *', 'benc', transfer_ownership=False),
                                 param('int64_t', 'value')],
+                               unblock_threads=False,
                                custom_name='add_int')
 
-    cls.add_function_as_method('tr_bencListAddReal', 
+    cls.add_function_as_method('_wrap_tr_bencListAddReal', 
                                ReturnValue.new('tr_benc *', caller_owns_return=False), 
                                [param('BencList *', 'benc', transfer_ownership=False),
                                 param('double', 'value')],
+                               unblock_threads=False,
                                custom_name='add_real')
 
-    cls.add_function_as_method('tr_bencListAddStr', 
+    cls.add_function_as_method('_wrap_tr_bencListAddStr', 
                                ReturnValue.new('tr_benc *', caller_owns_return=False), 
                                [param('BencList *', 'benc', transfer_ownership=False),
                                 param('char const *', 'value')],
+                               unblock_threads=False,
                                custom_name='add_string')
 
-    cls.add_function_as_method('tr_bencListAddDict', 
+    cls.add_function_as_method('_wrap_tr_bencListAddDict', 
                                ReturnValue.new('tr_benc *', caller_owns_return=False), 
                                [param('BencList *', 'benc', transfer_ownership=False),
                                 param('size_t', 'reserve')],
+                               unblock_threads=False,
                                custom_name='add_dict')
 
-    cls.add_function_as_method('tr_bencListAddList', 
+    cls.add_function_as_method('_wrap_tr_bencListAddList', 
                                'tr_benc *',
                                [param('BencList *', 'benc', transfer_ownership=False),
                                 param('size_t', 'reserve')],
+                               unblock_threads=False,
                                custom_name='add_list')
 
     cls.add_function_as_method('tr_bencListSize', 
@@ -177,11 +2516,329 @@ tr_benc *_wrap_tr_bencNewList(size_t reserveCount)
                                [param('BencList *', 'benc', transfer_ownership=False)],
                                custom_name='__len__')
 
-    cls.add_function_as_method('tr_bencListChild', 
-                               BencValueReturn('tr_benc *', index='index'), 
-                               [param('BencList *', 'benc', transfer_ownership=False),
-                                param('int', 'index')],
-                               custom_name='__getitem__')
+    cls.add_function_as_method('tr_bencListChild', 
+                               BencValueReturn('tr_benc *', index='index'), 
+                               [param('BencList *', 'benc', transfer_ownership=False),
+                                param('int', 'index')],
+                               custom_name='__getitem__')
+
+    ## mapping methods, for negative indices and slicing
+    cls.add_function_as_method('tr_bencListSize', 
+                               'size_t', 
+                               [param('BencList *', 'benc', transfer_ownership=False)],
+                               custom_name='__maplen__')
+
+    cls.add_custom_method_wrapper('__mapget__',
+                                  '_wrap_transmission_tr_bencListSubscript',
+                                  flags=["METH_VARARGS", "METH_KEYWORDS"],
+                                  wrapper_body="""
+PyObject *
+_wrap_transmission_tr_bencListSubscript(PyBencList *self, PyObject *args,
+                                        PyObject *kwargs, PyObject **return_exception)
+{
+    PyObject *py_key;
+    PyObject *exc_type, *traceback;
+    Py_ssize_t length = tr_bencListSize(self->obj);
+    const char *keywords[] = {"key", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "O", (char **) keywords, &py_key)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+
+    if (PySlice_Check(py_key)) {
+        Py_ssize_t start, stop, step, count, idx;
+        PyObject *py_list;
+
+        if (PySlice_GetIndicesEx(py_key, length, &start, &stop, &step, &count) < 0)
+            return NULL;
+        py_list = PyList_New(count);
+        for (idx = 0; py_list && idx < count; ++idx, start += step) {
+            PyObject *py_item = _wrap_tr_bencToPyValue(tr_bencListChild(self->obj, start),
+                                                       (PyObject *) self);
+            if (py_item == NULL) {
+                Py_CLEAR(py_list);
+                break;
+            }
+            PyList_SET_ITEM(py_list, idx, py_item);
+        }
+        return py_list;
+    }
+    else if (PyIndex_Check(py_key)) {
+        Py_ssize_t index = PyNumber_AsSsize_t(py_key, PyExc_IndexError);
+        if (index == -1 && PyErr_Occurred())
+            return NULL;
+        if (index < 0)
+            index += length;
+        if (index < 0 || index >= length) {
+            PyErr_SetString(PyExc_IndexError, "index out of range");
+            return NULL;
+        }
+        return _wrap_tr_bencToPyValue(tr_bencListChild(self->obj, index), (PyObject *) self);
+    }
+
+    PyErr_Format(PyExc_TypeError, "BencList indices must be integers or slices, not '%.200s'",
+                 Py_TYPE(py_key)->tp_name);
+    return NULL;
+}""")
+
+    root_module.header.writeln("PyObject *_wrap_PyBencList_Iter(PyBencList *self);")
+    root_module.body.writeln("""
+PyObject *_wrap_PyBencList_Iter(PyBencList *self)
+{
+    return _wrap_PyBencIterator_New((PyObject *)self, BENC_ITER_VALUES);
+}
+""")
+    cls.slots['tp_iter'] = '_wrap_PyBencList_Iter'
+
+    root_module.header.writeln("Py_ssize_t _wrap_tr_bencListSearch(tr_benc *list, PyObject *py_value, bool first);")
+    root_module.body.writeln("""
+Py_ssize_t _wrap_tr_bencListSearch(tr_benc *list, PyObject *py_value, bool first)
+{
+    size_t idx, length = tr_bencListSize(list);
+    Py_ssize_t count = 0;
+
+    for (idx = 0; idx < length; ++idx) {
+        PyObject *py_item = _wrap_tr_bencToPyValue(tr_bencListChild(list, idx), NULL);
+        int cmp;
+
+        if (py_item == NULL)
+            return -2;
+        cmp = PyObject_RichCompareBool(py_item, py_value, Py_EQ);
+        Py_DECREF(py_item);
+        if (cmp < 0)
+            return -2;
+        if (cmp && first)
+            return idx;
+        count += cmp;
+    }
+    return first ? -1 : count;
+}
+""")
+
+    cls.add_custom_method_wrapper('index',
+                                  '_wrap_transmission_tr_bencListIndex',
+                                  flags=["METH_VARARGS", "METH_KEYWORDS"],
+                                  wrapper_body="""
+PyObject *
+_wrap_transmission_tr_bencListIndex(PyBencList *self, PyObject *args,
+                                    PyObject *kwargs, PyObject **return_exception)
+{
+    PyObject *py_value;
+    PyObject *exc_type, *traceback;
+    Py_ssize_t index;
+    const char *keywords[] = {"value", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "O", (char **) keywords, &py_value)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+
+    index = _wrap_tr_bencListSearch(self->obj, py_value, true);
+    if (index == -1)
+        PyErr_SetString(PyExc_ValueError, "value is not in BencList");
+    return index < 0 ? NULL : PyLong_FromSsize_t(index);
+}""")
+
+    cls.add_custom_method_wrapper('count',
+                                  '_wrap_transmission_tr_bencListCount',
+                                  flags=["METH_VARARGS", "METH_KEYWORDS"],
+                                  wrapper_body="""
+PyObject *
+_wrap_transmission_tr_bencListCount(PyBencList *self, PyObject *args,
+                                    PyObject *kwargs, PyObject **return_exception)
+{
+    PyObject *py_value;
+    PyObject *exc_type, *traceback;
+    Py_ssize_t count;
+    const char *keywords[] = {"value", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "O", (char **) keywords, &py_value)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+
+    count = _wrap_tr_bencListSearch(self->obj, py_value, false);
+    return count < 0 ? NULL : PyLong_FromSsize_t(count);
+}""")
+
+    root_module.header.writeln("int _wrap_tr_bencListExtendBuffer(tr_benc *list, Py_buffer *view);")
+    root_module.body.writeln("""
+static char
+_wrap_tr_bencBufferCode(const Py_buffer *view)
+{
+    const char *format = view->format ? view->format : "B";
+
+    if (*format == '@')
+        ++format;
+    if (!format[0] || format[1] || !strchr("bBhHiIlLqQnN?fd", format[0]))
+        return 0;
+    return format[0];
+}
+
+/* returns 1 when the buffer was consumed, 0 when its format isn't supported */
+int _wrap_tr_bencListExtendBuffer(tr_benc *list, Py_buffer *view)
+{
+    const char *pos = (const char *)view->buf;
+    size_t idx, count, start = tr_bencListSize(list);
+    bool overflow = false;
+    char code = _wrap_tr_bencBufferCode(view);
+
+    if (code == 0 || view->ndim > 1 || view->itemsize <= 0)
+        return 0;
+    count = view->len / view->itemsize;
+
+    Py_BEGIN_ALLOW_THREADS
+    tr_bencListReserve(list, count);
+    for (idx = 0; idx < count && !overflow; ++idx, pos += view->itemsize) {
+        int64_t ival = 0;
+        double dval;
+
+        switch (code) {
+        case 'b': { signed char v; memcpy(&v, pos, sizeof(v)); ival = v; break; }
+        case 'B': { unsigned char v; memcpy(&v, pos, sizeof(v)); ival = v; break; }
+        case 'h': { short v; memcpy(&v, pos, sizeof(v)); ival = v; break; }
+        case 'H': { unsigned short v; memcpy(&v, pos, sizeof(v)); ival = v; break; }
+        case 'i': { int v; memcpy(&v, pos, sizeof(v)); ival = v; break; }
+        case 'I': { unsigned int v; memcpy(&v, pos, sizeof(v)); ival = v; break; }
+        case 'l': { long v; memcpy(&v, pos, sizeof(v)); ival = v; break; }
+        case 'q': { long long v; memcpy(&v, pos, sizeof(v)); ival = v; break; }
+        case 'n': { Py_ssize_t v; memcpy(&v, pos, sizeof(v)); ival = v; break; }
+        case 'L':
+        case 'Q':
+        case 'N': {
+            unsigned long long v = 0;
+            if (view->itemsize == sizeof(unsigned long long)) {
+                memcpy(&v, pos, sizeof(v));
+            }
+            else {
+                unsigned long w;
+                memcpy(&w, pos, sizeof(w));
+                v = w;
+            }
+            overflow = v > INT64_MAX;
+            ival = (int64_t)v;
+            break;
+        }
+        case '?': {
+            unsigned char v;
+            memcpy(&v, pos, sizeof(v));
+            tr_bencListAddBool(list, v != 0);
+            continue;
+        }
+        case 'f':
+        case 'd':
+            if (code == 'f') {
+                float v;
+                memcpy(&v, pos, sizeof(v));
+                dval = v;
+            }
+            else {
+                memcpy(&dval, pos, sizeof(dval));
+            }
+            tr_bencListAddReal(list, dval);
+            continue;
+        }
+        if (!overflow)
+            tr_bencListAddInt(list, ival);
+    }
+    Py_END_ALLOW_THREADS
+
+    if (overflow) {
+        /* scalars own no memory, dropping them is enough */
+        list->val.l.count = start;
+        PyErr_SetString(PyExc_OverflowError, "value too large for a BencInt");
+        return -1;
+    }
+    return 1;
+}
+""")
+
+    cls.add_custom_method_wrapper('extend',
+                                  '_wrap_transmission_tr_bencListExtend',
+                                  flags=["METH_VARARGS", "METH_KEYWORDS"],
+                                  wrapper_body="""
+PyObject *
+_wrap_transmission_tr_bencListExtend(PyBencList *self, PyObject *args,
+                                     PyObject *kwargs, PyObject **return_exception)
+{
+    PyObject *py_iterable, *py_iter, *py_item;
+    PyObject *exc_type, *traceback;
+    _wrap_tr_bencChange change;
+    Py_ssize_t hint;
+    const char *keywords[] = {"iterable", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "O", (char **) keywords, &py_iterable)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+
+    if (_wrap_PyBenc_BeginChange(&change, self->obj, NULL, 0) < 0)
+        return NULL;
+
+    /* typed arrays, bytes and friends are copied in one go */
+    if (PyObject_CheckBuffer(py_iterable)) {
+        Py_buffer view;
+        int ret;
+
+        if (PyObject_GetBuffer(py_iterable, &view, PyBUF_FORMAT | PyBUF_ND) == 0) {
+            ret = _wrap_tr_bencListExtendBuffer(self->obj, &view);
+            PyBuffer_Release(&view);
+            if (ret != 0) {
+                if (_wrap_PyBenc_EndChange(&change) < 0 || ret < 0)
+                    return NULL;
+                Py_RETURN_NONE;
+            }
+        }
+        else {
+            PyErr_Clear();
+        }
+    }
+
+    if ((hint = PyObject_LengthHint(py_iterable, 0)) < 0)
+        return NULL;
+    if ((py_iter = PyObject_GetIter(py_iterable)) == NULL)
+        return NULL;
+    tr_bencListReserve(self->obj, hint);
+    if (_wrap_PyBenc_EndChange(&change) < 0) {
+        Py_DECREF(py_iter);
+        return NULL;
+    }
+
+    /* the iterator runs Python code, which may use views of the items or
+     * export one of them, so each item is a change of its own */
+    while ((py_item = PyIter_Next(py_iter)) != NULL) {
+        tr_benc *child;
+        int ret;
+
+        if (_wrap_PyBenc_BeginChange(&change, self->obj, NULL, 0) < 0) {
+            Py_DECREF(py_item);
+            break;
+        }
+        child = tr_bencListAdd(self->obj);
+        ret = _wrap_tr_bencFromPython(child, py_item, true);
+        Py_DECREF(py_item);
+        if (ret < 0) {
+            tr_bencFree(child);
+            --self->obj->val.l.count;
+        }
+        if (_wrap_PyBenc_EndChange(&change) < 0 || ret < 0)
+            break;
+    }
+    Py_DECREF(py_iter);
+
+    if (PyErr_Occurred())
+        return NULL;
+    Py_RETURN_NONE;
+}""")
 
     cls.add_custom_method_wrapper('__setitem__',
                                   '_wrap_transmission_tr_bencListSet',
@@ -204,6 +2861,9 @@ _wrap_transmission_tr_bencListSet(PyBencList *self, PyObject *args,
         return NULL;
     }
 
+    if (_wrap_PyBenc_CheckMutable(self->obj) < 0)
+        return NULL;
+
     retval = tr_bencListChild(self->obj, index);
 
     if (!retval) {
@@ -256,53 +2916,315 @@ tr_benc *_wrap_tr_bencNewDict(size_t reserveCount)
                                     ReturnValue.new("tr_benc*", caller_owns_return=True),
                                     [param('size_t', 'reserve_count')])
 
-    cls.add_function_as_method('tr_bencDictAddBool', 
+    root_module.header.writeln("typedef struct _wrap_tr_bencKeyIndex _wrap_tr_bencKeyIndex;")
+    root_module.header.writeln("_wrap_tr_bencKeyIndex *_wrap_tr_bencIndexBuild(const tr_benc *dict);")
+    root_module.header.writeln("tr_benc *_wrap_tr_bencIndexFind(const _wrap_tr_bencKeyIndex *index, tr_benc *dict, const char *key);")
+    root_module.header.writeln("_wrap_tr_bencKeyIndex *_wrap_PyBencDict_Index(PyBencDict *self, PyObject **keep);")
+    root_module.header.writeln("tr_benc *_wrap_PyBencDict_Find(PyBencDict *self, const char *key);")
+    root_module.header.writeln("void _wrap_PyBenc_DropIndex(PyObject *self);")
+    root_module.header.writeln("void _wrap_PyBencDict_DropIndexes(const tr_benc *dict);")
+    root_module.body.writeln("""
+/* dicts smaller than this are scanned linearly, building an index doesn't pay off */
+#define _WRAP_BENC_INDEX_MIN_KEYS 16
+
+struct _wrap_tr_bencKeyIndex {
+    const tr_benc *dict;   /* the indexed node */
+    const tr_benc *vals;   /* dict->val.l.vals when the index was built */
+    size_t count;          /* dict->val.l.count when the index was built */
+    size_t mask;
+    size_t slots[1];       /* pair number + 1, 0 marks an empty slot */
+};
+
+/*
+ * dict wrapper address -> capsule holding its key index, or None after its
+ * first lookup. pybindgen's wrapper struct has no room for it, so it's a side
+ * table like the view owners; an entry goes away with its wrapper, and with
+ * _wrap_PyBencDict_DropIndexes() when the dict changes.
+ */
+static PyObject *_wrap_PyBencDict_Indexes = NULL;
+
+static size_t
+_wrap_tr_bencHashKey(const uint8_t *key, size_t len)
+{
+    size_t hash = 2166136261u;
+    while (len--)
+        hash = (hash ^ *key++) * 16777619u;
+    return hash;
+}
+
+static bool
+_wrap_tr_bencKeyEquals(const tr_benc *node, const uint8_t *key, size_t len)
+{
+    const uint8_t *raw;
+    size_t raw_len;
+    return tr_bencGetRaw(node, &raw, &raw_len) && raw_len == len && !memcmp(raw, key, len);
+}
+
+/* returns NULL for dicts too small to be worth it, doesn't need the GIL */
+_wrap_tr_bencKeyIndex *_wrap_tr_bencIndexBuild(const tr_benc *dict)
+{
+    _wrap_tr_bencKeyIndex *index;
+    size_t pairs, size = 1;
+    size_t i;
+
+    if (!tr_bencIsDict(dict) || dict->val.l.count < 2 * _WRAP_BENC_INDEX_MIN_KEYS)
+        return NULL;
+
+    pairs = dict->val.l.count / 2;
+    while (size < pairs * 2)
+        size <<= 1;
+    index = (_wrap_tr_bencKeyIndex *)tr_malloc0(sizeof(_wrap_tr_bencKeyIndex) +
+                                                (size - 1) * sizeof(size_t));
+    if (index == NULL)
+        return NULL;
+    index->dict = dict;
+    index->vals = dict->val.l.vals;
+    index->count = dict->val.l.count;
+    index->mask = size - 1;
+
+    for (i = 0; i < pairs; ++i) {
+        const uint8_t *key;
+        size_t len, slot;
+
+        if (!tr_bencGetRaw(&dict->val.l.vals[i * 2], &key, &len))
+            continue;
+        /* keep the first of duplicate keys, same as tr_bencDictFind() */
+        for (slot = _wrap_tr_bencHashKey(key, len) & index->mask;
+             index->slots[slot]; slot = (slot + 1) & index->mask)
+            if (_wrap_tr_bencKeyEquals(&dict->val.l.vals[(index->slots[slot] - 1) * 2], key, len))
+                break;
+        if (!index->slots[slot])
+            index->slots[slot] = i + 1;
+    }
+    return index;
+}
+
+static bool
+_wrap_tr_bencIndexValid(const _wrap_tr_bencKeyIndex *index, const tr_benc *dict)
+{
+    return index->dict == dict && index->vals == dict->val.l.vals &&
+           index->count == dict->val.l.count;
+}
+
+/* falls back to tr_bencDictFind() without an index or when it went stale */
+tr_benc *_wrap_tr_bencIndexFind(const _wrap_tr_bencKeyIndex *index, tr_benc *dict, const char *key)
+{
+    size_t len, slot;
+
+    if (index == NULL || !_wrap_tr_bencIndexValid(index, dict))
+        return tr_bencDictFind(dict, key);
+
+    len = strlen(key);
+    for (slot = _wrap_tr_bencHashKey((const uint8_t *)key, len) & index->mask;
+         index->slots[slot]; slot = (slot + 1) & index->mask) {
+        tr_benc *child = &dict->val.l.vals[(index->slots[slot] - 1) * 2];
+        if (_wrap_tr_bencKeyEquals(child, (const uint8_t *)key, len))
+            return child + 1;
+    }
+    return NULL;
+}
+
+static void
+_wrap_tr_bencIndexFree(PyObject *capsule)
+{
+    tr_free(PyCapsule_GetPointer(capsule, "transmission.bencode.KeyIndex"));
+}
+
+/*
+ * Returns the index of the wrapped dict, built on the second lookup so one-off
+ * lookups through temporary views stay linear, and a new reference to the
+ * capsule keeping it alive in *keep. Failing to build it isn't an error, the
+ * lookups just scan.
+ */
+_wrap_tr_bencKeyIndex *_wrap_PyBencDict_Index(PyBencDict *self, PyObject **keep)
+{
+    PyObject *py_key, *capsule;
+    _wrap_tr_bencKeyIndex *index = NULL;
+    tr_benc *dict = self->obj;
+
+    *keep = NULL;
+    if (!tr_bencIsDict(dict) || dict->val.l.count < 2 * _WRAP_BENC_INDEX_MIN_KEYS)
+        return NULL;
+    if (_wrap_PyBencDict_Indexes == NULL && (_wrap_PyBencDict_Indexes = PyDict_New()) == NULL)
+        goto fail;
+    if ((py_key = PyLong_FromVoidPtr(self)) == NULL)
+        goto fail;
+
+    capsule = PyDict_GetItem(_wrap_PyBencDict_Indexes, py_key);
+    if (capsule != NULL && capsule != Py_None) {
+        index = (_wrap_tr_bencKeyIndex *)PyCapsule_GetPointer(capsule, "transmission.bencode.KeyIndex");
+        if (_wrap_tr_bencIndexValid(index, dict)) {
+            Py_DECREF(py_key);
+            Py_INCREF(capsule);
+            *keep = capsule;
+            return index;
+        }
+    }
+
+    if (capsule == NULL) {
+        index = NULL;
+        capsule = Py_None;
+        Py_INCREF(capsule);
+    }
+    else if ((index = _wrap_tr_bencIndexBuild(dict)) == NULL ||
+             (capsule = PyCapsule_New(index, "transmission.bencode.KeyIndex",
+                                      _wrap_tr_bencIndexFree)) == NULL) {
+        tr_free(index);
+        Py_DECREF(py_key);
+        goto fail;
+    }
+
+    if (PyDict_SetItem(_wrap_PyBencDict_Indexes, py_key, capsule) < 0) {
+        Py_DECREF(capsule);
+        Py_DECREF(py_key);
+        goto fail;
+    }
+    Py_DECREF(py_key);
+    if (index == NULL)
+        Py_DECREF(capsule);
+    else
+        *keep = capsule;
+    return index;
+
+fail:
+    PyErr_Clear();
+    return NULL;
+}
+
+tr_benc *_wrap_PyBencDict_Find(PyBencDict *self, const char *key)
+{
+    PyObject *keep;
+    _wrap_tr_bencKeyIndex *index = _wrap_PyBencDict_Index(self, &keep);
+    tr_benc *val = _wrap_tr_bencIndexFind(index, self->obj, key);
+
+    Py_XDECREF(keep);
+    return val;
+}
+
+/*
+ * Called with the GIL by everything that changes the keys of a dict, which may
+ * reorder them without moving the items or changing the count. Only the
+ * indexes of that dict go, cheap when no index was ever built.
+ */
+void _wrap_PyBencDict_DropIndexes(const tr_benc *dict)
+{
+    PyObject *exc_type, *exc_value, *traceback;
+    PyObject *py_key, *capsule, *stale = NULL;
+    Py_ssize_t pos = 0;
+
+    if (_wrap_PyBencDict_Indexes == NULL || PyDict_GET_SIZE(_wrap_PyBencDict_Indexes) == 0)
+        return;
+
+    PyErr_Fetch(&exc_type, &exc_value, &traceback);
+    while (PyDict_Next(_wrap_PyBencDict_Indexes, &pos, &py_key, &capsule)) {
+        _wrap_tr_bencKeyIndex *index;
+        if (capsule == Py_None)
+            continue;
+        index = (_wrap_tr_bencKeyIndex *)PyCapsule_GetPointer(capsule, "transmission.bencode.KeyIndex");
+        if (index->dict == dict &&
+            ((stale == NULL && (stale = PyList_New(0)) == NULL) || PyList_Append(stale, py_key) < 0))
+            break;
+    }
+    for (pos = 0; stale != NULL && pos < PyList_GET_SIZE(stale); ++pos)
+        PyDict_DelItem(_wrap_PyBencDict_Indexes, PyList_GET_ITEM(stale, pos));
+    Py_XDECREF(stale);
+    /* an index that couldn't be dropped still fails _wrap_tr_bencIndexValid()
+     * on most changes, losing the rest of them is better than raising here */
+    PyErr_Clear();
+    PyErr_Restore(exc_type, exc_value, traceback);
+}
+
+/* called by every Benc dealloc, cheap when no index was ever built */
+void _wrap_PyBenc_DropIndex(PyObject *self)
+{
+    PyObject *exc_type, *exc_value, *traceback, *py_key;
+
+    if (_wrap_PyBencDict_Indexes == NULL || PyDict_GET_SIZE(_wrap_PyBencDict_Indexes) == 0)
+        return;
+
+    PyErr_Fetch(&exc_type, &exc_value, &traceback);
+    if ((py_key = PyLong_FromVoidPtr(self)) != NULL) {
+        if (PyDict_DelItem(_wrap_PyBencDict_Indexes, py_key) < 0)
+            PyErr_Clear();
+        Py_DECREF(py_key);
+    }
+    else {
+        PyErr_Clear();
+    }
+    PyErr_Restore(exc_type, exc_value, traceback);
+}
+""")
+
+    # adding a key that already exists with another type moves entries around
+    for suffix, ctype, node_type in BENC_ADD_TYPES:
+        root_module.header.writeln("tr_benc *_wrap_tr_bencDictAdd%s(tr_benc *dict, const char *key, %s value);"
+                                   % (suffix, ctype))
+        root_module.body.writeln("""
+tr_benc *_wrap_tr_bencDictAdd%s(tr_benc *dict, const char *key, %s value)
+{
+    _wrap_tr_bencChange change;
+    tr_benc *item;
+
+    if (_wrap_PyBenc_BeginChange(&change, dict, key, %s) < 0)
+        return NULL;
+    item = tr_bencDictAdd%s(dict, key, value);
+    return _wrap_PyBenc_EndChange(&change) < 0 ? NULL : item;
+}""" % (suffix, ctype, node_type, suffix))
+
+    cls.add_function_as_method('_wrap_tr_bencDictAddBool', 
                                ReturnValue.new('tr_benc *', caller_owns_return=False), 
                                [param('BencDict *', 'benc', transfer_ownership=False),
                                 param('char const *', 'key'),
                                 param('bool', 'value')],
+                               unblock_threads=False,
                                custom_name='add_bool')
 
-    cls.add_function_as_method('tr_bencDictAddBool', 
+    cls.add_function_as_method('_wrap_tr_bencDictAddBool', 
                                ReturnValue.new('tr_benc *', caller_owns_return=False), 
                                [param('BencDict *', 'benc', transfer_ownership=False),
                                 param('char const *', 'key'),
                                 param('bool', 'value')],
+                               unblock_threads=False,
                                custom_name='add_bool')
 
-    cls.add_function_as_method('tr_bencDictAddInt', 
+    cls.add_function_as_method('_wrap_tr_bencDictAddInt', 
                                ReturnValue.new('tr_benc *', caller_owns_return=False), 
                                [param('BencDict *', 'benc', transfer_ownership=False),
                                 param('char const *', 'key'),
                                 param('int64_t', 'value')],
+                               unblock_threads=False,
                                custom_name='add_int')
 
-    cls.add_function_as_method('tr_bencDictAddReal', 
+    cls.add_function_as_method('_wrap_tr_bencDictAddReal', 
                                ReturnValue.new('tr_benc *', caller_owns_return=False), 
                                [param('BencDict *', 'benc', transfer_ownership=False),
                                 param('char const *', 'key'),
                                 param('double', 'value')],
+                               unblock_threads=False,
                                custom_name='add_real')
 
-    cls.add_function_as_method('tr_bencDictAddStr', 
+    cls.add_function_as_method('_wrap_tr_bencDictAddStr', 
                                ReturnValue.new('tr_benc *', caller_owns_return=False), 
                                [param('BencDict *', 'benc', transfer_ownership=False),
                                 param('char const *', 'key'),
                                 param('char const *', 'value')],
+                               unblock_threads=False,
                                custom_name='add_string')
 
-    cls.add_function_as_method('tr_bencDictAddDict', 
+    cls.add_function_as_method('_wrap_tr_bencDictAddDict', 
                                ReturnValue.new('tr_benc *', caller_owns_return=False), 
                                [param('BencDict *', 'benc', transfer_ownership=False),
                                 param('char const *', 'key'),
                                 param('size_t', 'reserve')],
+                               unblock_threads=False,
                                custom_name='add_dict')
 
-    cls.add_function_as_method('tr_bencDictAddList', 
+    cls.add_function_as_method('_wrap_tr_bencDictAddList', 
                                'tr_benc *',
                                [param('BencDict *', 'benc', transfer_ownership=False),
                                 param('char const *', 'key'),
                                 param('size_t', 'reserve')],
+                               unblock_threads=False,
                                custom_name='add_list')
 
     cls.add_function_as_method('tr_bencLoadFile', 
@@ -319,13 +3241,155 @@ tr_benc *_wrap_tr_bencNewDict(size_t reserveCount)
                                 param('char const *', 'filename')],
                                custom_name='to_file')
 
-    root_module.header.writeln("#define _wrap_BencDict_contains(benc, key) (tr_bencDictFind(benc, key) != NULL)")
+    root_module.header.writeln("int _wrap_PyBencDict_Lookup(PyBencDict *self, PyObject *py_key, tr_benc **val);")
+    root_module.body.writeln("""
+/* keys are str or bytes, anything else is simply not in the dict */
+int _wrap_PyBencDict_Lookup(PyBencDict *self, PyObject *py_key, tr_benc **val)
+{
+    PyObject *keep;
+    const char *key;
 
-    cls.add_function_as_method('_wrap_BencDict_contains', 
-                               'bool', 
-                               [param('BencDict *', 'benc', transfer_ownership=False),
-                                param('char const *', 'key')],
-                               custom_name='__contains__')
+    if (!PyUnicode_Check(py_key) && !PyBytes_Check(py_key))
+        return 0;
+    if ((key = _wrap_tr_bencKeyFromPython(py_key, &keep)) == NULL) {
+        if (!PyErr_ExceptionMatches(PyExc_ValueError))
+            return -1;
+        PyErr_Clear();
+        return 0;
+    }
+    *val = _wrap_PyBencDict_Find(self, key);
+    Py_XDECREF(keep);
+    return *val != NULL;
+}
+""")
+
+    cls.add_custom_method_wrapper('__contains__',
+                                  '_wrap_transmission_tr_bencDictContains',
+                                  flags=["METH_VARARGS", "METH_KEYWORDS"],
+                                  wrapper_body="""
+PyObject *
+_wrap_transmission_tr_bencDictContains(PyBencDict *self, PyObject *args,
+                                       PyObject *kwargs, PyObject **return_exception)
+{
+    PyObject *py_key;
+    PyObject *exc_type, *traceback;
+    tr_benc *val;
+    int ret;
+    const char *keywords[] = {"key", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "O", (char **) keywords, &py_key)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+
+    if ((ret = _wrap_PyBencDict_Lookup(self, py_key, &val)) < 0)
+        return NULL;
+    return PyBool_FromLong(ret);
+}""")
+
+    ## keys(), values() and items() views, live like the ones of a dict
+    root_module.header.writeln("int _wrap_PyBencDictView_Ready(void);")
+    root_module.header.writeln("PyObject *_wrap_PyBencDictView_New(PyBencDict *dict, int kind);")
+    root_module.body.writeln("""
+typedef struct {
+    PyObject_HEAD
+    PyBencDict *dict;
+    int kind;
+} PyBencDictView;
+
+static PyTypeObject *PyBencDictView_Type;
+
+static Py_ssize_t
+_wrap_PyBencDictView_Len(PyBencDictView *self)
+{
+    return tr_bencDictSize(self->dict->obj);
+}
+
+static PyObject *
+_wrap_PyBencDictView_Iter(PyBencDictView *self)
+{
+    return _wrap_PyBencIterator_New((PyObject *)self->dict, self->kind);
+}
+
+static int
+_wrap_PyBencDictView_Contains(PyBencDictView *self, PyObject *py_item)
+{
+    PyObject *py_iter, *py_value;
+    tr_benc *val;
+    int ret;
+
+    if (self->kind == BENC_ITER_KEYS)
+        return _wrap_PyBencDict_Lookup(self->dict, py_item, &val);
+
+    if (self->kind == BENC_ITER_ITEMS) {
+        if (!PyTuple_Check(py_item) || PyTuple_GET_SIZE(py_item) != 2)
+            return 0;
+        if ((ret = _wrap_PyBencDict_Lookup(self->dict, PyTuple_GET_ITEM(py_item, 0), &val)) <= 0)
+            return ret;
+        if ((py_value = _wrap_tr_bencToPyValue(val, (PyObject *)self->dict)) == NULL)
+            return -1;
+        ret = PyObject_RichCompareBool(py_value, PyTuple_GET_ITEM(py_item, 1), Py_EQ);
+        Py_DECREF(py_value);
+        return ret;
+    }
+
+    if ((py_iter = _wrap_PyBencDictView_Iter(self)) == NULL)
+        return -1;
+    for (ret = 0; ret == 0 && (py_value = PyIter_Next(py_iter)) != NULL; ) {
+        ret = PyObject_RichCompareBool(py_value, py_item, Py_EQ);
+        Py_DECREF(py_value);
+    }
+    Py_DECREF(py_iter);
+    return PyErr_Occurred() ? -1 : ret;
+}
+
+static void
+_wrap_PyBencDictView_Dealloc(PyBencDictView *self)
+{
+    PyTypeObject *type = Py_TYPE(self);
+
+    Py_XDECREF(self->dict);
+    PyObject_Del(self);
+    Py_DECREF(type);
+}
+
+static PyType_Slot _wrap_PyBencDictView_slots[] = {
+    {Py_tp_dealloc, (void *) _wrap_PyBencDictView_Dealloc},
+    {Py_tp_iter, (void *) _wrap_PyBencDictView_Iter},
+    {Py_sq_length, (void *) _wrap_PyBencDictView_Len},
+    {Py_sq_contains, (void *) _wrap_PyBencDictView_Contains},
+    {0, NULL}
+};
+
+static PyType_Spec _wrap_PyBencDictView_spec = {
+    "transmission.bencode.BencDictView",
+    sizeof(PyBencDictView),
+    0,
+    Py_TPFLAGS_DEFAULT,
+    _wrap_PyBencDictView_slots
+};
+
+int _wrap_PyBencDictView_Ready(void)
+{
+    PyBencDictView_Type = (PyTypeObject *)PyType_FromSpec(&_wrap_PyBencDictView_spec);
+    return PyBencDictView_Type ? 0 : -1;
+}
+
+PyObject *_wrap_PyBencDictView_New(PyBencDict *dict, int kind)
+{
+    PyBencDictView *self = (PyBencDictView *)PyType_GenericAlloc(PyBencDictView_Type, 0);
+
+    if (self == NULL)
+        return NULL;
+    Py_INCREF(dict);
+    self->dict = dict;
+    self->kind = kind;
+    return (PyObject *)self;
+}
+""")
+    root_module.after_init.write_error_check('_wrap_PyBencDictView_Ready() < 0')
 
     cls.add_custom_method_wrapper('keys',
                                   '_wrap_transmission_tr_benc_keys',
@@ -334,26 +3398,133 @@ tr_benc *_wrap_tr_bencNewDict(size_t reserveCount)
 PyObject *
 _wrap_transmission_tr_benc_keys(PyBencDict *self, PyObject **return_exception)
 {
-    int idx;
-    int length = tr_bencDictSize(self->obj);
+    return _wrap_PyBencDictView_New(self, BENC_ITER_KEYS);
+}""")
+
+    cls.add_custom_method_wrapper('find',
+                                  '_wrap_transmission_tr_bencDictFind',
+                                  flags=["METH_VARARGS", "METH_KEYWORDS"],
+                                  wrapper_body="""
+PyObject *
+_wrap_transmission_tr_bencDictFind(PyBencDict *self, PyObject *args,
+                                   PyObject *kwargs, PyObject **return_exception)
+{
+    PyObject *exc_type, *traceback;
+    PyObject *py_key, *py_benc, *keep;
+    const char *key;
+    tr_benc *val;
+    const char *keywords[] = {"key", NULL};
 
-    PyObject *py_list = PyList_New(length);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "O", (char **) keywords, &py_key)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
 
-    for(idx = 0; idx < length; ++idx) {
-        const char * key;
-        tr_benc * val;
-        if(tr_bencDictChild(self->obj, idx, &key, &val)) {
-            PyList_SetItem(py_list, idx, Py_BuildValue((char*)"s", key));
-        }
+    if ((key = _wrap_tr_bencKeyFromPython(py_key, &keep)) == NULL)
+        return NULL;
+    val = _wrap_PyBencDict_Find(self, key);
+    Py_XDECREF(keep);
+    if (val == NULL)
+        Py_RETURN_NONE;
+    if ((py_benc = _wrap_PyBenc_New(val, PYBINDGEN_WRAPPER_FLAG_OBJECT_NOT_OWNED)) == NULL)
+        return NULL;
+    if (_wrap_PyBenc_SetOwner(py_benc, (PyObject *) self) < 0) {
+        Py_DECREF(py_benc);
+        return NULL;
     }
-    return py_list;
+    return py_benc;
 }""")
 
-    cls.add_function_as_method('tr_bencDictFind', 
-                               'tr_benc *',
-                               [param('BencDict *', 'benc', transfer_ownership=False),
-                                param('char const *', 'key')],
-                               custom_name='get')
+    cls.add_custom_method_wrapper('get',
+                                  '_wrap_transmission_tr_bencDictGet',
+                                  flags=["METH_VARARGS", "METH_KEYWORDS"],
+                                  wrapper_body="""
+PyObject *
+_wrap_transmission_tr_bencDictGet(PyBencDict *self, PyObject *args,
+                                  PyObject *kwargs, PyObject **return_exception)
+{
+    PyObject *py_default = Py_None;
+    PyObject *exc_type, *traceback;
+    PyObject *py_key, *keep;
+    const char *key;
+    tr_benc *val;
+    const char *keywords[] = {"key", "default", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "O|O", (char **) keywords, &py_key, &py_default)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+
+    if ((key = _wrap_tr_bencKeyFromPython(py_key, &keep)) == NULL)
+        return NULL;
+    val = _wrap_PyBencDict_Find(self, key);
+    Py_XDECREF(keep);
+    if (val == NULL) {
+        Py_INCREF(py_default);
+        return py_default;
+    }
+    return _wrap_tr_bencToPyValue(val, (PyObject *) self);
+}""")
+
+    cls.add_custom_method_wrapper('values',
+                                  '_wrap_transmission_tr_bencDictValues',
+                                  flags=["METH_NOARGS"],
+                                  wrapper_body="""
+PyObject *
+_wrap_transmission_tr_bencDictValues(PyBencDict *self, PyObject **return_exception)
+{
+    return _wrap_PyBencDictView_New(self, BENC_ITER_VALUES);
+}""")
+
+    cls.add_custom_method_wrapper('items',
+                                  '_wrap_transmission_tr_bencDictItems',
+                                  flags=["METH_NOARGS"],
+                                  wrapper_body="""
+PyObject *
+_wrap_transmission_tr_bencDictItems(PyBencDict *self, PyObject **return_exception)
+{
+    return _wrap_PyBencDictView_New(self, BENC_ITER_ITEMS);
+}""")
+
+    root_module.header.writeln("PyObject *_wrap_PyBencDict_Iter(PyBencDict *self);")
+    root_module.body.writeln("""
+PyObject *_wrap_PyBencDict_Iter(PyBencDict *self)
+{
+    return _wrap_PyBencIterator_New((PyObject *)self, BENC_ITER_KEYS);
+}
+""")
+    cls.slots['tp_iter'] = '_wrap_PyBencDict_Iter'
+
+    ## compares by value like a dict, which also makes it unhashable
+    root_module.header.writeln("PyObject *_wrap_PyBencDict_RichCompare(PyBencDict *self, PyObject *other, int op);")
+    root_module.body.writeln("""
+PyObject *_wrap_PyBencDict_RichCompare(PyBencDict *self, PyObject *other, int op)
+{
+    PyObject *py_self, *py_retval;
+
+    if (op != Py_EQ && op != Py_NE)
+        Py_RETURN_NOTIMPLEMENTED;
+
+    if (PyObject_TypeCheck(other, &PyBencDict_Type)) {
+        bool equal = _wrap_tr_bencEquals(self->obj, ((PyBencDict *)other)->obj);
+        return PyBool_FromLong(equal == (op == Py_EQ));
+    }
+    if (!PyDict_Check(other))
+        Py_RETURN_NOTIMPLEMENTED;
+
+    if ((py_self = _wrap_tr_bencToPython(self->obj)) == NULL)
+        return NULL;
+    py_retval = PyObject_RichCompare(py_self, other, op);
+    Py_DECREF(py_self);
+    return py_retval;
+}
+""")
+    cls.slots['tp_richcompare'] = '_wrap_PyBencDict_RichCompare'
+    cls.slots['tp_hash'] = 'PyObject_HashNotImplemented'
 
     ## mapping methods
     cls.add_function_as_method('tr_bencDictSize', 
@@ -377,11 +3548,41 @@ _wrap_transmission_tr_benc_keys(PyBencDict *self, PyObject **return_exception)
                                 param('int', 'index')],
                                custom_name='__mapget__')
 
-    cls.add_function_as_method('tr_bencDictFind', 
-                               BencValueReturn('tr_benc *', key='key'), 
-                               [param('BencDict *', 'benc', transfer_ownership=False),
-                                param('char const *', 'key')],
-                               custom_name='__mapget__')
+    cls.add_custom_method_wrapper('__mapget__',
+                                  '_wrap_transmission_tr_bencDictGetItem',
+                                  flags=["METH_VARARGS", "METH_KEYWORDS"],
+                                  wrapper_body="""
+PyObject *
+_wrap_transmission_tr_bencDictGetItem(PyBencDict *self, PyObject *args,
+                                      PyObject *kwargs, PyObject **return_exception)
+{
+    PyObject *exc_type, *traceback;
+    PyObject *py_key, *keep;
+    const char *key;
+    tr_benc *val;
+    const char *keywords[] = {"key", NULL};
+
+    /* anything but str and bytes is left to the other overloads */
+    if (PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "O", (char **) keywords, &py_key) &&
+        !PyUnicode_Check(py_key) && !PyBytes_Check(py_key))
+        PyErr_Format(PyExc_TypeError, "BencDict keys must be str, not '%.200s'", Py_TYPE(py_key)->tp_name);
+    if (PyErr_Occurred()) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+
+    if ((key = _wrap_tr_bencKeyFromPython(py_key, &keep)) == NULL)
+        return NULL;
+    val = _wrap_PyBencDict_Find(self, key);
+    Py_XDECREF(keep);
+    if (val == NULL) {
+        PyErr_Format(PyExc_KeyError, "invalid key: %R", py_key);
+        return NULL;
+    }
+    return _wrap_tr_bencToPyValue(val, (PyObject *) self);
+}""")
 
     cls.add_custom_method_wrapper('__mapset__',
                                   '_wrap_transmission_tr_bencDictSet',
@@ -393,9 +3594,15 @@ _wrap_transmission_tr_bencDictSet(PyBencDict *self, PyObject *args,
 {
     PyObject *py_value = NULL;
     PyObject *exc_type, *traceback;
+    PyObject *py_key, *keep = NULL;
+    PyObject *py_retval = NULL;
+    _wrap_tr_bencChange change;
     tr_benc *retval;
     char const *key;
-    int index;
+    const char *str = NULL;
+    int64_t ival = 0;
+    double dval = 0;
+    int index, type;
     const char *keywords[] = {"key", "value", NULL};
 
     if (PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "iO", (char **) keywords, &index, &py_value)) {
@@ -404,12 +3611,24 @@ _wrap_transmission_tr_bencDictSet(PyBencDict *self, PyObject *args,
                             "adding new items through mapping methods currently not supported");
             return NULL;
         }
+        /* replacing the item with another type frees its key */
+        if ((keep = PyBytes_FromString(key)) == NULL)
+            return NULL;
+        key = PyBytes_AS_STRING(keep);
     }
-    else if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "sO", (char **) keywords, &key, &py_value)) {
-        PyErr_Fetch(&exc_type, return_exception, &traceback);
-        Py_XDECREF(exc_type);
-        Py_XDECREF(traceback);
-        return NULL;
+    else {
+        PyErr_Clear();
+        if (PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "OO", (char **) keywords, &py_key, &py_value) &&
+            !PyUnicode_Check(py_key) && !PyBytes_Check(py_key))
+            PyErr_Format(PyExc_TypeError, "BencDict keys must be str, not '%.200s'", Py_TYPE(py_key)->tp_name);
+        if (PyErr_Occurred()) {
+            PyErr_Fetch(&exc_type, return_exception, &traceback);
+            Py_XDECREF(exc_type);
+            Py_XDECREF(traceback);
+            return NULL;
+        }
+        if ((key = _wrap_tr_bencKeyFromPython(py_key, &keep)) == NULL)
+            return NULL;
     }
 
     /*
@@ -420,31 +3639,116 @@ _wrap_transmission_tr_bencDictSet(PyBencDict *self, PyObject *args,
     }
     */
     if (PyBool_Check(py_value)) {
-        if (tr_bencDictAddBool(self->obj, key, (py_value == Py_True)))
-            Py_RETURN_NONE;
+        type = TR_TYPE_BOOL;
     }
     else if (PyLong_Check(py_value)) {
-        if (tr_bencDictAddInt(self->obj, key, PyLong_AsLong(py_value)))
-            Py_RETURN_NONE;
+        type = TR_TYPE_INT;
+        if ((ival = PyLong_AsLongLong(py_value)) == -1 && PyErr_Occurred())
+            goto out;
     }
     else if (PyFloat_Check(py_value)) {
-        if (tr_bencDictAddReal(self->obj, key, PyFloat_AsDouble(py_value)))
-            Py_RETURN_NONE;
+        type = TR_TYPE_REAL;
+        dval = PyFloat_AsDouble(py_value);
     }
     else if (PyUnicode_Check(py_value)) {
-        if (tr_bencDictAddStr(self->obj, key, PyUnicode_AsUTF8(py_value)))
-            Py_RETURN_NONE;
+        type = TR_TYPE_STR;
+        if ((str = PyUnicode_AsUTF8(py_value)) == NULL)
+            goto out;
     }
     else if (PyObject_IsInstance(py_value, (PyObject *)&PyBencDict_Type) ||
              PyObject_IsInstance(py_value, (PyObject *)&PyBencList_Type)) {
         PyErr_SetString(PyExc_NotImplementedError,
                         "assigning BencList and BencDict types currently not supported");
-        return NULL;
+        goto out;
+    }
+    else {
+        PyErr_Format(PyExc_ValueError, "Unable to set '%s'", key);
+        goto out;
     }
 
-    PyErr_Format(PyExc_ValueError, "Unable to set '%s'", key);
-    return NULL;
+    if (_wrap_PyBenc_BeginChange(&change, self->obj, key, type) < 0)
+        goto out;
+    switch (type) {
+    case TR_TYPE_BOOL:
+        retval = tr_bencDictAddBool(self->obj, key, (py_value == Py_True));
+        break;
+    case TR_TYPE_INT:
+        retval = tr_bencDictAddInt(self->obj, key, ival);
+        break;
+    case TR_TYPE_REAL:
+        retval = tr_bencDictAddReal(self->obj, key, dval);
+        break;
+    default:
+        retval = tr_bencDictAddStr(self->obj, key, str);
+        break;
+    }
+    if (_wrap_PyBenc_EndChange(&change) < 0)
+        goto out;
+
+    if (retval == NULL) {
+        PyErr_Format(PyExc_ValueError, "Unable to set '%s'", key);
+        goto out;
+    }
+    Py_INCREF(Py_None);
+    py_retval = Py_None;
+out:
+    Py_XDECREF(keep);
+    return py_retval;
 }"""
     )
+
+    root_module.header.writeln("tr_benc *_wrap_tr_bencDictDiff(tr_benc *dict, const _wrap_tr_bencKeyIndex *index, tr_benc *other);")
+    root_module.body.writeln("""
+/* doesn't need the GIL, index may be NULL */
+tr_benc *_wrap_tr_bencDictDiff(tr_benc *dict, const _wrap_tr_bencKeyIndex *index, tr_benc *other)
+{
+    tr_benc *delta = tr_new0(tr_benc, 1);
+    size_t idx, count = tr_bencDictSize(other);
+
+    tr_bencInitDict(delta, 0);
+    for (idx = 0; idx < count; ++idx) {
+        const char *key;
+        tr_benc *val, *mine;
+        if (!tr_bencDictChild(other, idx, &key, &val))
+            continue;
+        mine = _wrap_tr_bencIndexFind(index, dict, key);
+        if (mine == NULL || !_wrap_tr_bencEquals(mine, val))
+            _wrap_tr_bencCopy(tr_bencDictAdd(delta, key), val);
+    }
+    return delta;
+}
+""")
+
+    cls.add_custom_method_wrapper('diff',
+                                  '_wrap_transmission_tr_bencDictDiff',
+                                  flags=["METH_VARARGS", "METH_KEYWORDS"],
+                                  wrapper_body="""
+PyObject *
+_wrap_transmission_tr_bencDictDiff(PyBencDict *self, PyObject *args,
+                                   PyObject *kwargs, PyObject **return_exception)
+{
+    PyBencDict *other;
+    PyObject *exc_type, *traceback, *keep;
+    _wrap_tr_bencKeyIndex *index;
+    tr_benc *delta;
+    const char *keywords[] = {"other", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "O!", (char **) keywords,
+                                     &PyBencDict_Type, &other)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+
+    /* the capsule keeps the index alive should another thread rebuild it */
+    index = _wrap_PyBencDict_Index(self, &keep);
+    Py_BEGIN_ALLOW_THREADS
+    delta = _wrap_tr_bencDictDiff(self->obj, index, other->obj);
+    Py_END_ALLOW_THREADS
+    Py_XDECREF(keep);
+
+    return _wrap_PyBenc_New(delta, PYBINDGEN_WRAPPER_FLAG_NONE);
+}""")
     return
 
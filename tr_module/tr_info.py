@@ -22,15 +22,169 @@
 
 from pybindgen import ReturnValue
 
+from .typedefs import SequenceReturn
+
 SHA_DIGEST_LENGTH = 20
 
 def register_methods(root_module):
+    register_Tr_array_type(root_module)
     register_Tr_info_methods(root_module, root_module['tr_info'])
     register_Tr_file_methods(root_module, root_module['tr_file'])
     register_Tr_piece_methods(root_module, root_module['tr_piece'])
     register_Tr_tracker_info_methods(root_module, root_module['tr_tracker_info'])
     register_Tr_tracker_stat_methods(root_module, root_module['tr_tracker_stat'])
 
+def register_Tr_array_type(root_module):
+    root_module.header.writeln("typedef PyObject *(*_wrap_PyTrArray_ItemFunc)(void *base, Py_ssize_t idx);")
+    root_module.header.writeln("int _wrap_PyTrArray_Ready(void);")
+    root_module.header.writeln("PyObject *_wrap_PyTrArray_New(PyObject *owner, void *base, Py_ssize_t count,\n"
+                               "                              _wrap_PyTrArray_ItemFunc item);")
+    root_module.body.writeln("""
+#define _WRAP_TR_ARRAY_CACHE 64
+
+/* lazy read-only sequence over an array inside a wrapped struct */
+typedef struct {
+    PyObject_HEAD
+    PyObject *owner;  /* keeps the array alive */
+    void *base;
+    Py_ssize_t count;
+    _wrap_PyTrArray_ItemFunc item;
+    /* direct-mapped, so at most _WRAP_TR_ARRAY_CACHE wrappers stay alive */
+    PyObject *cache[_WRAP_TR_ARRAY_CACHE];
+    Py_ssize_t cache_idx[_WRAP_TR_ARRAY_CACHE];
+} PyTrArray;
+
+static PyTypeObject *PyTrArray_Type;
+
+static Py_ssize_t
+_wrap_PyTrArray_Length(PyTrArray *self)
+{
+    return self->count;
+}
+
+static PyObject *
+_wrap_PyTrArray_Item(PyTrArray *self, Py_ssize_t idx)
+{
+    Py_ssize_t slot = idx % _WRAP_TR_ARRAY_CACHE;
+    PyObject *py_item;
+
+    if (idx < 0 || idx >= self->count) {
+        PyErr_SetString(PyExc_IndexError, "index out of range");
+        return NULL;
+    }
+    if (self->cache[slot] == NULL || self->cache_idx[slot] != idx) {
+        if ((py_item = self->item(self->base, idx)) == NULL)
+            return NULL;
+        Py_XDECREF(self->cache[slot]);
+        self->cache[slot] = py_item;
+        self->cache_idx[slot] = idx;
+    }
+    Py_INCREF(self->cache[slot]);
+    return self->cache[slot];
+}
+
+static PyObject *
+_wrap_PyTrArray_Subscript(PyTrArray *self, PyObject *py_key)
+{
+    if (PySlice_Check(py_key)) {
+        Py_ssize_t start, stop, step, count, idx;
+        PyObject *py_list;
+
+        if (PySlice_GetIndicesEx(py_key, self->count, &start, &stop, &step, &count) < 0)
+            return NULL;
+        py_list = PyList_New(count);
+        for (idx = 0; py_list && idx < count; ++idx, start += step) {
+            PyObject *py_item = _wrap_PyTrArray_Item(self, start);
+            if (py_item == NULL) {
+                Py_CLEAR(py_list);
+                break;
+            }
+            PyList_SET_ITEM(py_list, idx, py_item);
+        }
+        return py_list;
+    }
+    else if (PyIndex_Check(py_key)) {
+        Py_ssize_t idx = PyNumber_AsSsize_t(py_key, PyExc_IndexError);
+        if (idx == -1 && PyErr_Occurred())
+            return NULL;
+        return _wrap_PyTrArray_Item(self, idx < 0 ? idx + self->count : idx);
+    }
+
+    PyErr_Format(PyExc_TypeError, "indices must be integers or slices, not '%.200s'",
+                 Py_TYPE(py_key)->tp_name);
+    return NULL;
+}
+
+static void
+_wrap_PyTrArray_Dealloc(PyTrArray *self)
+{
+    PyTypeObject *type = Py_TYPE(self);
+    int slot;
+
+    for (slot = 0; slot < _WRAP_TR_ARRAY_CACHE; ++slot)
+        Py_XDECREF(self->cache[slot]);
+    Py_XDECREF(self->owner);
+    PyObject_Del(self);
+    Py_DECREF(type);
+}
+
+static PyType_Slot _wrap_PyTrArray_slots[] = {
+    {Py_tp_dealloc, (void *) _wrap_PyTrArray_Dealloc},
+    {Py_sq_length, (void *) _wrap_PyTrArray_Length},
+    {Py_sq_item, (void *) _wrap_PyTrArray_Item},
+    {Py_mp_length, (void *) _wrap_PyTrArray_Length},
+    {Py_mp_subscript, (void *) _wrap_PyTrArray_Subscript},
+    {0, NULL}
+};
+
+static PyType_Spec _wrap_PyTrArray_spec = {
+    "transmission.ArrayView",
+    sizeof(PyTrArray),
+    0,
+    Py_TPFLAGS_DEFAULT,
+    _wrap_PyTrArray_slots
+};
+
+int _wrap_PyTrArray_Ready(void)
+{
+    PyTrArray_Type = (PyTypeObject *)PyType_FromSpec(&_wrap_PyTrArray_spec);
+    return PyTrArray_Type ? 0 : -1;
+}
+
+PyObject *_wrap_PyTrArray_New(PyObject *owner, void *base, Py_ssize_t count,
+                              _wrap_PyTrArray_ItemFunc item)
+{
+    /* GenericAlloc zeroes the cache */
+    PyTrArray *self = (PyTrArray *)PyType_GenericAlloc(PyTrArray_Type, 0);
+
+    if (self == NULL)
+        return NULL;
+    Py_INCREF(owner);
+    self->owner = owner;
+    self->base = base;
+    self->count = base ? count : 0;
+    self->item = item;
+    return (PyObject *)self;
+}
+""")
+    root_module.after_init.write_error_check('_wrap_PyTrArray_Ready() < 0')
+
+    for tr_type in ('tr_file', 'tr_piece'):
+        py_type = 'Py' + tr_type.capitalize()
+        root_module.header.writeln("PyObject *_wrap_%s_Item(void *base, Py_ssize_t idx);" % tr_type)
+        root_module.body.writeln("""
+PyObject *_wrap_%(tr_type)s_Item(void *base, Py_ssize_t idx)
+{
+    %(py_type)s *elem = PyObject_New(%(py_type)s, &%(py_type)s_Type);
+
+    if (elem == NULL)
+        return NULL;
+    elem->obj = (%(tr_type)s *) base + idx;
+    elem->flags = PYBINDGEN_WRAPPER_FLAG_OBJECT_NOT_OWNED;
+    return (PyObject *) elem;
+}
+""" % dict(tr_type=tr_type, py_type=py_type))
+
 def register_Tr_info_methods(root_module, cls):
     cls.add_instance_attribute('comment', 'char *', is_const=True)
     cls.add_instance_attribute('creator', 'char *', is_const=True)
@@ -39,9 +193,7 @@ def register_Tr_info_methods(root_module, cls):
     cls.add_instance_attribute('fileCount', 'tr_file_index_t', is_const=True,
                                custom_name='file_count')
     cls.add_instance_attribute('files',
-                               ReturnValue.new('tr_file **', 
-                                               array_length="self->obj->fileCount",
-                                               caller_owns_return=False),
+                               SequenceReturn('tr_file *', array_length="self->obj->fileCount"),
                                is_const=True)
     cls.add_instance_attribute('hash',
                                ReturnValue.new('uint8_t *',
@@ -60,9 +212,7 @@ def register_Tr_info_methods(root_module, cls):
     cls.add_instance_attribute('pieceSize', 'uint32_t', is_const=True,
                                custom_name='piece_size')
     cls.add_instance_attribute('pieces',
-                               ReturnValue.new('tr_piece **',
-                                               array_length="self->obj->pieceCount",
-                                               caller_owns_return=False),
+                               SequenceReturn('tr_piece *', array_length="self->obj->pieceCount"),
                                is_const=True)
     cls.add_instance_attribute('torrent', 'char *', is_const=True)
     cls.add_instance_attribute('totalSize', 'uint64_t', is_const=True,
@@ -626,6 +626,372 @@ static PyObject* _wrap_tr_torrentList(PyTr_session *self, PyObject **return_exce
 
     return py_list;
 }
+""")
+
+    root_module.header.writeln("tr_stat *_wrap_tr_sessionStatAll(tr_session *session, size_t *count);")
+    root_module.body.writeln("""
+tr_stat *_wrap_tr_sessionStatAll(tr_session *session, size_t *count)
+{
+    tr_torrent *torrent = NULL;
+    tr_stat *stats;
+    size_t size = 0;
+
+    while ((torrent = tr_torrentNext(session, torrent)) != NULL)
+        ++size;
+
+    /* copied out, tr_torrentStat() reuses the torrent's own buffer */
+    stats = tr_new(tr_stat, size ? size : 1);
+    *count = 0;
+    while (*count < size && (torrent = tr_torrentNext(session, torrent)) != NULL)
+        stats[(*count)++] = *tr_torrentStat(torrent);
+    return stats;
+}
+""")
+
+    cls.add_custom_method_wrapper('stats_all',
+                                  '_wrap_tr_sessionStatsAll',
+                                  flags=["METH_VARARGS", "METH_KEYWORDS"],
+                                  wrapper_body="""
+static PyObject* _wrap_tr_sessionStatsAll(PyTr_session *self, PyObject *args,
+                                          PyObject *kwargs, PyObject **return_exception)
+{
+    PyObject *py_fields = Py_None;
+    PyObject *projection, *py_dict;
+    PyObject *exc_type, *traceback;
+    tr_stat *stats;
+    size_t idx, count;
+    int as_dict = 1;
+    const char *keywords[] = {"fields", "as_dict", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "|Op", (char **) keywords,
+                                     &py_fields, &as_dict)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+
+    if ((projection = _wrap_field_Compile(&_wrap_tr_stat_fields, py_fields)) == NULL)
+        return NULL;
+
+    Py_BEGIN_ALLOW_THREADS
+    stats = _wrap_tr_sessionStatAll(self->obj, &count);
+    Py_END_ALLOW_THREADS
+
+    py_dict = PyDict_New();
+    for (idx = 0; py_dict && idx < count; ++idx) {
+        PyObject *py_id = PyLong_FromLong(stats[idx].id);
+        PyObject *py_stats = as_dict ?
+            _wrap_field_AsDict(&_wrap_tr_stat_fields, projection, &stats[idx]) :
+            _wrap_field_AsTuple(&_wrap_tr_stat_fields, projection, &stats[idx]);
+
+        if (py_id == NULL || py_stats == NULL || PyDict_SetItem(py_dict, py_id, py_stats) < 0)
+            Py_CLEAR(py_dict);
+        Py_XDECREF(py_id);
+        Py_XDECREF(py_stats);
+    }
+
+    tr_free(stats);
+    Py_DECREF(projection);
+    return py_dict;
+}
+""")
+
+    cls.add_custom_method_wrapper('stats_columns',
+                                  '_wrap_tr_sessionStatsColumns',
+                                  flags=["METH_VARARGS", "METH_KEYWORDS"],
+                                  wrapper_body="""
+static PyObject* _wrap_tr_sessionStatsColumns(PyTr_session *self, PyObject *args,
+                                              PyObject *kwargs, PyObject **return_exception)
+{
+    PyObject *py_fields = Py_None;
+    PyObject *projection, *py_keys, *py_dict;
+    PyObject *exc_type, *traceback;
+    const Py_ssize_t *indices;
+    Py_ssize_t idx;
+    tr_stat *stats;
+    size_t count;
+    const char *keywords[] = {"fields", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "|O", (char **) keywords, &py_fields)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+
+    if ((projection = _wrap_field_Compile(&_wrap_tr_stat_fields, py_fields)) == NULL)
+        return NULL;
+    if ((py_keys = _wrap_field_Keys(&_wrap_tr_stat_fields)) == NULL) {
+        Py_DECREF(projection);
+        return NULL;
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    stats = _wrap_tr_sessionStatAll(self->obj, &count);
+    Py_END_ALLOW_THREADS
+
+    indices = _wrap_field_Indices(projection);
+    py_dict = PyDict_New();
+    for (idx = 0; py_dict && idx < _wrap_field_Count(projection); ++idx) {
+        PyObject *py_column = _wrap_field_Column(&_wrap_tr_stat_fields.fields[indices[idx]],
+                                                 stats, sizeof(tr_stat), count);
+
+        if (py_column == NULL ||
+            PyDict_SetItem(py_dict, PyTuple_GET_ITEM(py_keys, indices[idx]), py_column) < 0)
+            Py_CLEAR(py_dict);
+        Py_XDECREF(py_column);
+    }
+
+    tr_free(stats);
+    Py_DECREF(projection);
+    return py_dict;
+}
+""")
+
+    root_module.header.writeln("typedef struct { uint64_t hash; int32_t id; int32_t index; } _wrap_tr_statDigest;")
+    root_module.header.writeln("int _wrap_tr_statDigestCompare(const void *a, const void *b);")
+    root_module.body.writeln("""
+int _wrap_tr_statDigestCompare(const void *a, const void *b)
+{
+    int32_t x = ((const _wrap_tr_statDigest *) a)->id;
+    int32_t y = ((const _wrap_tr_statDigest *) b)->id;
+    return (x > y) - (x < y);
+}
+""")
+
+    cls.add_custom_method_wrapper('changed_since',
+                                  '_wrap_tr_sessionChangedSince',
+                                  flags=["METH_VARARGS", "METH_KEYWORDS"],
+                                  wrapper_body="""
+static PyObject* _wrap_tr_sessionChangedSince(PyTr_session *self, PyObject *args,
+                                              PyObject *kwargs, PyObject **return_exception)
+{
+    /* elapsed-time counters tick on every idle torrent */
+    static const char *volatile_fields[] = {"idleSecs", "secondsDownloading", "secondsSeeding", NULL};
+    static PyObject *default_fields = NULL;
+    PyObject *py_token = Py_None;
+    PyObject *py_fields = Py_None;
+    PyObject *projection, *py_changed, *py_token_out = NULL;
+    PyObject *exc_type, *traceback;
+    const _wrap_tr_statDigest *old = NULL;
+    _wrap_tr_statDigest *digests;
+    bool *changed;
+    tr_stat *stats;
+    size_t idx, pos, count, old_count = 0;
+    const char *keywords[] = {"token", "fields", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "|OO", (char **) keywords,
+                                     &py_token, &py_fields)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+
+    if (py_token != Py_None) {
+        if (!PyBytes_Check(py_token) || PyBytes_GET_SIZE(py_token) % sizeof(_wrap_tr_statDigest)) {
+            PyErr_SetString(PyExc_ValueError, "invalid changed_since() token");
+            return NULL;
+        }
+        old = (const _wrap_tr_statDigest *) PyBytes_AS_STRING(py_token);
+        old_count = PyBytes_GET_SIZE(py_token) / sizeof(_wrap_tr_statDigest);
+    }
+
+    if (py_fields == Py_None) {
+        if (default_fields == NULL) {
+            Py_ssize_t field;
+            if ((default_fields = PyList_New(0)) == NULL)
+                return NULL;
+            for (field = 0; field < _wrap_tr_stat_fields.count; ++field) {
+                const char *name = _wrap_tr_stat_fields.fields[field].c_name;
+                const char **skip;
+                PyObject *py_name;
+
+                for (skip = volatile_fields; *skip && strcmp(*skip, name); ++skip)
+                    ;
+                if (*skip)
+                    continue;
+                if ((py_name = PyUnicode_FromString(name)) == NULL ||
+                    PyList_Append(default_fields, py_name) < 0) {
+                    Py_XDECREF(py_name);
+                    Py_CLEAR(default_fields);
+                    return NULL;
+                }
+                Py_DECREF(py_name);
+            }
+        }
+        py_fields = default_fields;
+    }
+
+    if ((projection = _wrap_field_Compile(&_wrap_tr_stat_fields, py_fields)) == NULL)
+        return NULL;
+
+    Py_BEGIN_ALLOW_THREADS
+    stats = _wrap_tr_sessionStatAll(self->obj, &count);
+    digests = tr_new(_wrap_tr_statDigest, count ? count : 1);
+    changed = tr_new0(bool, count ? count : 1);
+    for (idx = 0; idx < count; ++idx) {
+        digests[idx].hash = _wrap_field_Hash(&_wrap_tr_stat_fields, projection, &stats[idx]);
+        digests[idx].id = stats[idx].id;
+        digests[idx].index = idx;
+    }
+    qsort(digests, count, sizeof(_wrap_tr_statDigest), _wrap_tr_statDigestCompare);
+
+    /* both sides are sorted by id, walk them together */
+    for (idx = 0, pos = 0; idx < count; ++idx) {
+        while (pos < old_count && old[pos].id < digests[idx].id)
+            ++pos;
+        changed[idx] = pos == old_count || old[pos].id != digests[idx].id ||
+                       old[pos].hash != digests[idx].hash;
+    }
+    Py_END_ALLOW_THREADS
+
+    py_changed = PyDict_New();
+    for (idx = 0; py_changed && idx < count; ++idx) {
+        const tr_stat *stat = &stats[digests[idx].index];
+        PyObject *py_id, *py_stats;
+
+        if (!changed[idx])
+            continue;
+        py_id = PyLong_FromLong(stat->id);
+        py_stats = _wrap_field_AsDict(&_wrap_tr_stat_fields, projection, stat);
+        if (py_id == NULL || py_stats == NULL || PyDict_SetItem(py_changed, py_id, py_stats) < 0)
+            Py_CLEAR(py_changed);
+        Py_XDECREF(py_id);
+        Py_XDECREF(py_stats);
+    }
+
+    /* torrents that went away since the last token */
+    for (pos = 0, idx = 0; py_changed && pos < old_count; ++pos) {
+        PyObject *py_id;
+
+        while (idx < count && digests[idx].id < old[pos].id)
+            ++idx;
+        if (idx < count && digests[idx].id == old[pos].id)
+            continue;
+        if ((py_id = PyLong_FromLong(old[pos].id)) == NULL ||
+            PyDict_SetItem(py_changed, py_id, Py_None) < 0)
+            Py_CLEAR(py_changed);
+        Py_XDECREF(py_id);
+    }
+
+    if (py_changed != NULL) {
+        for (idx = 0; idx < count; ++idx)
+            digests[idx].index = 0;
+        py_token_out = PyBytes_FromStringAndSize((const char *) digests,
+                                                 count * sizeof(_wrap_tr_statDigest));
+    }
+
+    tr_free(changed);
+    tr_free(digests);
+    tr_free(stats);
+    Py_DECREF(projection);
+
+    if (py_token_out == NULL) {
+        Py_XDECREF(py_changed);
+        return NULL;
+    }
+    return Py_BuildValue((char *) "(NN)", py_changed, py_token_out);
+}
+""")
+
+    cls.add_custom_method_wrapper('peers_all',
+                                  '_wrap_tr_sessionPeersAll',
+                                  flags=["METH_VARARGS", "METH_KEYWORDS"],
+                                  wrapper_body="""
+static PyObject* _wrap_tr_sessionPeersAll(PyTr_session *self, PyObject *args,
+                                          PyObject *kwargs, PyObject **return_exception)
+{
+    static const _wrap_field torrent_id = {"torrent_id", "id", 0, _WRAP_FIELD_INT};
+    PyObject *py_fields = Py_None;
+    PyObject *projection, *py_keys, *py_dict, *py_column;
+    PyObject *exc_type, *traceback;
+    const Py_ssize_t *indices;
+    Py_ssize_t idx;
+    tr_torrent *torrent = NULL;
+    tr_peer_stat *peers = NULL;
+    int *ids = NULL;
+    size_t count = 0, size = 0;
+    bool no_memory = false;
+    const char *keywords[] = {"fields", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "|O", (char **) keywords, &py_fields)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+
+    if ((projection = _wrap_field_Compile(&_wrap_tr_peer_stat_fields, py_fields)) == NULL)
+        return NULL;
+    if ((py_keys = _wrap_field_Keys(&_wrap_tr_peer_stat_fields)) == NULL) {
+        Py_DECREF(projection);
+        return NULL;
+    }
+
+    /* one contiguous array for the whole session, grown geometrically */
+    Py_BEGIN_ALLOW_THREADS
+    while ((torrent = tr_torrentNext(self->obj, torrent)) != NULL) {
+        int peer, peer_count = 0;
+        tr_peer_stat *torrent_peers = tr_torrentPeers(torrent, &peer_count);
+
+        if (count + peer_count > size) {
+            size_t grown = size * 2 > count + peer_count ? size * 2 : count + peer_count;
+            tr_peer_stat *grown_peers = tr_renew(tr_peer_stat, peers, grown);
+            int *grown_ids = grown_peers ? tr_renew(int, ids, grown) : NULL;
+
+            if (grown_peers)
+                peers = grown_peers;
+            if (grown_ids == NULL) {
+                tr_torrentPeersFree(torrent_peers, peer_count);
+                no_memory = true;
+                break;
+            }
+            ids = grown_ids;
+            size = grown;
+        }
+        if (peer_count > 0)
+            memcpy(peers + count, torrent_peers, peer_count * sizeof(tr_peer_stat));
+        for (peer = 0; peer < peer_count; ++peer)
+            ids[count + peer] = tr_torrentId(torrent);
+        count += peer_count;
+        tr_torrentPeersFree(torrent_peers, peer_count);
+    }
+    Py_END_ALLOW_THREADS
+
+    if (no_memory) {
+        tr_free(ids);
+        tr_free(peers);
+        Py_DECREF(projection);
+        return PyErr_NoMemory();
+    }
+
+    /* without any peers both arrays are still NULL, the columns come out empty */
+    py_dict = PyDict_New();
+    if (py_dict != NULL) {
+        py_column = _wrap_field_Column(&torrent_id, ids, sizeof(int), count);
+        if (py_column == NULL || PyDict_SetItemString(py_dict, "torrent_id", py_column) < 0)
+            Py_CLEAR(py_dict);
+        Py_XDECREF(py_column);
+    }
+
+    indices = _wrap_field_Indices(projection);
+    for (idx = 0; py_dict && idx < _wrap_field_Count(projection); ++idx) {
+        py_column = _wrap_field_Column(&_wrap_tr_peer_stat_fields.fields[indices[idx]],
+                                       peers, sizeof(tr_peer_stat), count);
+
+        if (py_column == NULL ||
+            PyDict_SetItem(py_dict, PyTuple_GET_ITEM(py_keys, indices[idx]), py_column) < 0)
+            Py_CLEAR(py_dict);
+        Py_XDECREF(py_column);
+    }
+
+    tr_free(ids);
+    tr_free(peers);
+    Py_DECREF(projection);
+    return py_dict;
+}
 """)
 
     cls.add_function_as_method('tr_sessionSaveSettings', 
@@ -636,12 +1002,55 @@ static PyObject* _wrap_tr_torrentList(PyTr_session *self, PyObject **return_exce
                                custom_name='settings_save',
                                docstring="Save `settings\' to `directory\'")
 
-    cls.add_function_as_method('tr_sessionSet', 
-                               'void', 
-                               [param('tr_session *', 'session', transfer_ownership=False),
-                                param('BencDict *', 'settings', transfer_ownership=False)],
-                               custom_name='update',
-                               docstring="Update session settings from `BencDict\'")
+    cls.add_custom_method_wrapper('update',
+                                  '_wrap_tr_sessionUpdate',
+                                  flags=["METH_VARARGS", "METH_KEYWORDS"],
+                                  wrapper_body="""
+static PyObject* _wrap_tr_sessionUpdate(PyTr_session *self, PyObject *args,
+                                        PyObject *kwargs, PyObject **return_exception)
+{
+    PyBencDict *settings;
+    PyObject *exc_type, *traceback;
+    int delta_only = 0;
+    const char *keywords[] = {"settings", "delta_only", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "O!|p", (char **) keywords,
+                                     &PyBencDict_Type, &settings, &delta_only)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    if (delta_only) {
+        /* only hand over what changed, every key may have side effects */
+        tr_benc current, *delta;
+        _wrap_tr_bencKeyIndex *index;
+        tr_bencInitDict(&current, 0);
+        tr_sessionGetSettings(self->obj, &current);
+        index = _wrap_tr_bencIndexBuild(&current);
+        delta = _wrap_tr_bencDictDiff(&current, index, settings->obj);
+        if (tr_bencDictSize(delta))
+            tr_sessionSet(self->obj, delta);
+        tr_bencFree(delta);
+        tr_free(delta);
+        tr_free(index);
+        tr_bencFree(&current);
+    }
+    else {
+        tr_sessionSet(self->obj, settings->obj);
+    }
+    Py_END_ALLOW_THREADS
+
+    Py_RETURN_NONE;
+}
+""",
+                                  docstring="Update session settings from `BencDict\'\\n\\n"
+                                            "Args:\\n"
+                                            "    settings (BencDict): settings to apply\\n"
+                                            "    delta_only (bool): only hand over the settings that differ\\n"
+                                            "        from the current ones, defaults to False")
     return
 
 def register_Tr_session_stats_methods(root_module, cls):
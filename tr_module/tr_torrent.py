@@ -22,8 +22,9 @@
 
 from pybindgen import ReturnValue, param, retval
 
+from .fields import register_field_table
 from .typedefs import (AllocedReturn, IdleLimitReturn, NewCharReturn, RatioModeReturn,
-                       BoolCountParam, FloatCountParam, AllocedListReturn, CountParam,
+                       BufferCountParam, AllocedListReturn, CountParam,
                        TrackerInfoListParam, DummyParam, BencOutParam)
 
 def register_methods(root_module):
@@ -210,10 +211,52 @@ def register_Tr_torrent_methods(root_module, cls):
                                [param('tr_torrent *', 'torrent', transfer_ownership=False)],
                                custom_name='stop')
 
-    cls.add_function_as_method('tr_torrentStat', 
-                               'tr_stat const *', 
-                               [param('tr_torrent *', 'torrent', transfer_ownership=False)],
-                               custom_name='stats')
+    cls.add_custom_method_wrapper('stats',
+                                  '_wrap_tr_torrentStat',
+                                  flags=["METH_VARARGS", "METH_KEYWORDS"],
+                                  wrapper_body="""
+static PyObject* _wrap_tr_torrentStat(PyTr_torrent *self, PyObject *args,
+                                      PyObject *kwargs, PyObject **return_exception)
+{
+    PyObject *py_fields = Py_None;
+    PyObject *projection, *py_retval;
+    PyObject *exc_type, *traceback;
+    PyTr_stat *py_stat;
+    int as_dict = 0;
+    tr_stat stat;
+    const char *keywords[] = {"fields", "as_dict", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, (char *) "|Op", (char **) keywords,
+                                     &py_fields, &as_dict)) {
+        PyErr_Fetch(&exc_type, return_exception, &traceback);
+        Py_XDECREF(exc_type);
+        Py_XDECREF(traceback);
+        return NULL;
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    stat = *tr_torrentStat(self->obj);
+    Py_END_ALLOW_THREADS
+
+    if (py_fields == Py_None && !as_dict) {
+        py_stat = PyObject_New(PyTr_stat, &PyTr_stat_Type);
+        if (py_stat == NULL)
+            return NULL;
+        py_stat->obj = (tr_stat *) tr_memdup(&stat, sizeof(tr_stat));
+        py_stat->flags = PYBINDGEN_WRAPPER_FLAG_NONE;
+        return (PyObject *) py_stat;
+    }
+
+    if ((projection = _wrap_field_Compile(&_wrap_tr_stat_fields, py_fields)) == NULL)
+        return NULL;
+    if (as_dict)
+        py_retval = _wrap_field_AsDict(&_wrap_tr_stat_fields, projection, &stat);
+    else
+        py_retval = _wrap_field_AsTuple(&_wrap_tr_stat_fields, projection, &stat);
+    Py_DECREF(projection);
+    return py_retval;
+}
+""")
 
     cls.add_function_as_method('tr_torrentStatCached', 
                                'tr_stat const *', 
@@ -228,14 +271,113 @@ def register_Tr_torrent_methods(root_module, cls):
     cls.add_function_as_method('tr_torrentAmountFinished', 
                                'void', 
                                [param('tr_torrent *', 'torrent', transfer_ownership=False),
-                                FloatCountParam('int', 'size')],
-                               custom_name='amount_finished')
+                                BufferCountParam('int', 'size', 'float', 'f')],
+                               custom_name='amount_finished',
+                               docstring="Get how much of each of size equal parts of the torrent is done\\n\\n"
+                                         "Args:\\n"
+                                         "    size (int): number of parts\\n"
+                                         "    out (buffer): optional writable buffer of format 'f' and itemsize 4 "
+                                         "to fill in place\\n"
+                                         "Returns:\\n"
+                                         "    out if given, otherwise a memoryview of size floats from 0.0 to 1.0 "
+                                         "(a list in earlier versions)")
 
     cls.add_function_as_method('tr_torrentAvailability', 
                                'void', 
                                [param('tr_torrent *', 'torrent', transfer_ownership=False),
-                                BoolCountParam('int', 'size')],
-                               custom_name='availability')
+                                BufferCountParam('int', 'size', 'int8_t', 'b')],
+                               custom_name='availability',
+                               docstring="Get the number of peers having each of size equal parts of the torrent\\n\\n"
+                                         "Args:\\n"
+                                         "    size (int): number of parts\\n"
+                                         "    out (buffer): optional writable buffer of format 'b' and itemsize 1 "
+                                         "to fill in place\\n"
+                                         "Returns:\\n"
+                                         "    out if given, otherwise a memoryview of size signed bytes, -1 for "
+                                         "the parts we have (a list in earlier versions)")
+
+    root_module.header.writeln("int8_t *_wrap_tr_torrentPieceAvailability(tr_torrent *torrent, size_t *count);")
+    root_module.body.writeln("""
+int8_t *_wrap_tr_torrentPieceAvailability(tr_torrent *torrent, size_t *count)
+{
+    int8_t *tab;
+
+    /* one slot per piece, -1 marks the pieces we have */
+    *count = tr_torrentInfo(torrent)->pieceCount;
+    tab = tr_new(int8_t, *count ? *count : 1);
+    tr_torrentAvailability(torrent, tab, *count);
+    return tab;
+}
+""")
+
+    cls.add_custom_method_wrapper('have_bitfield',
+                                  '_wrap_tr_torrentHaveBitfield',
+                                  flags=["METH_NOARGS"],
+                                  wrapper_body="""
+static PyObject* _wrap_tr_torrentHaveBitfield(PyTr_torrent *self, PyObject **return_exception)
+{
+    PyObject *py_bitfield;
+    uint8_t *bits;
+    int8_t *tab;
+    size_t idx, count;
+
+    Py_BEGIN_ALLOW_THREADS
+    tab = _wrap_tr_torrentPieceAvailability(self->obj, &count);
+    Py_END_ALLOW_THREADS
+
+    if ((py_bitfield = PyBytes_FromStringAndSize(NULL, (count + 7) / 8)) == NULL) {
+        tr_free(tab);
+        return NULL;
+    }
+    bits = (uint8_t *) PyBytes_AS_STRING(py_bitfield);
+
+    /* BitTorrent order, the high bit of the first byte is piece 0 */
+    Py_BEGIN_ALLOW_THREADS
+    memset(bits, 0, (count + 7) / 8);
+    for (idx = 0; idx < count; ++idx)
+        if (tab[idx] == -1)
+            bits[idx >> 3] |= 0x80 >> (idx & 7);
+    Py_END_ALLOW_THREADS
+
+    tr_free(tab);
+    return py_bitfield;
+}
+""")
+
+    cls.add_custom_method_wrapper('have_runs',
+                                  '_wrap_tr_torrentHaveRuns',
+                                  flags=["METH_NOARGS"],
+                                  wrapper_body="""
+static PyObject* _wrap_tr_torrentHaveRuns(PyTr_torrent *self, PyObject **return_exception)
+{
+    PyObject *py_runs;
+    int8_t *tab;
+    size_t idx, start, count;
+
+    Py_BEGIN_ALLOW_THREADS
+    tab = _wrap_tr_torrentPieceAvailability(self->obj, &count);
+    Py_END_ALLOW_THREADS
+
+    py_runs = PyList_New(0);
+    for (idx = 0; py_runs && idx < count; ) {
+        PyObject *py_run;
+
+        if (tab[idx] != -1) {
+            ++idx;
+            continue;
+        }
+        for (start = idx; idx < count && tab[idx] == -1; ++idx)
+            ;
+        py_run = Py_BuildValue((char *) "(nn)", (Py_ssize_t) start, (Py_ssize_t) (idx - start));
+        if (py_run == NULL || PyList_Append(py_runs, py_run) < 0)
+            Py_CLEAR(py_runs);
+        Py_XDECREF(py_run);
+    }
+
+    tr_free(tab);
+    return py_runs;
+}
+""")
 
     cls.add_function_as_method('tr_torrentFiles', 
                                AllocedListReturn('tr_file_stat *', array_length='count'),
@@ -243,6 +385,56 @@ def register_Tr_torrent_methods(root_module, cls):
                                 CountParam('tr_file_index_t', 'count')],
                                custom_name='files')
 
+    root_module.header.writeln("void _wrap_tr_torrentFilesFree(PyObject *capsule);")
+    root_module.body.writeln("""
+void _wrap_tr_torrentFilesFree(PyObject *capsule)
+{
+    tr_free(PyCapsule_GetPointer(capsule, "transmission.tr_file_stat"));
+}
+""")
+
+    cls.add_custom_method_wrapper('file_progress',
+                                  '_wrap_tr_torrentFileProgress',
+                                  flags=["METH_NOARGS"],
+                                  wrapper_body="""
+static PyObject* _wrap_tr_torrentFileProgress(PyTr_torrent *self, PyObject **return_exception)
+{
+    PyObject *py_owner, *py_keys, *py_dict;
+    tr_file_stat *files;
+    tr_file_index_t count;
+    Py_ssize_t idx;
+
+    if ((py_keys = _wrap_field_Keys(&_wrap_tr_file_stat_fields)) == NULL)
+        return NULL;
+
+    Py_BEGIN_ALLOW_THREADS
+    files = tr_torrentFiles(self->obj, &count);
+    Py_END_ALLOW_THREADS
+
+    /* the views share the array libtransmission returned, the capsule frees it */
+    py_owner = PyCapsule_New(files ? (void *) files : (void *) tr_new0(tr_file_stat, 1),
+                             "transmission.tr_file_stat", _wrap_tr_torrentFilesFree);
+    if (py_owner == NULL) {
+        tr_free(files);
+        return NULL;
+    }
+    files = (tr_file_stat *) PyCapsule_GetPointer(py_owner, "transmission.tr_file_stat");
+
+    py_dict = PyDict_New();
+    for (idx = 0; py_dict && idx < _wrap_tr_file_stat_fields.count; ++idx) {
+        PyObject *py_view = _wrap_field_View(&_wrap_tr_file_stat_fields.fields[idx], files,
+                                             sizeof(tr_file_stat), count, py_owner);
+
+        if (py_view == NULL || PyDict_SetItem(py_dict, PyTuple_GET_ITEM(py_keys, idx), py_view) < 0)
+            Py_CLEAR(py_dict);
+        Py_XDECREF(py_view);
+    }
+
+    Py_DECREF(py_owner);
+    return py_dict;
+}
+""")
+
     cls.add_function_as_method('tr_torrentFindFile', 
                                'char *', 
                                [param('tr_torrent *', 'torrent', transfer_ownership=False),
@@ -482,135 +674,93 @@ def register_Tr_ctor_methods(root_module, cls):
                                custom_name='set_metainfo_from_hash')
     return
 
+TR_STAT_FIELDS = [
+    ('activity', 'tr_torrent_activity', 'activity'),
+    ('activityDate', 'time_t', 'activity_date'),
+    ('addedDate', 'time_t', 'added_date'),
+    ('corruptEver', 'uint64_t', 'corrupt_ever'),
+    ('desiredAvailable', 'uint64_t', 'desired_available'),
+    ('doneDate', 'time_t', 'done_date'),
+    ('downloadedEver', 'uint64_t', 'downloaded_ever'),
+    ('error', 'tr_stat_errtype', 'error'),
+    ('errorString', 'char *', 'error_string'),
+    ('eta', 'int', 'eta'),
+    ('etaIdle', 'int', 'eta_idle'),
+    ('finished', 'bool', 'finished'),
+    ('haveUnchecked', 'uint64_t', 'have_unchecked'),
+    ('haveValid', 'uint64_t', 'have_valid'),
+    ('id', 'int', 'id'),
+    ('idleSecs', 'int', 'idle_seconds'),
+    ('isStalled', 'bool', 'is_stalled'),
+    ('leftUntilDone', 'uint64_t', 'left_until_done'),
+    ('manualAnnounceTime', 'time_t', 'manual_announce_time'),
+    ('metadataPercentComplete', 'float', 'metadata_percent_complete'),
+    ('peersConnected', 'int', 'peers_connected'),
+    ('peersGettingFromUs', 'int', 'peers_getting_from_us'),
+    ('peersSendingToUs', 'int', 'peers_sending'),
+    ('percentComplete', 'float', 'percent_complete'),
+    ('percentDone', 'float', 'percent_done'),
+    ('pieceDownloadSpeed_KBps', 'float', 'piece_download_speed'),
+    ('pieceUploadSpeed_KBps', 'float', 'piece_upload_speed'),
+    ('queuePosition', 'int', 'queue_position'),
+    ('ratio', 'float', 'ratio'),
+    ('rawDownloadSpeed_KBps', 'float', 'raw_download_speed'),
+    ('rawUploadSpeed_KBps', 'float', 'raw_upload_speed'),
+    ('recheckProgress', 'float', 'recheck_progress'),
+    ('secondsDownloading', 'int', 'seconds_downloading'),
+    ('secondsSeeding', 'int', 'seconds_seeding'),
+    ('seedRatioPercentDone', 'float', 'seed_ratio_percent_done'),
+    ('sizeWhenDone', 'uint64_t', 'size_when_done'),
+    ('startDate', 'time_t', 'start_date'),
+    ('uploadedEver', 'uint64_t', 'uploaded_ever'),
+    ('webseedsSendingToUs', 'int', 'webseeds_sending_to_us'),
+]
+
 def register_Tr_stat_methods(root_module, cls):
-    cls.add_instance_attribute('activity', 'tr_torrent_activity', is_const=True)
-    cls.add_instance_attribute('activityDate', 'time_t', is_const=True,
-                               custom_name='activity_date')
-    cls.add_instance_attribute('addedDate', 'time_t', is_const=True,
-                               custom_name='added_date')
-    cls.add_instance_attribute('corruptEver', 'uint64_t', is_const=True,
-                               custom_name='corrupt_ever')
-    cls.add_instance_attribute('desiredAvailable', 'uint64_t', is_const=True,
-                               custom_name='desired_available')
-    cls.add_instance_attribute('doneDate', 'time_t', is_const=True,
-                               custom_name='done_date')
-    cls.add_instance_attribute('downloadedEver', 'uint64_t', is_const=True,
-                               custom_name='downloaded_ever')
-    cls.add_instance_attribute('error', 'tr_stat_errtype', is_const=True)
-    cls.add_instance_attribute('errorString', 'char *', is_const=True,
-                               custom_name='error_string')
-    cls.add_instance_attribute('eta', 'int', is_const=True)
-    cls.add_instance_attribute('etaIdle', 'int', is_const=True,
-                               custom_name='eta_idle')
-    cls.add_instance_attribute('finished', 'bool', is_const=True)
-    cls.add_instance_attribute('haveUnchecked', 'uint64_t', is_const=True,
-                               custom_name='have_unchecked')
-    cls.add_instance_attribute('haveValid', 'uint64_t', is_const=True,
-                               custom_name='have_valid')
-    cls.add_instance_attribute('id', 'int', is_const=True)
-    cls.add_instance_attribute('idleSecs', 'int', is_const=True,
-                               custom_name='idle_seconds')
-    cls.add_instance_attribute('isStalled', 'bool', is_const=True,
-                               custom_name='is_stalled')
-    cls.add_instance_attribute('leftUntilDone', 'uint64_t', is_const=True,
-                               custom_name='left_until_done')
-    cls.add_instance_attribute('manualAnnounceTime', 'time_t', is_const=True,
-                               custom_name='manual_announce_time')
-    cls.add_instance_attribute('metadataPercentComplete', 'float', is_const=True,
-                               custom_name='metadata_percent_complete')
-    cls.add_instance_attribute('peersConnected', 'int', is_const=True,
-                               custom_name='peers_connected')
+    register_field_table(root_module, cls, 'tr_stat', 'TorrentStats', TR_STAT_FIELDS)
     cls.add_instance_attribute('peersFrom',
                                retval('int *', array_length=7),  # TR_PEER_FROM__MAX
                                is_const=True,
                                custom_name='peers_from')
-    cls.add_instance_attribute('peersGettingFromUs', 'int', is_const=True,
-                               custom_name='peers_getting_from_us')
-    cls.add_instance_attribute('peersSendingToUs', 'int', is_const=True,
-                               custom_name='peers_sending')
-    cls.add_instance_attribute('percentComplete', 'float', is_const=True,
-                               custom_name='percent_complete')
-    cls.add_instance_attribute('percentDone', 'float', is_const=True,
-                               custom_name='percent_done')
-    cls.add_instance_attribute('pieceDownloadSpeed_KBps', 'float', is_const=True,
-                               custom_name='piece_download_speed')
-    cls.add_instance_attribute('pieceUploadSpeed_KBps', 'float', is_const=True,
-                               custom_name='piece_upload_speed')
-    cls.add_instance_attribute('queuePosition', 'int', is_const=True,
-                               custom_name='queue_position')
-    cls.add_instance_attribute('ratio', 'float', is_const=True)
-    cls.add_instance_attribute('rawDownloadSpeed_KBps', 'float', is_const=True,
-                               custom_name='raw_download_speed')
-    cls.add_instance_attribute('rawUploadSpeed_KBps', 'float', is_const=True,
-                               custom_name='raw_upload_speed')
-    cls.add_instance_attribute('recheckProgress', 'float', is_const=True,
-                               custom_name='recheck_progress')
-    cls.add_instance_attribute('secondsDownloading', 'int', is_const=True,
-                               custom_name='seconds_downloading')
-    cls.add_instance_attribute('secondsSeeding', 'int', is_const=True,
-                               custom_name='seconds_seeding')
-    cls.add_instance_attribute('seedRatioPercentDone', 'float', is_const=True,
-                               custom_name='seed_ratio_percent_done')
-    cls.add_instance_attribute('sizeWhenDone', 'uint64_t', is_const=True,
-                               custom_name='size_when_done')
-    cls.add_instance_attribute('startDate', 'time_t', is_const=True,
-                               custom_name='start_date')
-    cls.add_instance_attribute('uploadedEver', 'uint64_t', is_const=True,
-                               custom_name='uploaded_ever')
-    cls.add_instance_attribute('webseedsSendingToUs', 'int', is_const=True,
-                               custom_name='webseeds_sending_to_us')
     return
 
+TR_PEER_STAT_FIELDS = [
+    ('addr', 'char *', 'address'),
+    ('blocksToClient', 'uint32_t', 'blocks_to_client'),
+    ('blocksToPeer', 'uint32_t', 'blocks_to_peer'),
+    ('cancelsToClient', 'uint32_t', 'cancels_to_client'),
+    ('cancelsToPeer', 'uint32_t', 'cancles_to_peer'),
+    ('client', 'char *', 'client'),
+    ('clientIsChoked', 'bool', 'client_is_choked'),
+    ('clientIsInterested', 'bool', 'client_is_interested'),
+    ('flagStr', 'char *', 'flag_string'),
+    ('from', 'uint8_t', 'from'),
+    ('isDownloadingFrom', 'bool', 'is_downloading_from'),
+    ('isEncrypted', 'bool', 'is_encrypted'),
+    ('isIncoming', 'bool', 'is_incoming'),
+    ('isSeed', 'bool', 'is_seed'),
+    ('isUTP', 'bool', 'is_UTP'),
+    ('isUploadingTo', 'bool', 'is_downloading_to'),
+    ('peerIsChoked', 'bool', 'peer_is_choked'),
+    ('peerIsInterested', 'bool', 'peer_is_interested'),
+    ('pendingReqsToClient', 'int', 'pending_requests_to_client'),
+    ('pendingReqsToPeer', 'int', 'pending_requests_to_peer'),
+    ('port', 'tr_port', 'port'),
+    ('progress', 'float', 'progress'),
+    ('rateToClient_KBps', 'double', 'rate_to_client'),
+    ('rateToPeer_KBps', 'double', 'rate_to_peer'),
+]
+
 def register_Tr_peer_stat_methods(root_module, cls):
-    cls.add_instance_attribute('addr', 'char *', is_const=True,
-                               custom_name='address')
-    cls.add_instance_attribute('blocksToClient', 'uint32_t', is_const=True,
-                               custom_name='blocks_to_client')
-    cls.add_instance_attribute('blocksToPeer', 'uint32_t', is_const=True,
-                               custom_name='blocks_to_peer')
-    cls.add_instance_attribute('cancelsToClient', 'uint32_t', is_const=True,
-                               custom_name='cancels_to_client')
-    cls.add_instance_attribute('cancelsToPeer', 'uint32_t', is_const=True,
-                               custom_name='cancles_to_peer')
-    cls.add_instance_attribute('client', 'char *', is_const=True)
-    cls.add_instance_attribute('clientIsChoked', 'bool', is_const=True,
-                               custom_name='client_is_choked')
-    cls.add_instance_attribute('clientIsInterested', 'bool', is_const=True,
-                               custom_name='client_is_interested')
-    cls.add_instance_attribute('flagStr', 'char *', is_const=True,
-                               custom_name='flag_string')
-    cls.add_instance_attribute('from', 'uint8_t', is_const=True)
-    cls.add_instance_attribute('isDownloadingFrom', 'bool', is_const=True,
-                               custom_name='is_downloading_from')
-    cls.add_instance_attribute('isEncrypted', 'bool', is_const=True,
-                               custom_name='is_encrypted')
-    cls.add_instance_attribute('isIncoming', 'bool', is_const=True,
-                               custom_name='is_incoming')
-    cls.add_instance_attribute('isSeed', 'bool', is_const=True,
-                               custom_name='is_seed')
-    cls.add_instance_attribute('isUTP', 'bool', is_const=True,
-                               custom_name='is_UTP')
-    cls.add_instance_attribute('isUploadingTo', 'bool', is_const=True,
-                               custom_name='is_downloading_to')
-    cls.add_instance_attribute('peerIsChoked', 'bool', is_const=True,
-                               custom_name='peer_is_choked')
-    cls.add_instance_attribute('peerIsInterested', 'bool', is_const=True,
-                               custom_name='peer_is_interested')
-    cls.add_instance_attribute('pendingReqsToClient', 'int', is_const=True,
-                               custom_name='pending_requests_to_client')
-    cls.add_instance_attribute('pendingReqsToPeer', 'int', is_const=True,
-                               custom_name='pending_requests_to_peer')
-    cls.add_instance_attribute('port', 'tr_port', is_const=True)
-    cls.add_instance_attribute('progress', 'float', is_const=True)
-    cls.add_instance_attribute('rateToClient_KBps', 'double', is_const=True,
-                               custom_name='rate_to_client')
-    cls.add_instance_attribute('rateToPeer_KBps', 'double', is_const=True,
-                               custom_name='rate_to_peer')
+    register_field_table(root_module, cls, 'tr_peer_stat', 'PeerStats', TR_PEER_STAT_FIELDS)
     return
 
+TR_FILE_STAT_FIELDS = [
+    ('bytesCompleted', 'uint64_t', 'bytes_completed'),
+    ('progress', 'float', 'progress'),
+]
+
 def register_Tr_file_stat_methods(root_module, cls):
-    cls.add_instance_attribute('bytesCompleted', 'uint64_t', is_const=True,
-                               custom_name='bytes_completed')
-    cls.add_instance_attribute('progress', 'float', is_const=True)
+    register_field_table(root_module, cls, 'tr_file_stat', 'FileStats', TR_FILE_STAT_FIELDS)
     return
 
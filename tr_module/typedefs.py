@@ -88,6 +88,18 @@ class NewCharReturn(ReturnValue):
         wrapper.after_call.add_cleanup_code("tr_free(%s);" % (tmp))
 
 
+class PyObjectReturn(ReturnValue):
+    CTYPES = []
+
+    def get_c_error_return(self):
+        return "return NULL;"
+
+    def convert_c_to_python(self, wrapper):
+        # a new reference, NULL means the exception is already set
+        wrapper.after_call.write_error_check('%s == NULL' % self.value)
+        wrapper.build_params.add_parameter("N", [self.value], prepend=True)
+
+
 class CharPtrLenParam(PointerParameter):
 
     DIRECTIONS = [Parameter.DIRECTION_IN]
@@ -111,6 +123,8 @@ class BencReturn(PointerReturnValue):
         py_benc = wrapper.declarations.declare_variable("PyObject *", "py_benc", "NULL")
 
         wrapper.after_call.write_code("if (!(%s)) {\n"
+                                      "    if (PyErr_Occurred())\n"
+                                      "        return NULL;\n"
                                       "    Py_INCREF(Py_None);\n"
                                       "    return Py_None;\n"
                                       "}" % self.value)
@@ -127,6 +141,8 @@ class BencReturn(PointerReturnValue):
 
         wrapper.after_call.write_error_check('%s == NULL' % py_benc,
                                              'PyErr_SetString(PyExc_ValueError, "Unable to get Benc");')
+        wrapper.after_call.write_error_check('_wrap_PyBenc_SetOwner(%s, (PyObject *) self) < 0' % py_benc,
+                                             'Py_DECREF(%s);' % py_benc)
 
         wrapper.build_params.add_parameter("N", [py_benc])
 
@@ -154,59 +170,39 @@ class BencValueReturn(PointerReturnValue):
             sink.write_code('if (%s == NULL) {\n'
                             '    Py_RETURN_NONE;\n'
                             '}\n' % self.value)
-        sink.write_code('else if (tr_bencIsBool(%s)) {\n'
-                        '    bool value;\n'
-                        '    if (tr_bencGetBool(%s, &value)) {\n'
-                        '        %s = PyBool_FromLong(value);\n'
-                        '    }\n'
-                        '}'% (self.value, self.value, py_tmp))
-        sink.write_code('else if (tr_bencIsInt(%s)) {\n'
-                        '    int64_t value;\n'
-                        '    if (tr_bencGetInt(%s, &value)) {\n'
-                        '        %s = PyLong_FromLong(value);\n'
-                        '    }\n'
-                        '}'% (self.value, self.value, py_tmp))
-        sink.write_code('else if (tr_bencIsReal(%s)) {\n'
-                        '    double value;\n'
-                        '    if (tr_bencGetReal(%s, &value)) {\n'
-                        '        %s = PyFloat_FromDouble(value);\n'
-                        '    }\n'
-                        '}'% (self.value, self.value, py_tmp))
-        sink.write_code('else if (tr_bencIsString(%s)) {\n'
-                        '    const char *value;\n'
-                        '    if (tr_bencGetStr(%s, &value)) {\n'
-                        '        %s = Py_BuildValue((char *) "s", value);\n'
-                        '        if (%s == NULL) {\n'
-                        '            int len;\n'
-                        '            value = tr_bencToStr(%s, TR_FMT_BENC, &len);\n'
-                        '            %s = Py_BuildValue((char *) "y#", value, len);\n'
-                        '        }\n'
-                        '    }\n'
-                        '}'% (self.value, self.value, py_tmp, py_tmp, self.value, py_tmp))
-        sink.write_code('else if (tr_bencIsList(%s)) {\n'
-                        '    PyBencList *value;\n'
-                        '    value = PyObject_New(PyBencList, &PyBencList_Type);\n'
-                        '    value->obj = %s;\n'
-                        '    value->flags = PYBINDGEN_WRAPPER_FLAG_OBJECT_NOT_OWNED;\n'
-                        '    %s = (PyObject *)value;\n'
-                        '}'% (self.value, self.value, py_tmp))
-        sink.write_code('else if (tr_bencIsDict(%s)) {\n'
-                        '    PyBencDict *value;\n'
-                        '    value = PyObject_New(PyBencDict, &PyBencDict_Type);\n'
-                        '    value->obj = %s;\n'
-                        '    value->flags = PYBINDGEN_WRAPPER_FLAG_OBJECT_NOT_OWNED;\n'
-                        '    %s = (PyObject *)value;\n'
-                        '}'% (self.value, self.value, py_tmp))
-        sink.write_code('else {\n'
-                        '    PyErr_SetString(PyExc_ValueError, "Unknown Benc type");\n'
-                        '}\n')
-
-        sink.write_error_check('%s == NULL' % py_tmp,
-            'PyErr_SetString(PyExc_ValueError, "Unable to get Benc value");')
+        sink.write_code('%s = _wrap_tr_bencToPyValue(%s, (PyObject *) self);' % (py_tmp, self.value))
+        sink.write_error_check('%s == NULL' % py_tmp)
 
         wrapper.build_params.add_parameter("N", [py_tmp])
 
 
+class BencRawReturn(PointerReturnValue):
+    CTYPES = []
+
+    def __init__(self, ctype, is_const=None, view=False):
+        self.view = view
+        super(BencRawReturn, self).__init__(ctype, is_const)
+
+    def convert_c_to_python(self, wrapper):
+        sink = wrapper.after_call
+
+        sink.write_error_check('%s == NULL' % self.value,
+            'PyErr_SetString(PyExc_TypeError, "Benc value is not a string");')
+
+        if self.view:
+            py_view = wrapper.declarations.declare_variable("PyObject *", "py_view", "NULL")
+            sink.write_code('%s = PyMemoryView_FromObject((PyObject *) self);' % py_view)
+            sink.write_error_check('%s == NULL' % py_view)
+            wrapper.build_params.add_parameter("N", [py_view])
+        else:
+            raw = wrapper.declarations.declare_variable("const uint8_t *", "raw")
+            raw_len = wrapper.declarations.declare_variable("size_t", "raw_len")
+            sink.write_error_check('!tr_bencGetRaw(%s, &%s, &%s)' % (self.value, raw, raw_len),
+                'PyErr_SetString(PyExc_ValueError, "Unable to get Benc value");')
+            wrapper.build_params.add_parameter("y#", ["(const char *) " + raw,
+                                                      "(Py_ssize_t) " + raw_len])
+
+
 class BencOutParam(Parameter):
     DIRECTIONS = [Parameter.DIRECTION_IN, Parameter.DIRECTION_OUT]
     CTYPES = []
@@ -272,57 +268,80 @@ class CountParam(PointerParameter):
         name = wrapper.declarations.declare_variable(self.ctype, self.name)
         wrapper.call_params.append('&'+name)
 
-class FloatCountParam(PointerParameter):
+# `size` items filled in by the call, returned as a memoryview over a heap
+# buffer or written into the caller's optional `out` buffer
+class BufferCountParam(Parameter):
     DIRECTIONS = [Parameter.DIRECTION_IN]
     CTYPES = []
 
-    def convert_python_to_c(self, wrapper):
-        py_list = wrapper.declarations.declare_variable("PyObject*", "py_list")
-        name = wrapper.declarations.declare_variable(self.ctype, self.name)
-        idx = wrapper.declarations.declare_variable("int", "idx")
-
-        wrapper.parse_params.add_parameter('i', ['&'+name], self.name)
-
-        wrapper.before_call.write_code('float tab[%s];' % (name))
-
-        wrapper.call_params.append('tab')
-        wrapper.call_params.append(name)
-
-        wrapper.after_call.write_code("%s = PyList_New(%s);" % (py_list, name))
-        wrapper.after_call.write_code("for (%s = 0; %s < %s; %s++) {" % (idx, idx, name, idx))
-        wrapper.after_call.indent()
-        wrapper.after_call.write_code("PyList_SET_ITEM(%s, %s, PyFloat_FromDouble(tab[%s]));"
-                                       % (py_list, idx, idx))
-        wrapper.after_call.unindent()
-        wrapper.after_call.write_code('}')
-
-        wrapper.build_params.add_parameter("N", [py_list])
-
-class BoolCountParam(PointerParameter):
-    DIRECTIONS = [Parameter.DIRECTION_IN, Parameter.DIRECTION_OUT, Parameter.DIRECTION_INOUT]
-    CTYPES = []
+    def __init__(self, ctype, name, item_type, item_format, direction=Parameter.DIRECTION_IN,
+                 is_const=False, default_value=None):
+        super(BufferCountParam, self).__init__(ctype, name, direction, is_const, default_value)
+        self.item_type = item_type
+        self.item_format = item_format
 
     def convert_python_to_c(self, wrapper):
-        py_list = wrapper.declarations.declare_variable("PyObject*", "py_list")
         name = wrapper.declarations.declare_variable(self.ctype, self.name)
-        idx = wrapper.declarations.declare_variable("int", "idx")
+        py_out = wrapper.declarations.declare_variable("PyObject *", "py_out", "NULL")
+        py_bytes = wrapper.declarations.declare_variable("PyObject *", "py_bytes", "NULL")
+        py_view = wrapper.declarations.declare_variable("PyObject *", "py_view", "NULL")
+        buffer = wrapper.declarations.declare_variable("Py_buffer", "buffer")
+        tab = wrapper.declarations.declare_variable("%s *" % self.item_type, "tab", "NULL")
+        nbytes = '(Py_ssize_t) %s * (Py_ssize_t) sizeof(%s)' % (name, self.item_type)
 
         wrapper.parse_params.add_parameter('i', ['&'+name], self.name)
-
-        wrapper.before_call.write_code('int8_t tab[%s];' % (name))
-
-        wrapper.call_params.append('tab')
+        wrapper.parse_params.add_parameter('O', ['&'+py_out], 'out', optional=True)
+
+        wrapper.before_call.write_error_check('%s < 0' % name,
+            'PyErr_SetString(PyExc_ValueError, "%s must not be negative");' % self.name)
+        wrapper.before_call.write_code(
+            "if (%(out)s == NULL || %(out)s == Py_None) {\n"
+            "    %(out)s = NULL;\n"
+            "    if ((%(bytes)s = PyByteArray_FromStringAndSize(NULL, %(nbytes)s)) != NULL)\n"
+            "        %(tab)s = (%(item)s *) PyByteArray_AS_STRING(%(bytes)s);\n"
+            "}\n"
+            "else if (PyObject_GetBuffer(%(out)s, &%(buffer)s,\n"
+            "                            PyBUF_WRITABLE | PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) == 0) {\n"
+            "    const char *out_format = %(buffer)s.format ? %(buffer)s.format : \"B\";\n"
+            "    if (strcmp(out_format[0] == '@' ? out_format + 1 : out_format, \"%(format)s\") != 0 ||\n"
+            "        %(buffer)s.itemsize != (Py_ssize_t) sizeof(%(item)s)) {\n"
+            "        PyErr_Format(PyExc_TypeError, \"out must have format '%(format)s' and itemsize %%zd, not '%%s' and %%zd\",\n"
+            "                     (Py_ssize_t) sizeof(%(item)s), out_format, %(buffer)s.itemsize);\n"
+            "        PyBuffer_Release(&%(buffer)s);\n"
+            "    }\n"
+            "    else if (%(buffer)s.len < %(nbytes)s) {\n"
+            "        PyBuffer_Release(&%(buffer)s);\n"
+            "        PyErr_Format(PyExc_ValueError, \"out must hold at least %%zd bytes\", %(nbytes)s);\n"
+            "    }\n"
+            "    else\n"
+            "        %(tab)s = (%(item)s *) %(buffer)s.buf;\n"
+            "}"
+            % dict(out=py_out, bytes=py_bytes, nbytes=nbytes, tab=tab, buffer=buffer,
+                   item=self.item_type, format=self.item_format))
+        wrapper.before_call.write_error_check('PyErr_Occurred()')
+
+        wrapper.call_params.append(tab)
         wrapper.call_params.append(name)
 
-        wrapper.after_call.write_code("%s = PyList_New(%s);" % (py_list, name))
-        wrapper.after_call.write_code("for (%s = 0; %s < %s; %s++) {" % (idx, idx, name, idx))
-        wrapper.after_call.indent()
-        wrapper.after_call.write_code("PyList_SET_ITEM(%s, %s, PyLong_FromLong(tab[%s]));"
-                                       % (py_list, idx, idx))
-        wrapper.after_call.unindent()
-        wrapper.after_call.write_code('}')
-
-        wrapper.build_params.add_parameter("N", [py_list])
+        wrapper.after_call.write_code(
+            "if (%(out)s != NULL) {\n"
+            "    PyBuffer_Release(&%(buffer)s);\n"
+            "    Py_INCREF(%(out)s);\n"
+            "    %(view)s = %(out)s;\n"
+            "}\n"
+            "else {\n"
+            "    PyObject *py_raw = PyMemoryView_FromObject(%(bytes)s);\n"
+            "    Py_DECREF(%(bytes)s);\n"
+            "    if (py_raw != NULL) {\n"
+            "        %(view)s = PyObject_CallMethod(py_raw, (char *) \"cast\", (char *) \"s\", \"%(format)s\");\n"
+            "        Py_DECREF(py_raw);\n"
+            "    }\n"
+            "}"
+            % dict(out=py_out, buffer=buffer, view=py_view, bytes=py_bytes,
+                   format=self.item_format))
+        wrapper.after_call.write_error_check('%s == NULL' % py_view)
+
+        wrapper.build_params.add_parameter("N", [py_view])
 
 
 class TrackerInfoListParam(Parameter):
@@ -450,6 +469,22 @@ class ListReturn(PointerReturnValue):
         wrapper.build_params.add_parameter("N", [py_list], prepend=True)
 
 
+class SequenceReturn(PointerReturnValue):
+    CTYPES = []
+
+    def __init__(self, ctype, array_length, is_const=None):
+        super(SequenceReturn, self).__init__(ctype, is_const)
+        self.array_length = array_length
+
+    def convert_c_to_python(self, wrapper):
+        tr_type = self.ctype.split(' ')[0]
+        py_seq = wrapper.declarations.declare_variable("PyObject *", "py_seq")
+        wrapper.after_call.write_code("%s = _wrap_PyTrArray_New((PyObject *) self, (void *) %s, %s, _wrap_%s_Item);"
+                                      % (py_seq, self.value, self.array_length, tr_type))
+        wrapper.after_call.write_error_check('%s == NULL' % py_seq)
+        wrapper.build_params.add_parameter("N", [py_seq], prepend=True)
+
+
 class AllocedListReturn(PointerReturnValue):
     DIRECTIONS = [Parameter.DIRECTION_IN, Parameter.DIRECTION_OUT,
                   Parameter.DIRECTION_IN|Parameter.DIRECTION_OUT]